@@ -49,6 +49,7 @@ INPUT_FOLDER_SOLAR_GIS = INPUT_FOLDER_PATH_RAW / "06_solar_gis"
 
 # PROCESSED DATA FOLDER
 OUTPUT_FOLDER_PROCESSED_DATA = ROOT_PATH / "02_processed_data"
+OUTPUT_FOLDER_ARCHIVE = OUTPUT_FOLDER_PROCESSED_DATA / "03_archive"
 
 # PROCESSED FILE NAMES
 OUTPUT_FILE_NAMES_INVERTERS_PRODUCTION = [
@@ -67,6 +68,10 @@ OUTPUT_FILE_NAME_PRMTE = [
     "05_psn_prmte.xlsx"
 ]
 
+OUTPUT_FILE_NAME_LOSSES = [
+    "06_psn_losses.xlsx"
+]
+
 # %% 
 # ALL INVERTERS
 INVERTERS_KW_SCADA_TO_TAG = {
@@ -211,6 +216,92 @@ METEO_OPERATIONS_15M_TO_1H_1D = {
     value: "sum" if "[Wh/m2]" in value else "mean" for value in METEO_TAG_W_TO_TAG_WH.values()
 }
 
+# %%
+# METERS AND GENERACION
+METERS_SCADA_TO_TAG = {
+    # to be completed, e.g. 'PN1_S00_AN0000X': 'Meter EMELDA_1 [kWh]'
+}
+
+GENERACION_SCADA_TO_TAG = {
+    # to be completed, e.g. 'PN1_S11_AN0000X': 'Cabin 1 [kWh]'
+}
+
+# Set to True if the meters export cumulative energy registers instead of the energy of each interval
+METERS_ARE_CUMULATIVE = False
+
 # %%
 # PRMTE
-PRMTE_INDEXES_TO_REMOVE = [3, 6, 7, 8, 9, 10, 11, 12, 13]
\ No newline at end of file
+PRMTE_INDEXES_TO_REMOVE = [3, 6, 7, 8, 9, 10, 11, 12, 13]
+# %%
+# RAW FILES CATALOG
+CATALOG_PATH = INPUT_FOLDER_PATH_RAW / "raw_files_catalog.sqlite"
+
+CATALOG_SOURCE_FOLDERS = {
+    "inverter": INPUT_FOLDER_PATH_INVERTERS,
+    "sensor": INPUT_FOLDER_PATH_SENSORS_METEO,
+    "generacion": INPUT_FOLDER_PATH_GENERACION,
+    "meter": INPUT_FOLDER_PATH_METERS,
+    "prmte": INPUT_FOLDER_PATH_PRMTE,
+    "solar_gis": INPUT_FOLDER_SOLAR_GIS
+}
+
+# %%
+# SOLAR GIS
+SOLAR_GIS_AGG_PERIOD = 15
+SOLAR_GIS_TIMEZONE = "America/Santiago"
+
+SOLAR_GIS_TO_TAG = {
+    'GHI': 'Solar GIS GHI [W/m2]',
+    'DIF': 'Solar GIS difuse [W/m2]',
+    'DNI': 'Solar GIS DNI [W/m2]',
+    'GTI': 'Solar GIS POA [W/m2]',
+    'TEMP': 'Solar GIS ambient temp. [°C]'
+}
+
+SOLAR_GIS_TAG_TO_METEO_TAGS = {
+    'Solar GIS GHI [W/m2]': [tag for tag in METEO_SCADA_TO_TAG.values() if tag.startswith('Pyranometer H.')],
+    'Solar GIS POA [W/m2]': [tag for tag in METEO_SCADA_TO_TAG.values() if tag.startswith('Pyranometer POA')],
+    'Solar GIS difuse [W/m2]': [tag for tag in METEO_SCADA_TO_TAG.values() if tag.startswith('Pyranometer difuse')]
+}
+
+# %%
+# DATA QUALITY
+# Rules applied to every column whose tag ends with the unit
+QUALITY_RULES_PER_UNIT = {
+    '[W/m2]': {'min': -5, 'max': 1500, 'max_rate_per_minute': 800, 'stuck_min_run': 30, 'stuck_ignore_zero': True},
+    '[°C]': {'min': -20, 'max': 90, 'max_rate_per_minute': 5, 'stuck_min_run': 60, 'stuck_ignore_zero': False}
+}
+
+QUALITY_TEMPERATURE_RULE = {
+    'ambient_tag': 'Ambient temp. (WS) cabin 01 [°C]',
+    'module_tag_prefix': 'Module temp.',
+    'min_delta': -10,
+    'max_delta': 45
+}
+
+# %%
+# KPIS
+# DC capacity of each inverter (tag of INVERTERS_KW_TO_KWH -> kWp)
+INVERTERS_DC_CAPACITY_KWP = {
+    # to be completed, e.g. 'Cabin 1 inverter 1 [kWh]': 1000.0
+}
+
+MODULE_TEMPERATURE_COEFFICIENT = -0.0035  # 1/°C, power temperature coefficient of the modules
+KPI_STC_IRRADIANCE = 1000  # W/m2
+KPI_STC_MODULE_TEMPERATURE = 25  # °C
+KPI_AVAILABILITY_POA_THRESHOLD = 50  # W/m2
+
+# %%
+# TIMESTAMPS
+# How each source writes its timestamps, used to normalize every source to UTC:
+# 'timezone' (wall clock with DST) or 'utc_offset_hours' (fixed offset), the position of the
+# timestamp in the interval ('start', 'center' or 'end') and the interval in minutes
+TIMESTAMP_RULES = {
+    "inverter": {"timezone": "America/Santiago", "timestamp_convention": "start", "interval_minutes": INPUT_AGG_PERIOD},
+    "sensor": {"timezone": "America/Santiago", "timestamp_convention": "start", "interval_minutes": INPUT_AGG_PERIOD},
+    "meter": {"timezone": "America/Santiago", "timestamp_convention": "end", "interval_minutes": INPUT_METERS_AGG_PERIOD},
+    "generacion": {"timezone": "America/Santiago", "timestamp_convention": "end", "interval_minutes": INPUT_METERS_AGG_PERIOD},
+    "prmte": {"utc_offset_hours": -4, "timestamp_convention": "start", "interval_minutes": INPUT_METERS_AGG_PERIOD},
+    # The UTC offset, time step and convention written in the Solar GIS header take precedence (see solar_gis_rule)
+    "solar_gis": {"utc_offset_hours": 0, "timestamp_convention": "end", "interval_minutes": SOLAR_GIS_AGG_PERIOD}
+}
@@ -0,0 +1,92 @@
+# %%
+# LIBRARIES AND MODULES
+import sys
+import logging
+from pathlib import Path
+
+# Allow running as a script or from a notebook
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from dom_constants import (
+    START_DATE,
+    END_DATE,
+    ROOT_PATH,
+    INPUT_AGG_PERIOD,
+    OUTPUT_AGG_PERIOD_15M,
+    OUTPUT_AGG_PERIOD_1H,
+    OUTPUT_AGG_PERIOD_1D,
+    INPUT_FOLDER_PATH_INVERTERS,
+    OUTPUT_FOLDER_PROCESSED_DATA,
+    OUTPUT_FOLDER_ARCHIVE,
+    CATALOG_PATH,
+    TIMESTAMP_RULES,
+    OUTPUT_FILE_NAMES_INVERTERS_PRODUCTION,
+    INVERTERS_KW_SCADA_TO_TAG,
+    INVERTERS_OPERATIONS_1M_TO_15M,
+    INVERTERS_KW_TO_KWH,
+    INVERTERS_OPERATIONS_15M_TO_1H_1D
+)
+from utils.data import to_agg_period_beta, set_date_as_index, watt_to_energy, rename_columns
+from utils.pipeline import PipelineJob, build_arg_parser, month_root_path, run_pipeline
+
+# %%
+def aggregate_inverters(df, str_start_date, str_end_date):
+    """
+    Aggregates the 1 minute inverter power (kW) into 15 minute, hourly and daily energy (kWh).
+
+    Parameters:
+    df (pandas.DataFrame): The combined 1 minute inverter DataFrame indexed by date.
+    str_start_date (str): The start date in the format '%d-%m-%Y'.
+    str_end_date (str): The end date in the format '%d-%m-%Y'.
+
+    Yields:
+    tuple[str, pandas.DataFrame]: The sheet name and the aggregated DataFrame indexed by date.
+    """
+    df_15m = set_date_as_index(to_agg_period_beta(df, OUTPUT_AGG_PERIOD_15M, INVERTERS_OPERATIONS_1M_TO_15M))
+    df_15m = watt_to_energy(df_15m, list(INVERTERS_KW_SCADA_TO_TAG.values()), OUTPUT_AGG_PERIOD_15M / 60)
+    df_15m = rename_columns(df_15m, INVERTERS_KW_TO_KWH)
+    yield "15M", df_15m
+
+    yield "1H", set_date_as_index(to_agg_period_beta(df_15m, OUTPUT_AGG_PERIOD_1H, INVERTERS_OPERATIONS_15M_TO_1H_1D))
+    yield "1D", set_date_as_index(to_agg_period_beta(df_15m, OUTPUT_AGG_PERIOD_1D, INVERTERS_OPERATIONS_15M_TO_1H_1D))
+
+# %%
+def build_job(args) -> PipelineJob:
+    """
+    Builds the inverters job for the period of the parsed arguments.
+
+    Parameters:
+    args (argparse.Namespace): The parsed arguments (see build_arg_parser).
+
+    Returns:
+    PipelineJob: The inverters job.
+    """
+    return PipelineJob(
+        name="inverters",
+        input_folder=month_root_path(args.start, ROOT_PATH, INPUT_FOLDER_PATH_INVERTERS),
+        rename_dict=INVERTERS_KW_SCADA_TO_TAG,
+        aggregate=aggregate_inverters,
+        output_path=month_root_path(args.start, ROOT_PATH, OUTPUT_FOLDER_PROCESSED_DATA) / OUTPUT_FILE_NAMES_INVERTERS_PRODUCTION[0],
+        input_agg_period=INPUT_AGG_PERIOD,
+        archive_folder=month_root_path(args.start, ROOT_PATH, OUTPUT_FOLDER_ARCHIVE) / "inverters" if args.archive else None,
+        source_type="inverter",
+        catalog_path=None if args.no_catalog else month_root_path(args.start, ROOT_PATH, CATALOG_PATH),
+        timestamp_rule=TIMESTAMP_RULES["inverter"]
+    )
+
+# %%
+def main(argv=None) -> int:
+    """
+    Command line entry point: inverter production of a month from the SDI (SCADA) exports.
+
+    Returns:
+    int: The exit code (0 if OK, 1 if validation failed).
+    """
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = build_arg_parser(main.__doc__.strip().splitlines()[0], START_DATE, END_DATE).parse_args(argv)
+
+    return run_pipeline(args, build_job(args))
+
+# %%
+if __name__ == "__main__":
+    sys.exit(main())
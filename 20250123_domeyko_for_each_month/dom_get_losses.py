@@ -0,0 +1,118 @@
+# %%
+# LIBRARIES AND MODULES
+import sys
+import logging
+import pandas as pd
+from pathlib import Path
+
+# Allow running as a script or from a notebook
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from dom_constants import (
+    START_DATE,
+    END_DATE,
+    ROOT_PATH,
+    OUTPUT_AGG_PERIOD_15M,
+    INPUT_FOLDER_PATH_INVERTERS,
+    INPUT_FOLDER_PATH_GENERACION,
+    INPUT_FOLDER_PATH_METERS,
+    OUTPUT_FOLDER_PROCESSED_DATA,
+    CATALOG_PATH,
+    OUTPUT_FILE_NAME_LOSSES,
+    INVERTERS_KW_SCADA_TO_TAG,
+    INVERTERS_KW_TO_KWH,
+    GENERACION_SCADA_TO_TAG,
+    METERS_SCADA_TO_TAG,
+    METERS_ARE_CUMULATIVE,
+    TIMESTAMP_RULES
+)
+from utils.energy import reconcile_month
+from utils.pipeline import (
+    build_arg_parser,
+    check_date_range,
+    month_root_path,
+    compute_job_outputs,
+    write_outputs_overlapped,
+    EXIT_OK,
+    EXIT_VALIDATION_FAILED
+)
+from utils.profiling import log_profile_summary
+import dom_get_inverters
+
+# %%
+def summary_row(df_summary, str_start_date):
+    """
+    Flattens the summary per group of reconcile_energy into one row dated at the start of the period,
+    so it is written like the other outputs (one column per group and measure).
+
+    Parameters:
+    df_summary (pandas.DataFrame): The summary per group (see reconcile_energy).
+    str_start_date (str): The start date in the format '%d-%m-%Y'.
+
+    Returns:
+    pandas.DataFrame: The summary as a single row indexed by date.
+    """
+    values = df_summary.stack()
+    return pd.DataFrame(
+        [values.to_numpy()],
+        index=pd.DatetimeIndex([pd.to_datetime(str_start_date, format='%d-%m-%Y')], name='date'),
+        columns=[f"{group} {measure}" for group, measure in values.index]
+    )
+
+# %%
+def main(argv=None) -> int:
+    """
+    Command line entry point: energy losses of a month per cabin (against generacion) and per substation (against the meters).
+
+    Returns:
+    int: The exit code (0 if OK, 1 if validation failed).
+    """
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = build_arg_parser(main.__doc__.strip().splitlines()[0], START_DATE, END_DATE).parse_args(argv)
+
+    message = check_date_range(args.start, args.end)
+    if message != "OK":
+        logging.error(message)
+        return EXIT_VALIDATION_FAILED
+
+    outputs = compute_job_outputs(args, dom_get_inverters.build_job(args))
+    if outputs is None:
+        return EXIT_VALIDATION_FAILED
+
+    results = reconcile_month(
+        dict(outputs)["15M"],
+        TIMESTAMP_RULES,
+        month_root_path(args.start, ROOT_PATH, INPUT_FOLDER_PATH_INVERTERS),
+        {scada_name: INVERTERS_KW_TO_KWH[tag] for scada_name, tag in INVERTERS_KW_SCADA_TO_TAG.items()},
+        month_root_path(args.start, ROOT_PATH, INPUT_FOLDER_PATH_GENERACION),
+        GENERACION_SCADA_TO_TAG,
+        month_root_path(args.start, ROOT_PATH, INPUT_FOLDER_PATH_METERS),
+        METERS_SCADA_TO_TAG,
+        METERS_ARE_CUMULATIVE,
+        OUTPUT_AGG_PERIOD_15M,
+        catalog_path=None if args.no_catalog else month_root_path(args.start, ROOT_PATH, CATALOG_PATH)
+    )
+    if not results:
+        logging.error(f"No generacion nor meter data found for {args.start}")
+        return EXIT_VALIDATION_FAILED
+
+    sheets = []
+    for level, (df_losses, df_summary) in results.items():
+        sheets.append((f"{level.capitalize()} losses 15M", df_losses))
+        sheets.append((f"{level.capitalize()} losses month", summary_row(df_summary, args.start)))
+
+    written = write_outputs_overlapped(
+        sheets,
+        month_root_path(args.start, ROOT_PATH, OUTPUT_FOLDER_PROCESSED_DATA) / OUTPUT_FILE_NAME_LOSSES[0],
+        args.output_format,
+        args.reuse_outputs
+    )
+    for path in written:
+        logging.info(f"Output written: {path}")
+
+    log_profile_summary()
+    return EXIT_OK
+
+# %%
+if __name__ == "__main__":
+    sys.exit(main())
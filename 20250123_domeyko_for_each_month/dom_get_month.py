@@ -0,0 +1,50 @@
+# %%
+# LIBRARIES AND MODULES
+import sys
+import logging
+from pathlib import Path
+
+# Allow running as a script or from a notebook
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from dom_constants import START_DATE, END_DATE, ROOT_PATH, EXTENTIONS, CATALOG_PATH, CATALOG_SOURCE_FOLDERS
+from utils.pipeline import build_arg_parser, month_root_path, run_pipeline, EXIT_OK, EXIT_VALIDATION_FAILED
+from utils.catalog import refresh_all
+from utils.orchestrator import run_jobs
+import dom_get_inverters
+import dom_get_sensors
+
+# %%
+def main(argv=None) -> int:
+    """
+    Command line entry point: inverters and sensors of a month, processed concurrently with overlapped I/O.
+    With --cache-dir, they are processed one after the other through the stage cache instead.
+
+    Returns:
+    int: The exit code (0 if OK, 1 if validation failed for any source).
+    """
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = build_arg_parser(main.__doc__.strip().splitlines()[0], START_DATE, END_DATE)
+    parser.add_argument("--io-workers", type=int, default=4, help="Number of threads reading and writing files.")
+    parser.add_argument("--queue-size", type=int, default=4, help="Files read ahead of parsing, per source.")
+    args = parser.parse_args(argv)
+
+    if not args.no_catalog:
+        # One refresh for every source of the month, the jobs then find their files unchanged
+        stats = refresh_all(
+            month_root_path(args.start, ROOT_PATH, CATALOG_PATH),
+            {source_type: month_root_path(args.start, ROOT_PATH, folder) for source_type, folder in CATALOG_SOURCE_FOLDERS.items()},
+            EXTENTIONS
+        )
+        logging.info(f"Catalog refreshed: {', '.join(f'{key}={value}' for key, value in stats.items())}")
+
+    jobs = [dom_get_sensors.build_job(args), dom_get_inverters.build_job(args)]
+    if args.cache_dir is not None:
+        # The stage cache runs the sources one after the other (see run_pipeline)
+        exit_codes = [run_pipeline(args, job) for job in jobs]
+        return EXIT_OK if all(exit_code == EXIT_OK for exit_code in exit_codes) else EXIT_VALIDATION_FAILED
+    return run_jobs(jobs, args.start, args.end, args.output_format, args.io_workers, args.workers, args.queue_size, args.reuse_outputs)
+
+# %%
+if __name__ == "__main__":
+    sys.exit(main())
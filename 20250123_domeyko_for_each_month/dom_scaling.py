@@ -0,0 +1,47 @@
+# %%
+# LIBRARIES AND MODULES
+import sys
+import logging
+import argparse
+import pandas as pd
+from pathlib import Path
+
+# Allow running as a script or from a notebook
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from dom_constants import START_DATE, N_CABINS, N_INVERTERS_PER_CABIN
+from utils.pipeline import OUTPUT_FORMATS, EXIT_OK
+from utils.synthetic import run_scaling
+
+# %%
+def main(argv=None) -> int:
+    """
+    Command line entry point: scaling test of the inverter pipeline on synthetic parks of 1x, 10x, 100x Domeyko.
+
+    Returns:
+    int: The exit code (0 if OK).
+    """
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="Park sizes relative to Domeyko.")
+    parser.add_argument("--start", default=START_DATE, help="First month, format dd-mm-yyyy.")
+    parser.add_argument("--months", type=int, default=1, help="Number of months of 1 minute data (e.g. 24 for two years).")
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes generating and parsing raw files.")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS + ["none"], default="xlsx", help="Output format.")
+    parser.add_argument("--report", type=Path, default=None, help="CSV file to save the results per scale.")
+    args = parser.parse_args(argv)
+
+    months = list(pd.date_range(pd.to_datetime(args.start, format="%d-%m-%Y"), periods=args.months, freq="MS"))
+    output_format = None if args.output_format == "none" else args.output_format
+
+    df_results, df_exponents = run_scaling(args.scales, N_CABINS, N_INVERTERS_PER_CABIN, months, output_format, args.workers)
+    print(df_results.to_string(float_format=lambda value: f"{value:.3g}"))
+    print(df_exponents.to_string(float_format=lambda value: f"{value:.2f}"))
+    if args.report is not None:
+        df_results.to_csv(args.report)
+
+    return EXIT_OK
+
+# %%
+if __name__ == "__main__":
+    sys.exit(main())
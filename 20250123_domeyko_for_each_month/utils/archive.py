@@ -0,0 +1,146 @@
+# %%
+import json
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from typing import Union
+from .profiling import profile_stage
+
+ARCHIVE_INDEX_FILE = "index.json"
+
+# %%
+@profile_stage
+def write_month_archive(
+    folder_path: Union[str, Path],
+    dfs_per_period: dict[str, pd.DataFrame]
+    ) -> Path:
+    """
+    Writes the processed DataFrames of a month as a memory-mappable archive.
+
+    For every period (e.g. '15M', '1H', '1D') two .npy files are written:
+        - '<period>.npy': the float64 values, in column-major (Fortran) order so every tag is contiguous.
+        - '<period>_dates.npy': the int64 timestamps (ns) of the rows.
+    The tag index ('index.json') records, per period, the tags (column order), the number of rows and
+    the first and last timestamps.
+
+    Parameters:
+    folder_path (str | Path): The archive folder of the month (e.g. OUTPUT_FOLDER_ARCHIVE / 'inverters').
+    dfs_per_period (dict[str, pd.DataFrame]): The DataFrames per period, indexed by date.
+
+    Returns:
+    Path: The path of the tag index.
+
+    Raises:
+    ValueError: If a DataFrame index is not datetime.
+    """
+    folder_path = Path(folder_path)
+    folder_path.mkdir(parents=True, exist_ok=True)
+    index_path = folder_path / ARCHIVE_INDEX_FILE
+    index = json.loads(index_path.read_text()) if index_path.exists() else {}
+
+    for period, df in dfs_per_period.items():
+        if not pd.api.types.is_datetime64_any_dtype(df.index):
+            raise ValueError(f"DataFrame index of period '{period}' must be a datetime type")
+
+        dates = df.index.values.astype('datetime64[ns]').astype(np.int64)
+        np.save(folder_path / f"{period}_dates.npy", dates)
+
+        values = np.lib.format.open_memmap(
+            folder_path / f"{period}.npy", mode='w+', dtype=np.float64, shape=df.shape, fortran_order=True
+        )
+        values[:] = df.to_numpy(dtype=np.float64)
+        values.flush()
+        del values
+
+        index[period] = {
+            'tags': [str(column) for column in df.columns],
+            'rows': int(df.shape[0]),
+            'start': str(df.index.min()) if len(df) else None,
+            'end': str(df.index.max()) if len(df) else None,
+        }
+
+    index_path.write_text(json.dumps(index, indent=2, ensure_ascii=False))
+    return index_path
+
+# %%
+def read_archive_index(
+    folder_path: Union[str, Path]
+    ) -> dict[str, dict]:
+    """
+    Reads the tag index of a month archive.
+
+    Parameters:
+    folder_path (str | Path): The archive folder of the month.
+
+    Returns:
+    dict[str, dict]: The index per period, with the keys 'tags', 'rows', 'start' and 'end'.
+
+    Raises:
+    FileNotFoundError: If the folder has no archive.
+    """
+    index_path = Path(folder_path) / ARCHIVE_INDEX_FILE
+    if not index_path.exists():
+        raise FileNotFoundError(f"The archive index '{index_path}' does not exist.")
+    return json.loads(index_path.read_text())
+
+# %%
+@profile_stage
+def load_month_archive(
+    folder_path: Union[str, Path],
+    period: str,
+    start: Union[str, pd.Timestamp, None] = None,
+    end: Union[str, pd.Timestamp, None] = None,
+    tags: Union[list[str], None] = None
+    ) -> pd.DataFrame:
+    """
+    Memory-maps the archive of a month and period and returns the requested time range and tags.
+
+    Only the pages of the requested rows and tags are read from disk. When the tags are consecutive in the
+    archive (or all tags are requested) the DataFrame is a read-only view over the memory map; otherwise
+    only the requested slice is copied.
+
+    Parameters:
+    folder_path (str | Path): The archive folder of the month.
+    period (str): The period (e.g. '15M', '1H', '1D').
+    start (str | Timestamp | None): The start of the time range (inclusive). Default is None (first row).
+    end (str | Timestamp | None): The end of the time range (exclusive). Default is None (last row).
+    tags (list[str] | None): The tags to load. Default is None (all tags).
+
+    Returns:
+    pd.DataFrame: The requested data indexed by date.
+
+    Raises:
+    KeyError: If the period or any of the tags is not in the archive.
+    """
+    folder_path = Path(folder_path)
+    index = read_archive_index(folder_path)
+    if period not in index:
+        raise KeyError(f"Period '{period}' not found in the archive '{folder_path}'.")
+    archive_tags = index[period]['tags']
+
+    dates = np.load(folder_path / f"{period}_dates.npy", mmap_mode='r')
+    values = np.load(folder_path / f"{period}.npy", mmap_mode='r')
+
+    first = 0 if start is None else int(np.searchsorted(dates, pd.Timestamp(start).value, side='left'))
+    last = len(dates) if end is None else int(np.searchsorted(dates, pd.Timestamp(end).value, side='left'))
+
+    if tags is None:
+        tags = archive_tags
+        selection = values[first:last]
+    else:
+        position = {tag: n for n, tag in enumerate(archive_tags)}
+        missing = [tag for tag in tags if tag not in position]
+        if missing:
+            raise KeyError(f"Tags not found in the archive: {', '.join(missing)}")
+        columns = [position[tag] for tag in tags]
+        if columns and columns == list(range(columns[0], columns[0] + len(columns))):
+            selection = values[first:last, columns[0]:columns[0] + len(columns)]
+        else:
+            selection = values[first:last][:, columns]
+
+    return pd.DataFrame(
+        selection,
+        index=pd.DatetimeIndex(np.asarray(dates[first:last]).astype('datetime64[ns]'), name='date'),
+        columns=tags,
+        copy=False
+    )
@@ -0,0 +1,401 @@
+# %%
+import os
+import sqlite3
+import hashlib
+import logging
+import datetime
+import pandas as pd
+from pathlib import Path
+from typing import Callable, Union
+from .data import get_substation_name
+from .utils import find_files_with_extension
+from .solar_gis import read_solar_gis_file
+from .prmte import read_prmte_file
+from .profiling import profile_stage
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS raw_files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    substation TEXT,
+    source_type TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    start_time TEXT,
+    end_time TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_raw_files_source_time ON raw_files (source_type, start_time, end_time);
+CREATE INDEX IF NOT EXISTS idx_raw_files_substation ON raw_files (substation, source_type);
+"""
+
+# %%
+def _scada_time_range(
+    file_path: str
+    ) -> tuple[Union[datetime.datetime, None], Union[datetime.datetime, None]]:
+    """
+    Reads only the date component columns (gg, mm, aaaa, hh, mm, ss) of an .xls file exported from SDI (SCADA)
+    and returns the first and last timestamps it covers.
+
+    Parameters:
+    file_path (str): The path to the Excel file.
+
+    Returns:
+    tuple[datetime | None, datetime | None]: The first and last timestamps in the file.
+    """
+    df = pd.read_excel(file_path, engine='xlrd', usecols=range(1, 7), header=0, dtype=str)
+    df.columns = ['day', 'month', 'year', 'hour', 'minute', 'second']
+    dates = pd.to_datetime(df.dropna(how='any'), errors='coerce').dropna()
+    if dates.empty:
+        return None, None
+    return dates.min().to_pydatetime(), dates.max().to_pydatetime()
+
+# %%
+def _solar_gis_time_range(
+    file_path: str
+    ) -> tuple[Union[datetime.datetime, None], Union[datetime.datetime, None]]:
+    """
+    Returns the first and last timestamps, as written, of a Solar GIS file (see read_solar_gis_file).
+
+    Parameters:
+    file_path (str): The path to the Solar GIS file.
+
+    Returns:
+    tuple[datetime | None, datetime | None]: The first and last timestamps in the file.
+    """
+    df, _ = read_solar_gis_file(file_path, rename_dict={})
+    if df.empty:
+        return None, None
+    return df['date'].iloc[0].to_pydatetime(), df['date'].iloc[-1].to_pydatetime()
+
+# %%
+def _prmte_time_range(
+    file_path: str
+    ) -> tuple[Union[datetime.datetime, None], Union[datetime.datetime, None]]:
+    """
+    Returns the first and last timestamps of a PRMTE file (see read_prmte_file).
+
+    Parameters:
+    file_path (str): The path to the PRMTE file.
+
+    Returns:
+    tuple[datetime | None, datetime | None]: The first and last timestamps in the file.
+    """
+    df = read_prmte_file(file_path)
+    if df.empty:
+        return None, None
+    return df['date'].iloc[0].to_pydatetime(), df['date'].iloc[-1].to_pydatetime()
+
+# Functions reading the covered time range of a file, per source type.
+# Source types without a reader are cataloged with an unknown (NULL) time range.
+TIME_RANGE_READERS: dict[str, Callable[[str], tuple]] = {
+    'inverter': _scada_time_range,
+    'sensor': _scada_time_range,
+    'meter': _scada_time_range,
+    'generacion': _scada_time_range,
+    'solar_gis': _solar_gis_time_range,
+    'prmte': _prmte_time_range,
+}
+
+# %%
+def _file_sha1(
+    file_path: str,
+    chunk_size: int = 1 << 20
+    ) -> str:
+    """
+    Computes the SHA-1 hash of a file, reading it in chunks.
+
+    Parameters:
+    file_path (str): The path to the file.
+    chunk_size (int): The size of the chunks in bytes. Default is 1 MiB.
+
+    Returns:
+    str: The hexadecimal SHA-1 digest.
+    """
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+# %%
+def _scan_files(
+    folder_path: Union[str, Path],
+    errors: list[str]
+    ):
+    """
+    Recursively yields the os.DirEntry of every file under a folder using os.scandir.
+
+    Parameters:
+    folder_path (str | Path): The folder to scan.
+    errors (list[str]): A list where the folders that could not be scanned are appended.
+
+    Yields:
+    os.DirEntry: The entry of each file found.
+    """
+    stack = [str(folder_path)]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+        except OSError as e:
+            logging.warning(f"Folder '{folder}' could not be scanned: {e}")
+            errors.append(folder)
+
+# %%
+def open_catalog(
+    catalog_path: Union[str, Path]
+    ) -> sqlite3.Connection:
+    """
+    Opens (and creates if needed) the SQLite catalog of raw files.
+
+    Parameters:
+    catalog_path (str | Path): The path to the SQLite catalog file.
+
+    Returns:
+    sqlite3.Connection: The connection to the catalog.
+    """
+    connection = sqlite3.connect(str(catalog_path))
+    connection.executescript(CATALOG_SCHEMA)
+    return connection
+
+# %%
+@profile_stage
+def refresh_catalog(
+    connection: sqlite3.Connection,
+    source_folders: dict[str, Union[str, Path]],
+    extensions: list[str]
+    ) -> dict[str, int]:
+    """
+    Incrementally refreshes the catalog with the files found in the source folders.
+
+    Only new files and files whose size or modification time changed are hashed and have their
+    time range read. The cataloged files of a source, under its folder and with one of the extensions, that
+    no longer exist are removed; the other rows (other folders of a shared catalog, other extensions) are kept.
+    Nothing is removed for a source whose folder could not be scanned completely (e.g. an unreachable mount).
+
+    Parameters:
+    connection (sqlite3.Connection): The connection to the catalog.
+    source_folders (dict[str, str | Path]): A dictionary with source types as keys (e.g. 'inverter', 'meter')
+                                            and the folders where their raw files are stored as values.
+    extensions (list[str]): The file extensions to catalog (e.g. ["xls", "csv"]).
+
+    Returns:
+    dict[str, int]: The number of 'added', 'updated', 'unchanged' and 'removed' files.
+    """
+    extensions = [extension.lower() for extension in extensions]
+    suffixes = tuple(f".{extension}" for extension in extensions)
+    stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+    rows = []
+    removed = []
+
+    for source_type, folder_path in source_folders.items():
+        # Only the rows this refresh can see: same source, under the folder and with one of the extensions
+        prefix = os.path.join(str(folder_path), '')
+        known = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in connection.execute(
+                f"SELECT path, size, mtime_ns FROM raw_files "
+                f"WHERE source_type = ? AND substr(path, 1, ?) = ? AND extension IN ({', '.join('?' * len(extensions))})",
+                [source_type, len(prefix), prefix, *extensions]
+            )
+        }
+        seen = set()
+        errors = []
+        for entry in _scan_files(folder_path, errors):
+            if not entry.name.lower().endswith(suffixes):
+                continue
+            seen.add(entry.path)
+            stat = entry.stat()
+            if known.get(entry.path) == (stat.st_size, stat.st_mtime_ns):
+                stats['unchanged'] += 1
+                continue
+
+            start_time, end_time = None, None
+            reader = TIME_RANGE_READERS.get(source_type)
+            if reader is not None:
+                try:
+                    start_time, end_time = reader(entry.path)
+                except Exception as e:
+                    logging.warning(f"Time range of '{entry.path}' could not be read: {e}")
+
+            substation = get_substation_name(entry.path)
+            rows.append((
+                entry.path,
+                stat.st_size,
+                stat.st_mtime_ns,
+                _file_sha1(entry.path),
+                substation.upper() if substation else None,
+                source_type,
+                entry.name.rsplit('.', 1)[-1].lower(),
+                start_time.isoformat(sep=' ') if start_time else None,
+                end_time.isoformat(sep=' ') if end_time else None,
+            ))
+            stats['updated' if entry.path in known else 'added'] += 1
+        if not errors:
+            removed.extend((path,) for path in known if path not in seen)
+
+    stats['removed'] = len(removed)
+
+    with connection:
+        connection.executemany("INSERT OR REPLACE INTO raw_files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        connection.executemany("DELETE FROM raw_files WHERE path = ?", removed)
+
+    return stats
+
+# %%
+def refresh_all(
+    catalog_path: Union[str, Path],
+    source_folders: dict[str, Union[str, Path]],
+    extensions: list[str]
+    ) -> dict[str, int]:
+    """
+    Refreshes the catalog with the raw files of every source (e.g. CATALOG_SOURCE_FOLDERS), so the lookups that
+    follow (find_raw_files) find every file unchanged. The folders that do not exist are skipped.
+
+    Parameters:
+    catalog_path (str | Path): The path to the SQLite catalog (e.g. CATALOG_PATH).
+    source_folders (dict[str, str | Path]): A dictionary with source types as keys and their folders as values.
+    extensions (list[str]): The file extensions to catalog (e.g. EXTENTIONS).
+
+    Returns:
+    dict[str, int]: The number of 'added', 'updated', 'unchanged' and 'removed' files.
+    """
+    existing = {source_type: folder for source_type, folder in source_folders.items() if Path(folder).is_dir()}
+    for source_type in [source_type for source_type in source_folders if source_type not in existing]:
+        logging.info(f"Folder of source '{source_type}' not found, not cataloged: {source_folders[source_type]}")
+    if not existing:
+        return {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+
+    connection = open_catalog(catalog_path)
+    try:
+        return refresh_catalog(connection, existing, extensions)
+    finally:
+        connection.close()
+
+# %%
+@profile_stage
+def query_catalog(
+    connection: sqlite3.Connection,
+    source_type: Union[str, None] = None,
+    substation: Union[str, None] = None,
+    start: Union[str, datetime.datetime, None] = None,
+    end: Union[str, datetime.datetime, None] = None,
+    include_unknown_range: bool = True,
+    folder_path: Union[str, Path, None] = None,
+    extension: Union[str, None] = None
+    ) -> pd.DataFrame:
+    """
+    Queries the catalog for the raw files matching a source type, a substation and overlapping a time range.
+
+    Example: all meter files overlapping March 2025
+        query_catalog(connection, 'meter', start='2025-03-01', end='2025-04-01')
+
+    Parameters:
+    connection (sqlite3.Connection): The connection to the catalog.
+    source_type (str | None): The source type ('inverter', 'sensor', 'meter', 'prmte', ...). Default is None (all).
+    substation (str | None): The substation name (e.g. 'EMELDA_1', 'EMELDA_FT1'). Default is None (all).
+    start (str | datetime | None): The start of the time range (inclusive). Default is None (unbounded).
+    end (str | datetime | None): The end of the time range (exclusive). Default is None (unbounded).
+    include_unknown_range (bool): Whether to include files whose time range is unknown. Default is True.
+    folder_path (str | Path | None): Only the files under this folder, as given to refresh_catalog. Default is None (all).
+    extension (str | None): Only the files with this extension (e.g. "xls"). Default is None (all).
+
+    Returns:
+    pandas.DataFrame: The catalog rows of the matching files, sorted by start time and path.
+    """
+    conditions = []
+    parameters = []
+    if source_type is not None:
+        conditions.append("source_type = ?")
+        parameters.append(source_type)
+    if substation is not None:
+        conditions.append("substation = ?")
+        parameters.append(substation.upper())
+    if folder_path is not None:
+        prefix = os.path.join(str(folder_path), '')
+        conditions.append("substr(path, 1, ?) = ?")
+        parameters.extend([len(prefix), prefix])
+    if extension is not None:
+        conditions.append("extension = ?")
+        parameters.append(extension.lower())
+
+    range_conditions = []
+    if end is not None:
+        range_conditions.append("start_time < ?")
+        parameters.append(pd.Timestamp(end).isoformat(sep=' '))
+    if start is not None:
+        range_conditions.append("end_time >= ?")
+        parameters.append(pd.Timestamp(start).isoformat(sep=' '))
+    if range_conditions:
+        range_clause = " AND ".join(range_conditions)
+        if include_unknown_range:
+            range_clause = f"(({range_clause}) OR start_time IS NULL)"
+        conditions.append(range_clause)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    df = pd.read_sql_query(
+        f"SELECT * FROM raw_files {where} ORDER BY start_time, path",
+        connection,
+        params=parameters
+    )
+    df['start_time'] = pd.to_datetime(df['start_time'])
+    df['end_time'] = pd.to_datetime(df['end_time'])
+    return df
+
+# %%
+@profile_stage
+def find_raw_files(
+    folder_path: Union[str, Path],
+    extension: str,
+    source_type: str,
+    catalog_path: Union[str, Path, None] = None,
+    start: Union[str, datetime.datetime, None] = None,
+    end: Union[str, datetime.datetime, None] = None
+    ) -> pd.DataFrame:
+    """
+    Finds the raw files of a source under a folder (and its subfolders) with the catalog: the folder is
+    refreshed incrementally (refresh_catalog) and the files are selected with an index query (query_catalog),
+    keeping only the files overlapping the time range when it is given.
+
+    Without a catalog, the folder is globbed (find_files_with_extension) and the time range is not used.
+    A folder that does not exist has no files (the catalog, usually inside the raw data folder, is not opened).
+
+    Parameters:
+    folder_path (str | Path): The folder with the raw files.
+    extension (str): The extension of the raw files (e.g. "xls").
+    source_type (str): The source type ('inverter', 'sensor', 'meter', ...).
+    catalog_path (str | Path | None): The path to the SQLite catalog (e.g. CATALOG_PATH). Default is None (glob).
+    start (str | datetime | None): The start of the time range (inclusive). Default is None (unbounded).
+    end (str | datetime | None): The end of the time range (exclusive). Default is None (unbounded).
+
+    Returns:
+    pandas.DataFrame: The columns 'path', 'size', 'mtime_ns' and 'substation' (upper case or None), sorted by path.
+    """
+    columns = ['path', 'size', 'mtime_ns', 'substation']
+    if not Path(folder_path).is_dir():
+        logging.warning(f"Folder not found: {folder_path}")
+        return pd.DataFrame(columns=columns)
+
+    if catalog_path is None:
+        rows = []
+        for file_path in find_files_with_extension(str(folder_path), extension, search_subfolders=True):
+            stat = os.stat(file_path)
+            substation = get_substation_name(file_path)
+            rows.append((file_path, stat.st_size, stat.st_mtime_ns, substation.upper() if substation else None))
+        return pd.DataFrame(rows, columns=columns).sort_values(by='path').reset_index(drop=True)
+
+    connection = open_catalog(catalog_path)
+    try:
+        refresh_catalog(connection, {source_type: folder_path}, [extension])
+        df = query_catalog(
+            connection, source_type, start=start, end=end, folder_path=folder_path, extension=extension
+        )
+    finally:
+        connection.close()
+    return df[columns].sort_values(by='path').reset_index(drop=True)
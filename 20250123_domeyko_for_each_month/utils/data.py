@@ -5,8 +5,10 @@ import logging
 import datetime
 import re
 from typing import Union
+from .profiling import profile_stage
 
 # Read an Excel file, delete all columns that we will not use and create a datetime column.
+@profile_stage
 def read_xls_file(
     filename: str
     ) -> pd.DataFrame:
@@ -53,6 +55,7 @@ def clean_prmte(
     return float(value)
 
 # %%
+@profile_stage
 def filter_prmte(
     df: pd.DataFrame
     ) -> pd.DataFrame:
@@ -87,6 +90,7 @@ def filter_prmte(
     return df
 
 # %%
+@profile_stage
 def transform_column_to_datetime(
     df: pd.DataFrame, 
     n_column: int = 0
@@ -118,6 +122,7 @@ def transform_column_to_datetime(
     )
 
 # %%
+@profile_stage
 def columns_to_numeric(
     df: pd.DataFrame
     ) -> pd.DataFrame:
@@ -136,6 +141,7 @@ def columns_to_numeric(
     return df
 
 # %%
+@profile_stage
 def create_range_datetimes(
     str_start_date: str, 
     str_end_date: str, 
@@ -164,6 +170,7 @@ def create_range_datetimes(
     return df
 
 # %%
+@profile_stage
 def set_date_as_index(
     df: pd.DataFrame
     ) -> pd.DataFrame:
@@ -188,11 +195,14 @@ def set_date_as_index(
     return df
 
 # %%
+@profile_stage
 def clean_dataframe(
     df: pd.DataFrame
     ) -> pd.DataFrame:
     """
     Drops rows with all NaN values and duplicate rows based on the 'date' column.
+    Duplicated dates with different values (e.g. the repeated hour at the end of DST in naive dates) are logged;
+    read the files with a timestamp rule (see read_scada_file) to keep them.
 
     Parameters:
     df (pandas.DataFrame): DataFrame to clean
@@ -200,10 +210,19 @@ def clean_dataframe(
     Returns:
     pandas.DataFrame: Cleaned DataFrame
     """
-    df = df.dropna(how='all').drop_duplicates(subset=['date'])
+    df = df.dropna(how='all')
+    repeated = df.duplicated(subset=['date'], keep=False)
+    conflicting = repeated & ~df.duplicated(keep=False) if repeated.any() else repeated
+    if conflicting.any():
+        logging.warning(
+            f"{int(conflicting.sum())} rows share a date with different values; only the first row of each date is kept "
+            f"({df.loc[conflicting, 'date'].min()} to {df.loc[conflicting, 'date'].max()})."
+        )
+    df = df.drop_duplicates(subset=['date'])
     return df
 
 # %%
+@profile_stage
 def merge_list(
     df_datetimes: pd.DataFrame, 
     list_df_to_merge: list[pd.DataFrame]
@@ -224,6 +243,7 @@ def merge_list(
     return df_merged
 
 # %%
+@profile_stage
 def combine_dataframes(
     df_list: list[pd.DataFrame]
     ) -> pd.DataFrame:
@@ -252,6 +272,7 @@ def combine_dataframes(
     return combined_df
 
 # %%
+@profile_stage
 def to_agg_period_beta(
     df: pd.DataFrame, 
     agg_period: int, 
@@ -292,12 +313,15 @@ def to_agg_period_beta(
     # Define a dictionary to map aggregation operations
     agg_dict = {column: operation for column, operation in agg_operations.items()}
 
-    # Group by the specified time period and apply the aggregation operations
-    df_aggregated = df.resample(f'{agg_period}min').agg(agg_dict).reset_index()
+    # Group by the specified time period and apply the aggregation operations.
+    # Whole days are resampled as calendar days, so with timezone-aware dates the DST days have 23 or 25 hours
+    freq = f'{agg_period // 1440}D' if agg_period % 1440 == 0 else f'{agg_period}min'
+    df_aggregated = df.resample(freq).agg(agg_dict).reset_index()
 
     return df_aggregated
 
 # %%
+@profile_stage
 def watt_to_energy(
     df: pd.DataFrame, 
     column_names: list[str],
@@ -328,6 +352,7 @@ def watt_to_energy(
     return df
 
 # %%
+@profile_stage
 def trim_column_names(
     df: pd.DataFrame
     ) -> pd.DataFrame:
@@ -349,6 +374,7 @@ def trim_column_names(
     return df_renamed
 
 # %%
+@profile_stage
 def rename_columns(
     df: pd.DataFrame, rename_dict: dict
     ) -> pd.DataFrame:
@@ -367,6 +393,7 @@ def rename_columns(
     return df_renamed
 
 # %%
+@profile_stage
 def check_columns_in_list(
     file_name: str,
     columns_list: list[str],
@@ -389,6 +416,7 @@ def check_columns_in_list(
     return "OK"
 
 # %%
+@profile_stage
 def filter_by_time_range(
     df: pd.DataFrame,
     start_time: datetime.time,
@@ -442,6 +470,7 @@ def get_substation_name(
     return match.group(0) if match else None
 
 # %%
+@profile_stage
 def replace_values_greater_than(
     dataframe: pd.DataFrame, 
     column_name: str, 
@@ -488,6 +517,7 @@ def replace_values_greater_than(
     return modified_dataframe
 
 # %%
+@profile_stage
 def nan_percentage_per_day(group: pd.DataFrame) -> pd.Series:
     """
     Calculate the percentage of NaN values for each column in a daily group,
@@ -0,0 +1,456 @@
+# %%
+import re
+import logging
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from typing import Union
+from .data import (
+    read_xls_file,
+    trim_column_names,
+    rename_columns,
+    clean_dataframe,
+    set_date_as_index,
+    combine_dataframes
+)
+from .catalog import find_raw_files
+from .rollup import indicator_matrix, inverter_cabin_groups
+from .timestamps import normalize_dataframe_dates, utc_to_local
+from .profiling import profile_stage
+
+# %%
+@profile_stage
+def read_scada_folder(
+    folder_path: Union[str, Path],
+    rename_dict: dict[str, str],
+    extension: str = "xls",
+    source_type: str = "meter",
+    catalog_path: Union[str, Path, None] = None
+    ) -> dict[Union[str, None], pd.DataFrame]:
+    """
+    Reads every SDI (SCADA) export in a folder (and its subfolders) and combines them per substation.
+
+    Used for the meters (INPUT_FOLDER_PATH_METERS) and generacion (INPUT_FOLDER_PATH_GENERACION) folders.
+    Each file is read with read_xls_file, its columns are trimmed and renamed with rename_dict and the
+    columns not in rename_dict are dropped. While rename_dict is empty (tags not defined yet) every column
+    is kept with its SCADA name. The files and their substation are found with find_raw_files
+    (the raw files catalog, or the file path with get_substation_name when there is no catalog).
+
+    Parameters:
+    folder_path (str | Path): The path to the folder with the raw files.
+    rename_dict (dict[str, str]): A dictionary with SCADA names as keys and tags as values (e.g. METERS_SCADA_TO_TAG).
+    extension (str): The extension of the raw files. Default is "xls".
+    source_type (str): The source type of the raw files in the catalog ('meter' or 'generacion'). Default is "meter".
+    catalog_path (str | Path | None): The raw files catalog (e.g. CATALOG_PATH). Default is None (glob).
+
+    Returns:
+    dict[str | None, pandas.DataFrame]: A dictionary with the substation names (upper case, None if not found in
+                                        the path) as keys and the combined DataFrames, indexed by date, as values.
+    """
+    tags = list(rename_dict.values())
+    if not rename_dict:
+        logging.warning(f"No tags defined for {folder_path}: the SCADA names of all the columns are kept")
+    dfs_per_substation: dict[Union[str, None], list[pd.DataFrame]] = {}
+
+    df_files = find_raw_files(folder_path, extension, source_type, catalog_path)
+    for file_path, substation in zip(df_files['path'], df_files['substation']):
+        df = read_xls_file(file_path)
+        df = trim_column_names(df)
+        df = rename_columns(df, rename_dict)
+        if rename_dict:
+            df = df[['date'] + [column for column in df.columns if column in tags]]
+        if len(df.columns) == 1:
+            logging.warning(f"{file_path}: none of the columns are in the list of tags")
+            continue
+        df = set_date_as_index(clean_dataframe(df))
+        dfs_per_substation.setdefault(substation, []).append(df)
+
+    return {
+        substation: combine_dataframes(dfs).sort_index()
+        for substation, dfs in dfs_per_substation.items()
+    }
+
+# %%
+@profile_stage
+def register_to_interval_energy(
+    df: pd.DataFrame,
+    column_names: list[str],
+    agg_period: int = 15
+    ) -> pd.DataFrame:
+    """
+    Transforms cumulative energy registers into the energy of each interval.
+
+    The DataFrame is first reindexed to the regular grid of agg_period minutes, so a missing timestamp
+    leaves NaN in the intervals around it instead of one difference spanning several intervals.
+    The energy of an interval is the difference between the register at the start of the next interval
+    and the register at its start. Negative differences (register resets or rollovers) are set to NaN.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame with a datetime index and the cumulative registers.
+    column_names (list[str]): List of column names with cumulative registers.
+    agg_period (int): The period of the registers in minutes (e.g. INPUT_METERS_AGG_PERIOD). Default is 15.
+
+    Returns:
+    pd.DataFrame: A copy of the DataFrame on the regular grid, with the specified columns transformed into
+                  interval energy.
+
+    Raises:
+    ValueError: If any of the specified columns are not found in the DataFrame, or the index is not datetime.
+    """
+    for column in column_names:
+        if column not in df.columns:
+            raise ValueError(f"Column '{column}' not found in the DataFrame")
+    if not pd.api.types.is_datetime64_any_dtype(df.index):
+        raise ValueError("DataFrame index must be a datetime type")
+
+    grid = pd.date_range(df.index.min(), df.index.max(), freq=f'{agg_period}min', name=df.index.name)
+    df = df.reindex(grid)
+    values = df[column_names].to_numpy(dtype=float)
+    energy = np.full_like(values, np.nan)
+    energy[:-1] = values[1:] - values[:-1]
+    energy[energy < 0] = np.nan
+    df[column_names] = energy
+
+    return df
+
+# %%
+def substation_groups(
+    dfs_per_substation: dict[Union[str, None], pd.DataFrame]
+    ) -> dict[str, str]:
+    """
+    Maps every column to its substation from the DataFrames returned by read_scada_folder.
+
+    Parameters:
+    dfs_per_substation (dict[str | None, pandas.DataFrame]): DataFrames per substation.
+
+    Returns:
+    dict[str, str]: A dictionary with column names as keys and substation names as values.
+    """
+    return {
+        column: substation
+        for substation, df in dfs_per_substation.items()
+        if substation is not None
+        for column in df.columns
+    }
+
+# %%
+@profile_stage
+def reconcile_energy(
+    df_production: pd.DataFrame,
+    df_reference: pd.DataFrame,
+    groups: dict[str, str],
+    reference_columns: dict[str, str]
+    ) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Compares, for each interval, the energy produced by the inverters of each group against a reference
+    energy measure of that group (meter, generacion or PRMTE) and computes the losses.
+
+    The inverter energy of every group is computed with a single matrix product of the
+    (intervals x inverters) array and an (inverters x groups) indicator matrix. An interval of a group
+    with any missing inverter or a missing reference is left as NaN.
+
+    losses [%] = (inverters energy - reference energy) / inverters energy * 100
+
+    Parameters:
+    df_production (pd.DataFrame): Inverter energy (e.g. kWh after watt_to_energy) with a datetime index.
+    df_reference (pd.DataFrame): Reference energy, in the same unit and periods, with a datetime index.
+    groups (dict[str, str]): A dictionary with inverter columns as keys and group names as values
+                             (see inverter_cabin_groups and substation_groups).
+    reference_columns (dict[str, str]): A dictionary with group names as keys and the reference column
+                                        of each group as values.
+
+    Returns:
+    tuple[pd.DataFrame, pd.DataFrame]:
+        - The losses [%] per interval, with one column per group.
+        - A summary per group with the inverters energy, the reference energy and the losses [%],
+          computed over the intervals where both are available.
+    """
+    group_names = [group for group in reference_columns if reference_columns[group] in df_reference.columns]
+    missing_groups = set(reference_columns) - set(group_names)
+    if missing_groups:
+        logging.warning(f"Reference columns not found for groups: {', '.join(sorted(map(str, missing_groups)))}")
+
+    inverter_columns = [column for column in groups if column in df_production.columns and groups[column] in group_names]
+    indicator = indicator_matrix(inverter_columns, groups, group_names)
+
+    values = df_production[inverter_columns].to_numpy(dtype=float)
+    produced = np.nan_to_num(values) @ indicator
+    produced[(np.isnan(values) @ indicator) > 0] = np.nan
+    produced[:, indicator.sum(axis=0) == 0] = np.nan
+
+    reference = (
+        df_reference[[reference_columns[group] for group in group_names]]
+        .reindex(df_production.index)
+        .to_numpy(dtype=float)
+    )
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        losses = np.where(produced > 0, (produced - reference) / produced * 100, np.nan)
+
+    df_losses = pd.DataFrame(losses, index=df_production.index, columns=group_names)
+
+    valid = ~np.isnan(produced) & ~np.isnan(reference)
+    produced_total = np.where(valid, produced, 0).sum(axis=0)
+    reference_total = np.where(valid, reference, 0).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        losses_total = np.where(produced_total > 0, (produced_total - reference_total) / produced_total * 100, np.nan)
+
+    df_summary = pd.DataFrame(
+        {
+            'inverters energy': produced_total,
+            'reference energy': reference_total,
+            'losses [%]': losses_total,
+            'valid intervals': valid.sum(axis=0),
+        },
+        index=pd.Index(group_names, name='group')
+    )
+
+    return df_losses, df_summary
+
+# %%
+@profile_stage
+def inverter_substations(
+    folder_path: Union[str, Path],
+    rename_dict: dict[str, str],
+    extension: str = "xls",
+    source_type: str = "inverter",
+    catalog_path: Union[str, Path, None] = None
+    ) -> dict[str, str]:
+    """
+    Maps every inverter tag to the substation of the SDI (SCADA) exports it is found in.
+
+    The substation is only known from the path of the files (see find_raw_files), so only the header of
+    every file is read.
+
+    Parameters:
+    folder_path (str | Path): The path to the folder with the inverter raw files (e.g. INPUT_FOLDER_PATH_INVERTERS).
+    rename_dict (dict[str, str]): A dictionary with SCADA names as keys and tags as values (e.g. INVERTERS_KW_SCADA_TO_TAG).
+    extension (str): The extension of the raw files. Default is "xls".
+    source_type (str): The source type of the raw files in the catalog. Default is "inverter".
+    catalog_path (str | Path | None): The raw files catalog (e.g. CATALOG_PATH). Default is None (glob).
+
+    Returns:
+    dict[str, str]: A dictionary with inverter tags as keys and substation names as values.
+    """
+    groups: dict[str, str] = {}
+
+    df_files = find_raw_files(folder_path, extension, source_type, catalog_path)
+    for file_path, substation in zip(df_files['path'], df_files['substation']):
+        if substation is None:
+            continue
+        df_header = rename_columns(trim_column_names(pd.read_excel(file_path, engine='xlrd', nrows=0)), rename_dict)
+        for column in df_header.columns:
+            if column in rename_dict.values() and groups.setdefault(column, substation) != substation:
+                logging.warning(f"{file_path}: '{column}' already found in substation {groups[column]}")
+
+    return groups
+
+# %%
+def generacion_cabin_groups(
+    columns: list[str],
+    inverters_scada_to_tag: dict[str, str]
+    ) -> dict[str, str]:
+    """
+    Maps every generacion column to its cabin ('Cabin N').
+
+    A column named with its tag ('Cabin N [kWh]') gives the cabin directly. A column still named with its
+    SCADA name ('PN1_S11_AN0000X') is matched through its station ('PN1_S11') with the inverters of that
+    station in inverters_scada_to_tag.
+
+    Parameters:
+    columns (list[str]): The generacion column names.
+    inverters_scada_to_tag (dict[str, str]): The inverter SCADA names and tags (e.g. INVERTERS_KW_SCADA_TO_TAG).
+
+    Returns:
+    dict[str, str]: A dictionary with generacion columns as keys and cabin names as values.
+    """
+    inverter_cabins = inverter_cabin_groups(list(inverters_scada_to_tag.values()))
+    station_cabins = {
+        scada_name.rsplit('_', 1)[0]: inverter_cabins[tag]
+        for scada_name, tag in inverters_scada_to_tag.items()
+        if tag in inverter_cabins
+    }
+
+    groups = {}
+    for column in columns:
+        match = re.match(r'^(Cabin \d+)\b', column)
+        cabin = match.group(1) if match else station_cabins.get(column.rsplit('_', 1)[0])
+        if cabin is not None:
+            groups[column] = cabin
+    return groups
+
+# %%
+def _sum_per_group(
+    df: pd.DataFrame,
+    groups: dict[str, str]
+    ) -> pd.DataFrame:
+    """
+    Sums the columns of every group, NaN in the intervals where any column of the group is missing.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame.
+    groups (dict[str, str]): A dictionary with column names as keys and group names as values.
+
+    Returns:
+    pd.DataFrame: The DataFrame with one column per group, in order of appearance.
+    """
+    columns = [column for column in df.columns if column in groups]
+    group_names = list(dict.fromkeys(groups[column] for column in columns))
+    indicator = indicator_matrix(columns, groups, group_names)
+
+    values = df[columns].to_numpy(dtype=float)
+    sums = np.nan_to_num(values) @ indicator
+    sums[(np.isnan(values) @ indicator) > 0] = np.nan
+    return pd.DataFrame(sums, index=df.index, columns=group_names)
+
+# %%
+def _to_utc_energy(
+    df: pd.DataFrame,
+    rule: dict,
+    cumulative: bool,
+    agg_period: int
+    ) -> pd.DataFrame:
+    """
+    Moves the energy of a SCADA source, indexed by its naive local dates, to a UTC int64 (ns) index at
+    the start of every agg_period interval (see normalize_dataframe_dates).
+
+    Cumulative registers are instant readings: they are normalized without the convention shift and then
+    differenced on the regular grid (see register_to_interval_energy), which gives the energy of the
+    interval starting at every reading. Intervals shorter than agg_period are summed.
+
+    Parameters:
+    df (pd.DataFrame): The energy (or cumulative registers) with a naive datetime index.
+    rule (dict): The timestamp rule of the source (see TIMESTAMP_RULES).
+    cumulative (bool): Whether the columns are cumulative registers (e.g. METERS_ARE_CUMULATIVE).
+    agg_period (int): The period of the output in minutes.
+
+    Returns:
+    pd.DataFrame: The interval energy indexed by the UTC start of the intervals ('utc').
+    """
+    interval = rule.get('interval_minutes', agg_period)
+    if cumulative:
+        rule = {**rule, 'timestamp_convention': 'start'}
+    df = normalize_dataframe_dates(df.rename_axis('date').reset_index(), rule)
+    df.index = pd.DatetimeIndex(df.index.to_numpy().view('datetime64[ns]'), name='utc')
+
+    if cumulative:
+        df = register_to_interval_energy(df, list(df.columns), interval)
+    if interval != agg_period:
+        df = df.resample(f'{agg_period}min').sum(min_count=max(agg_period // interval, 1))
+
+    df.index = pd.Index(df.index.asi8, name='utc')
+    return df
+
+# %%
+def _utc_to_local_index(
+    utc_index: pd.Index,
+    rule: dict
+    ) -> pd.DatetimeIndex:
+    """
+    Converts a UTC int64 (ns) index to the naive local dates of a timestamp rule, for reports.
+
+    Parameters:
+    utc_index (pd.Index): The UTC timestamps (int64 ns).
+    rule (dict): The timestamp rule (see TIMESTAMP_RULES).
+
+    Returns:
+    pd.DatetimeIndex: The naive local dates, named 'date'.
+    """
+    if rule.get('timezone') is not None:
+        local = utc_to_local(utc_index.to_numpy(), rule['timezone'])
+    else:
+        local = pd.DatetimeIndex((utc_index.to_numpy() + int(rule['utc_offset_hours'] * 3600 * 10**9)).view('datetime64[ns]'))
+    return local.rename('date')
+
+# %%
+@profile_stage
+def reconcile_month(
+    df_production: pd.DataFrame,
+    timestamp_rules: dict[str, dict],
+    inverters_folder: Union[str, Path],
+    inverters_rename_dict: dict[str, str],
+    generacion_folder: Union[str, Path],
+    generacion_rename_dict: dict[str, str],
+    meters_folder: Union[str, Path],
+    meters_rename_dict: dict[str, str],
+    meters_are_cumulative: bool = False,
+    agg_period: int = 15,
+    extension: str = "xls",
+    catalog_path: Union[str, Path, None] = None
+    ) -> dict[str, tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Reconciles the inverter energy of a month against the generacion (per cabin) and the meters (per substation).
+
+    1. The generacion and meter exports are read per substation (see read_scada_folder).
+    2. Every source is moved to UTC at the start of the intervals with its timestamp rule, so the meters
+       written at the end of the interval are compared with the inverter interval they measure. Cumulative
+       meter registers are differenced into interval energy (see register_to_interval_energy).
+    3. The generacion columns are grouped per cabin (see generacion_cabin_groups) and the meters per substation;
+       the inverters are grouped per cabin by their tag and per substation by the exports they are found in
+       (see inverter_substations).
+    4. reconcile_energy is run per level. A level without reference data is skipped with a warning.
+
+    Parameters:
+    df_production (pd.DataFrame): The inverter energy (kWh) per agg_period, indexed by its naive local start date
+                                  (e.g. the '15M' output of dom_get_inverters).
+    timestamp_rules (dict[str, dict]): The timestamp rules per source type (TIMESTAMP_RULES), with the 'inverter',
+                                       'generacion' and 'meter' rules.
+    inverters_folder (str | Path): The folder with the inverter raw files (e.g. INPUT_FOLDER_PATH_INVERTERS).
+    inverters_rename_dict (dict[str, str]): The inverter SCADA names and the tags of df_production
+                                            (e.g. INVERTERS_KW_SCADA_TO_TAG renamed with INVERTERS_KW_TO_KWH).
+    generacion_folder (str | Path): The folder with the generacion raw files (e.g. INPUT_FOLDER_PATH_GENERACION).
+    generacion_rename_dict (dict[str, str]): The generacion SCADA names and tags (e.g. GENERACION_SCADA_TO_TAG).
+    meters_folder (str | Path): The folder with the meter raw files (e.g. INPUT_FOLDER_PATH_METERS).
+    meters_rename_dict (dict[str, str]): The meter SCADA names and tags (e.g. METERS_SCADA_TO_TAG).
+    meters_are_cumulative (bool): Whether the meters export cumulative registers (METERS_ARE_CUMULATIVE).
+                                  Default is False.
+    agg_period (int): The period of df_production in minutes. Default is 15.
+    extension (str): The extension of the raw files. Default is "xls".
+    catalog_path (str | Path | None): The raw files catalog (e.g. CATALOG_PATH). Default is None (glob).
+
+    Returns:
+    dict[str, tuple[pd.DataFrame, pd.DataFrame]]: The 'cabin' and 'substation' levels as keys and the losses per
+                                                  interval (indexed by the naive local date) and the summary per
+                                                  group (see reconcile_energy) as values.
+    """
+    production_rule = {**timestamp_rules['inverter'], 'interval_minutes': agg_period}
+    df_production = normalize_dataframe_dates(df_production.rename_axis('date').reset_index(), production_rule)
+
+    references = {}
+    dfs_generacion = read_scada_folder(generacion_folder, generacion_rename_dict, extension, "generacion", catalog_path)
+    if dfs_generacion:
+        df_generacion = pd.concat(
+            [_to_utc_energy(df, timestamp_rules['generacion'], False, agg_period) for df in dfs_generacion.values()],
+            axis=1
+        )
+        df_generacion = _sum_per_group(df_generacion, generacion_cabin_groups(list(df_generacion.columns), inverters_rename_dict))
+        references['cabin'] = (inverter_cabin_groups(list(df_production.columns)), df_generacion)
+
+    dfs_meters = read_scada_folder(meters_folder, meters_rename_dict, extension, "meter", catalog_path)
+    dfs_meters = {substation: df for substation, df in dfs_meters.items() if substation is not None}
+    if dfs_meters:
+        df_meters = pd.concat(
+            [
+                _to_utc_energy(df, timestamp_rules['meter'], meters_are_cumulative, agg_period)
+                .sum(axis=1, min_count=len(df.columns))
+                .rename(substation)
+                for substation, df in dfs_meters.items()
+            ],
+            axis=1
+        )
+        groups = inverter_substations(inverters_folder, inverters_rename_dict, extension, "inverter", catalog_path)
+        references['substation'] = (groups, df_meters)
+
+    results = {}
+    for level in ['cabin', 'substation']:
+        if level not in references or references[level][1].empty:
+            logging.warning(f"No reference data for the {level} losses")
+            continue
+        groups, df_reference = references[level]
+        df_losses, df_summary = reconcile_energy(
+            df_production, df_reference, groups, {group: group for group in df_reference.columns}
+        )
+        df_losses.index = _utc_to_local_index(df_losses.index, production_rule)
+        results[level] = (df_losses, df_summary)
+
+    return results
@@ -9,7 +9,9 @@ from openpyxl import load_workbook
 from openpyxl.worksheet.worksheet import Worksheet
 from openpyxl.styles import Font, Border, Side, Alignment
 from openpyxl.utils.dataframe import dataframe_to_rows
+from .profiling import profile_stage
 # %%
+@profile_stage
 def create_and_open_workbook(full_path: WindowsPath) -> Workbook:
     """
     Deletes the existing workbook if it exists, creates a new workbook, and returns the workbook object.
@@ -35,6 +37,7 @@ def create_and_open_workbook(full_path: WindowsPath) -> Workbook:
     return wb
 
 # %%
+@profile_stage
 def write_dataframe_to_sheet(
     wb: Workbook, 
     df: pd.DataFrame, 
@@ -71,6 +74,7 @@ def write_dataframe_to_sheet(
     return sheet
 
 # %%
+@profile_stage
 def delete_default_sheet(wb: Workbook):
     """
     Deletes the sheet with the name "Sheet" or "Hoja1" from an existing workbook if it exists.
@@ -93,6 +97,7 @@ def delete_default_sheet(wb: Workbook):
             print(f"Sheet '{sheet_name}' deleted.")
 
 # %%
+@profile_stage
 def set_font_size(ws: Worksheet, font_size: int):
     """
     Sets the font size of all cells in the given sheet to the specified font size.
@@ -108,6 +113,7 @@ def set_font_size(ws: Worksheet, font_size: int):
             cell.font = Font(size=font_size)
 
 # %%
+@profile_stage
 def set_row_height(ws: Worksheet, row_number: int, height: float):
     """
     Sets the height of the specified row in the given sheet to the specified height.
@@ -121,6 +127,7 @@ def set_row_height(ws: Worksheet, row_number: int, height: float):
     ws.row_dimensions[row_number].height = height
 
 # %%
+@profile_stage
 def set_full_grid(ws: Worksheet):
     """
     Sets gridlines (borders) around the data range in the given sheet.
@@ -151,6 +158,7 @@ def set_full_grid(ws: Worksheet):
             cell.border = thin_border
 
 # %%
+@profile_stage
 def auto_adjust_and_align_first_column(ws: Worksheet) -> None:
     """
     Automatically adjusts the width of the first column of the given sheet and sets the alignment to left.
@@ -179,6 +187,7 @@ def auto_adjust_and_align_first_column(ws: Worksheet) -> None:
     ws.column_dimensions['A'].width = adjusted_width
 
 # %%
+@profile_stage
 def set_column_width_except_first(ws: Worksheet, width: float, adjustment_factor: float = 0.78):
     """
     Sets the width of the columns around the data range, except the first column, in the given sheet.
@@ -201,6 +210,7 @@ def set_column_width_except_first(ws: Worksheet, width: float, adjustment_factor
         ws.column_dimensions[col_letter].width = width + adjustment_factor
 
 # %%
+@profile_stage
 def set_row_bold(ws: Worksheet, row_number: int):
     """
     Sets the specified row of the given sheet to bold.
@@ -217,6 +227,7 @@ def set_row_bold(ws: Worksheet, row_number: int):
         cell.font = Font(bold=True)
 
 # %%
+@profile_stage
 def top_left_alignment_and_wrap_text_first_row(ws: Worksheet) -> None:
     """
     Sets the alignment of the first row of the given sheet to top-left and wraps the text.
@@ -233,6 +244,7 @@ def top_left_alignment_and_wrap_text_first_row(ws: Worksheet) -> None:
         cell.alignment = Alignment(horizontal='left', vertical='top', wrap_text=True)
 
 # %%
+@profile_stage
 def set_format_01(ws: Worksheet) -> None:
     """
     Applies a set of formatting operations to the workbook. The operations are as follows:
@@ -261,6 +273,7 @@ def set_format_01(ws: Worksheet) -> None:
     print(f"Worksheet {ws.title} formatted with format_01.")
 
 # %%
+@profile_stage
 def insert_dataframe_into_template(
         template_path: Path,
         data: Dict[str, pd.DataFrame]
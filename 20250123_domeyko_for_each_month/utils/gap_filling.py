@@ -0,0 +1,175 @@
+# %%
+import re
+import datetime
+import pandas as pd
+import numpy as np
+from typing import Union
+from .quality import run_lengths
+from .rollup import inverter_cabin_groups
+from .profiling import profile_stage
+
+# Fill provenance codes, one per cell
+FILL_ORIGINAL = 0
+FILL_INTERPOLATED = 1
+FILL_FROM_PEERS = 2
+FILL_MISSING = 3
+
+FILL_PROVENANCE_LABELS = {
+    FILL_ORIGINAL: 'original',
+    FILL_INTERPOLATED: 'interpolated',
+    FILL_FROM_PEERS: 'peers',
+    FILL_MISSING: 'missing',
+}
+
+# %%
+def nan_run_lengths(
+    values: np.ndarray
+    ) -> np.ndarray:
+    """
+    Computes, for every NaN cell of a 2D array, the length of the NaN span (along the rows) it belongs to.
+
+    Parameters:
+    values (np.ndarray): A (rows x columns) float array.
+
+    Returns:
+    np.ndarray: A (rows x columns) integer array with the length of the NaN span of each NaN cell, 0 elsewhere.
+    """
+    is_nan = np.isnan(values)
+    continues = np.zeros(values.shape, dtype=bool)
+    continues[1:] = is_nan[1:] & is_nan[:-1]
+    return np.where(is_nan, run_lengths(continues), 0)
+
+# %%
+def cabin_peer_groups(
+    columns: list[str]
+    ) -> dict[str, list[str]]:
+    """
+    Maps every inverter column to its sister inverters (the other inverters of the same cabin).
+
+    Parameters:
+    columns (list[str]): The inverter column names, named 'Cabin N inverter M [...]'.
+
+    Returns:
+    dict[str, list[str]]: A dictionary with inverter columns as keys and their peers as values.
+    """
+    groups = inverter_cabin_groups(columns)
+    return {
+        column: [peer for peer in groups if groups[peer] == cabin and peer != column]
+        for column, cabin in groups.items()
+    }
+
+# %%
+def nearest_peer_groups(
+    columns: list[str],
+    n_peers: int = 2
+    ) -> dict[str, list[str]]:
+    """
+    Maps every sensor column to the n nearest sensors (by cabin number) of the same kind,
+    e.g. 'Pyranometer POA cabin 04 [W/m2]' -> ['Pyranometer POA cabin 01 [W/m2]', 'Pyranometer POA cabin 07 [W/m2]'].
+
+    The kind of a sensor is its tag without the cabin number.
+
+    Parameters:
+    columns (list[str]): The sensor column names, containing 'cabin NN'.
+    n_peers (int): The number of peers of each sensor. Default is 2.
+
+    Returns:
+    dict[str, list[str]]: A dictionary with sensor columns as keys and their peers as values.
+    """
+    sensors = {}
+    for column in columns:
+        match = re.search(r'(?i)cabin (\d+)', column)
+        if match:
+            kind = column[:match.start()] + column[match.end():]
+            sensors.setdefault(kind, []).append((int(match.group(1)), column))
+
+    peers = {}
+    for same_kind in sensors.values():
+        for number, column in same_kind:
+            others = sorted(
+                (abs(other_number - number), other_number, other)
+                for other_number, other in same_kind if other != column
+            )
+            peers[column] = [other for _, _, other in others[:n_peers]]
+    return peers
+
+# %%
+@profile_stage
+def fill_gaps(
+    df: pd.DataFrame,
+    max_interpolation_gap: int = 5,
+    peer_groups: Union[dict[str, list[str]], None] = None,
+    day_start: datetime.time = datetime.time(6, 0, 0),
+    day_end: datetime.time = datetime.time(20, 0, 0)
+    ) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Fills the gaps (NaN spans) of every column and records where each value comes from.
+
+    1. Gaps of up to max_interpolation_gap rows are filled by time interpolation between the values
+       surrounding the gap.
+    2. Longer gaps between day_start and day_end are filled from the peers of the column (see
+       cabin_peer_groups and nearest_peer_groups): the mean of the available peers at that time,
+       scaled by the ratio between the column and its peers over the rows where both are available.
+    3. The remaining gaps are left as NaN.
+
+    NaN spans are found for all columns at once with a run-length kernel and the peer means are computed
+    with one matrix product, so there are no per-gap Python loops.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame to fill, with a datetime index.
+    max_interpolation_gap (int): The maximum length (rows) of the gaps filled by interpolation. Default is 5.
+    peer_groups (dict[str, list[str]] | None): A dictionary with columns as keys and their peers as values.
+                                               Default is None (long gaps are not filled).
+    day_start (datetime.time): The start of the daytime range (inclusive). Default is 06:00:00.
+    day_end (datetime.time): The end of the daytime range (inclusive). Default is 20:00:00.
+
+    Returns:
+    tuple[pd.DataFrame, pd.DataFrame]:
+        - The filled DataFrame.
+        - The fill provenance (int8 codes, see FILL_PROVENANCE_LABELS) with the same index and columns.
+
+    Raises:
+    ValueError: If the DataFrame index is not datetime.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(df.index):
+        raise ValueError("DataFrame index must be a datetime type")
+
+    columns = list(df.columns)
+    values = df.to_numpy(dtype=float)
+    gap_lengths = nan_run_lengths(values)
+    provenance = np.where(np.isnan(values), FILL_MISSING, FILL_ORIGINAL).astype(np.int8)
+
+    # 1. Short gaps: time interpolation inside the gaps only
+    interpolated = df.astype(float).interpolate(method='time', limit_area='inside').to_numpy()
+    short_gap = (gap_lengths > 0) & (gap_lengths <= max_interpolation_gap) & ~np.isnan(interpolated)
+    filled = np.where(short_gap, interpolated, values)
+    provenance[short_gap] = FILL_INTERPOLATED
+
+    # 2. Long daytime gaps: scaled mean of the peers, with a (columns x columns) peer matrix
+    if peer_groups:
+        peer_matrix = np.zeros((len(columns), len(columns)))
+        position = {column: n for n, column in enumerate(columns)}
+        for column, peers in peer_groups.items():
+            if column in position:
+                for peer in peers:
+                    if peer in position:
+                        peer_matrix[position[peer], position[column]] = 1
+
+        # Peers are taken from the original values, so filled values are not propagated
+        is_valid = ~np.isnan(values)
+        valid_peers = is_valid.astype(float) @ peer_matrix
+        with np.errstate(divide='ignore', invalid='ignore'):
+            peer_mean = np.where(valid_peers > 0, np.where(is_valid, values, 0) @ peer_matrix / valid_peers, np.nan)
+
+            both_valid = is_valid & ~np.isnan(peer_mean)
+            scale = np.where(both_valid, values, 0).sum(axis=0) / np.where(both_valid, peer_mean, 0).sum(axis=0)
+        scale = np.where(np.isfinite(scale), scale, 1.0)
+
+        daytime = (df.index.time >= day_start) & (df.index.time <= day_end)
+        long_gap = np.isnan(filled) & daytime[:, None] & ~np.isnan(peer_mean)
+        filled = np.where(long_gap, peer_mean * scale, filled)
+        provenance[long_gap] = FILL_FROM_PEERS
+
+    df_filled = pd.DataFrame(filled, index=df.index, columns=columns)
+    df_provenance = pd.DataFrame(provenance, index=df.index, columns=columns)
+    return df_filled, df_provenance
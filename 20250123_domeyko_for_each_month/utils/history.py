@@ -0,0 +1,107 @@
+# %%
+import os
+import re
+import logging
+import pandas as pd
+from pathlib import Path
+from typing import Union
+from concurrent.futures import ThreadPoolExecutor
+from .archive import ARCHIVE_INDEX_FILE, read_archive_index, load_month_archive
+from .profiling import profile_stage
+
+# %%
+def discover_months(
+    base_path: Union[str, Path],
+    archive_subfolder: Union[str, Path],
+    source: str
+    ) -> pd.DataFrame:
+    """
+    Discovers the processed months: the 'YYYY_MM' folders of base_path with a month archive of the source.
+
+    Parameters:
+    base_path (str | Path): The folder containing the 'YYYY_MM' month folders.
+    archive_subfolder (str | Path): The archive folder inside a month folder
+                                    (e.g. OUTPUT_FOLDER_ARCHIVE.relative_to(ROOT_PATH)).
+    source (str): The source archived (e.g. 'inverters', 'sensors').
+
+    Returns:
+    pd.DataFrame: One row per month with the columns 'month' (first day) and 'folder' (archive folder),
+                  sorted by month.
+    """
+    months = []
+    with os.scandir(base_path) as entries:
+        for entry in entries:
+            match = re.fullmatch(r'(\d{4})_(\d{2})', entry.name)
+            if not match or not entry.is_dir():
+                continue
+            folder = Path(entry.path) / archive_subfolder / source
+            if (folder / ARCHIVE_INDEX_FILE).exists():
+                months.append({'month': pd.Timestamp(int(match.group(1)), int(match.group(2)), 1), 'folder': folder})
+
+    return pd.DataFrame(months, columns=['month', 'folder']).sort_values(by='month').reset_index(drop=True)
+
+# %%
+@profile_stage
+def query_history(
+    base_path: Union[str, Path],
+    archive_subfolder: Union[str, Path],
+    source: str,
+    period: str,
+    tags: list[str],
+    start: Union[str, pd.Timestamp, None] = None,
+    end: Union[str, pd.Timestamp, None] = None,
+    workers: int = 8
+    ) -> pd.DataFrame:
+    """
+    Queries a set of tags over a time range across every processed month.
+
+    Months are pruned with the first/last timestamps and the tags recorded in each archive index, so only the
+    months overlapping the range and containing any of the tags are opened. The remaining months are read in
+    parallel threads; each one memory-maps its archive and reads only the rows of the range (binary search on
+    the sorted timestamps) and the columns of the requested tags.
+
+    Example, daily energy of the inverters of cabin 7 for the last 18 months:
+        query_history(Path('.'), OUTPUT_FOLDER_ARCHIVE.relative_to(ROOT_PATH), 'inverters', '1D',
+                      [f'Cabin 7 inverter {n} [kWh]' for n in range(1, 5)], start='2023-07-01', end='2025-01-01')
+
+    Parameters:
+    base_path (str | Path): The folder containing the 'YYYY_MM' month folders.
+    archive_subfolder (str | Path): The archive folder inside a month folder.
+    source (str): The source archived (e.g. 'inverters', 'sensors').
+    period (str): The period (e.g. '15M', '1H', '1D').
+    tags (list[str]): The tags to read. Tags missing in a month are returned as NaN for that month.
+    start (str | Timestamp | None): The start of the time range (inclusive). Default is None (unbounded).
+    end (str | Timestamp | None): The end of the time range (exclusive). Default is None (unbounded).
+    workers (int): The number of months read in parallel. Default is 8.
+
+    Returns:
+    pd.DataFrame: The concatenated result indexed by date, with one column per tag.
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    selected = []
+    for folder in discover_months(base_path, archive_subfolder, source)['folder']:
+        metadata = read_archive_index(folder).get(period)
+        if metadata is None or metadata['start'] is None:
+            continue
+        if end is not None and pd.Timestamp(metadata['start']) >= end:
+            continue
+        if start is not None and pd.Timestamp(metadata['end']) < start:
+            continue
+        month_tags = [tag for tag in tags if tag in set(metadata['tags'])]
+        if month_tags:
+            selected.append((folder, month_tags))
+
+    if not selected:
+        logging.warning(f"No processed months of '{source}' ({period}) match the query.")
+        return pd.DataFrame(columns=tags, index=pd.DatetimeIndex([], name='date'), dtype=float)
+
+    def read_month(item):
+        folder, month_tags = item
+        return load_month_archive(folder, period, start, end, month_tags)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        dfs = list(executor.map(read_month, selected))
+
+    return pd.concat([df.reindex(columns=tags) for df in dfs]).sort_index()
@@ -0,0 +1,197 @@
+# %%
+import re
+import pandas as pd
+import numpy as np
+from typing import Union
+from .profiling import profile_stage
+
+KPI_NAMES = ['PR', 'PR temperature corrected', 'specific yield', 'availability']
+
+# %%
+def _cabin_number(
+    tag: str
+    ) -> Union[int, None]:
+    """
+    Returns the cabin number of a tag containing 'cabin N' (case insensitive).
+
+    Parameters:
+    tag (str): The tag.
+
+    Returns:
+    int | None: The cabin number, or None if the tag has no cabin.
+    """
+    match = re.search(r'(?i)cabin (\d+)', tag)
+    return int(match.group(1)) if match else None
+
+# %%
+def nearest_sensor_assignment(
+    inverter_tags: list[str],
+    sensor_tags: list[str]
+    ) -> dict[str, str]:
+    """
+    Assigns to every inverter the sensor of the nearest cabin (by cabin number; ties go to the lower cabin).
+
+    Example: with POA pyranometers in cabins 01, 04, 07, ... 'Cabin 3 inverter 1 [kWh]' gets the cabin 04 sensor.
+
+    Parameters:
+    inverter_tags (list[str]): The inverter tags, named 'Cabin N inverter M [...]'.
+    sensor_tags (list[str]): The sensor tags, containing 'cabin NN' (e.g. 'Pyranometer POA cabin 04 [Wh/m2]').
+
+    Returns:
+    dict[str, str]: A dictionary with inverter tags as keys and sensor tags as values.
+
+    Raises:
+    ValueError: If none of the sensor tags has a cabin number.
+    """
+    sensors = [(number, tag) for tag in sensor_tags if (number := _cabin_number(tag)) is not None]
+    if not sensors:
+        raise ValueError("None of the sensor tags has a cabin number.")
+
+    sensor_cabins = np.array([number for number, _ in sensors])
+    assignment = {}
+    for tag in inverter_tags:
+        number = _cabin_number(tag)
+        if number is None:
+            continue
+        distance = np.abs(sensor_cabins - number) * 2 + (sensor_cabins > number)
+        assignment[tag] = sensors[int(np.argmin(distance))][1]
+    return assignment
+
+# %%
+def _gather(
+    df: pd.DataFrame,
+    assignment: dict[str, str],
+    inverter_tags: list[str]
+    ) -> np.ndarray:
+    """
+    Returns the (time x inverters) array of the sensor assigned to every inverter.
+
+    Parameters:
+    df (pd.DataFrame): The meteo DataFrame.
+    assignment (dict[str, str]): A dictionary with inverter tags as keys and sensor tags as values.
+    inverter_tags (list[str]): The inverter tags, in output order.
+
+    Returns:
+    np.ndarray: The sensor values per inverter.
+    """
+    sensor_tags = sorted(set(assignment[tag] for tag in inverter_tags))
+    position = {tag: n for n, tag in enumerate(sensor_tags)}
+    values = df[sensor_tags].to_numpy(dtype=float)
+    return values[:, [position[assignment[tag]] for tag in inverter_tags]]
+
+# %%
+@profile_stage
+def compute_kpis(
+    df_energy: pd.DataFrame,
+    df_meteo: pd.DataFrame,
+    dc_capacity_kwp: Union[dict[str, float], float],
+    poa_assignment: dict[str, str],
+    module_temperature_assignment: Union[dict[str, str], None] = None,
+    temperature_coefficient: float = -0.0035,
+    availability_threshold: float = 50,
+    agg_period: Union[int, None] = None,
+    stc_irradiance: float = 1000,
+    stc_module_temperature: float = 25
+    ) -> dict[str, pd.DataFrame]:
+    """
+    Computes the performance ratio, the temperature-corrected performance ratio, the specific yield and
+    the availability of every inverter from the aggregated energy and irradiation frames.
+
+    The KPIs are computed as array operations over the (intervals x inverters) arrays. Numerators and
+    denominators are summed per output period before dividing, so the KPIs are energy weighted:
+
+        PR = sum(E) / sum(P_dc * H_poa / G_stc)
+        PR temperature corrected = sum(E) / sum(P_dc * H_poa / G_stc * (1 + gamma * (T_module - 25)))
+        specific yield = sum(E) / P_dc
+        availability = intervals producing with POA > threshold / intervals with POA > threshold
+
+    The PRs only sum the intervals where both the energy and the irradiation are measured; the specific yield
+    sums all the measured energy. The availability leaves out the intervals without energy.
+
+    Parameters:
+    df_energy (pd.DataFrame): Inverter energy [kWh] per interval (e.g. the 15M frame), with a datetime index.
+    df_meteo (pd.DataFrame): Meteo frame of the same intervals with POA irradiation [Wh/m2] and module temperatures [°C].
+    dc_capacity_kwp (dict[str, float] | float): The DC capacity [kWp] of every inverter (e.g. INVERTERS_DC_CAPACITY_KWP),
+                                                or a single value for all of them.
+    poa_assignment (dict[str, str]): Inverter tags -> POA irradiation tag (see nearest_sensor_assignment).
+                                     The inverters in this dictionary are the ones evaluated.
+    module_temperature_assignment (dict[str, str] | None): Inverter tags -> module temperature tag. Default is None
+                                                           (the temperature-corrected PR is not computed).
+    temperature_coefficient (float): The power temperature coefficient gamma [1/°C]. Default is -0.0035.
+    availability_threshold (float): The POA irradiance [W/m2] above which the inverters must produce. Default is 50.
+    agg_period (int | None): The output period in minutes (e.g. 1440 for daily KPIs). Default is None (one row for
+                             the whole frame).
+    stc_irradiance (float): The STC irradiance [W/m2]. Default is 1000.
+    stc_module_temperature (float): The STC module temperature [°C]. Default is 25.
+
+    Returns:
+    dict[str, pd.DataFrame]: A dictionary with the KPI names (KPI_NAMES) as keys and DataFrames with one column
+                             per inverter as values.
+
+    Raises:
+    ValueError: If the DataFrame index is not datetime or the DC capacity of an inverter is missing.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(df_energy.index):
+        raise ValueError("DataFrame index must be a datetime type")
+
+    inverter_tags = [tag for tag in poa_assignment if tag in df_energy.columns]
+    if isinstance(dc_capacity_kwp, dict):
+        missing = [tag for tag in inverter_tags if tag not in dc_capacity_kwp]
+        if missing:
+            raise ValueError(f"DC capacity not found for: {', '.join(missing)}")
+        capacity = np.array([dc_capacity_kwp[tag] for tag in inverter_tags], dtype=float)
+    else:
+        capacity = np.full(len(inverter_tags), float(dc_capacity_kwp))
+
+    df_meteo = df_meteo.reindex(df_energy.index)
+    energy = df_energy[inverter_tags].to_numpy(dtype=float)
+    irradiation = _gather(df_meteo, poa_assignment, inverter_tags)
+
+    # Interval length in hours, to get the mean irradiance of each interval from its irradiation
+    interval_hours = pd.Series(df_energy.index).diff().dt.total_seconds().median() / 3600
+    irradiance = irradiation / interval_hours
+
+    valid = ~np.isnan(energy) & ~np.isnan(irradiation)
+    reference_energy = np.where(valid, capacity * irradiation / stc_irradiance, 0)
+    produced_energy = np.where(valid, energy, 0)
+
+    # Intervals without energy are unknown, not unavailable: they count in neither side of the availability
+    sunny = (irradiance > availability_threshold) & ~np.isnan(energy)
+
+    components = {
+        'energy': produced_energy,
+        # Every measured interval counts for the specific yield, with or without irradiation
+        'measured energy': np.nan_to_num(energy),
+        'reference energy': reference_energy,
+        'sunny intervals': sunny.astype(float),
+        'producing intervals': (sunny & (energy > 0)).astype(float),
+    }
+
+    if module_temperature_assignment is not None:
+        module_temperature = _gather(df_meteo, module_temperature_assignment, inverter_tags)
+        temperature_factor = 1 + temperature_coefficient * (module_temperature - stc_module_temperature)
+        valid_temperature = valid & ~np.isnan(module_temperature)
+        components['energy temperature'] = np.where(valid_temperature, energy, 0)
+        components['reference energy temperature'] = np.where(valid_temperature, reference_energy * temperature_factor, 0)
+
+    # Sum every component per output period
+    sums = {}
+    for name, values in components.items():
+        df_component = pd.DataFrame(values, index=df_energy.index, columns=inverter_tags)
+        if agg_period is None:
+            sums[name] = df_component.sum().to_frame().T
+        else:
+            sums[name] = df_component.resample(f'{agg_period}min').sum()
+
+    def ratio(numerator: pd.DataFrame, denominator: pd.DataFrame) -> pd.DataFrame:
+        return numerator / denominator.where(denominator > 0)
+
+    kpis = {
+        'PR': ratio(sums['energy'], sums['reference energy']),
+        'specific yield': sums['measured energy'] / capacity,
+        'availability': ratio(sums['producing intervals'], sums['sunny intervals']),
+    }
+    if module_temperature_assignment is not None:
+        kpis['PR temperature corrected'] = ratio(sums['energy temperature'], sums['reference energy temperature'])
+
+    return {name: kpis[name] for name in KPI_NAMES if name in kpis}
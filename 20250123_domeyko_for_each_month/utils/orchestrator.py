@@ -0,0 +1,225 @@
+# %%
+import asyncio
+import logging
+import functools
+import pandas as pd
+from pathlib import Path
+from typing import Union
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from .pipeline import (
+    PipelineJob,
+    EXIT_OK,
+    EXIT_VALIDATION_FAILED,
+    check_date_range,
+    find_job_files,
+    read_scada_file,
+    combine_on_range,
+    wall_clock_outputs,
+    write_outputs_overlapped
+)
+from .archive import write_month_archive
+from .profiling import log_profile_summary, run_profiled, add_profile_records
+
+# %%
+def _read_bytes(
+    file_path: str
+    ) -> bytes:
+    """
+    Reads the content of a file (I/O stage, run in the thread pool).
+
+    Parameters:
+    file_path (str): The path to the file.
+
+    Returns:
+    bytes: The content of the file.
+    """
+    return Path(file_path).read_bytes()
+
+# %%
+def _combine_and_aggregate(
+    job: PipelineJob,
+    dfs: list[pd.DataFrame],
+    str_start_date: str,
+    str_end_date: str
+    ) -> list[tuple[str, pd.DataFrame]]:
+    """
+    Combines the parsed files of a job and runs its aggregation (CPU stage, run in a thread of the main process
+    so the parsed month is not pickled into a worker).
+
+    Parameters:
+    job (PipelineJob): The job.
+    dfs (list[pd.DataFrame]): The parsed and cleaned DataFrames of every file.
+    str_start_date (str): The start date in the format '%d-%m-%Y'.
+    str_end_date (str): The end date in the format '%d-%m-%Y'.
+
+    Returns:
+    list[tuple[str, pd.DataFrame]]: The (name, DataFrame) outputs of the job, or an empty list if there is
+                                    no data in the date range.
+    """
+    df = combine_on_range(dfs, str_start_date, str_end_date, job.input_agg_period)
+    if df.dropna(how='all').empty:
+        return []
+    return list(wall_clock_outputs(job.aggregate(df, str_start_date, str_end_date)))
+
+# %%
+async def _run_job(
+    job: PipelineJob,
+    str_start_date: str,
+    str_end_date: str,
+    output_format: str,
+    io_pool: ThreadPoolExecutor,
+    cpu_pool: ProcessPoolExecutor,
+    queue_size: int,
+    reuse_outputs: bool = False
+    ) -> tuple[int, list[Path]]:
+    """
+    Runs one job: reads its files in the thread pool, hands them through a bounded queue to parsers running
+    in the process pool, aggregates in a thread and writes the outputs in the thread pool.
+
+    At most queue_size files wait in the queue and at most queue_size are being parsed, so a slow CPU stage
+    blocks the reads (backpressure) and memory stays bounded.
+
+    Parameters:
+    job (PipelineJob): The job.
+    str_start_date (str): The start date in the format '%d-%m-%Y'.
+    str_end_date (str): The end date in the format '%d-%m-%Y'.
+    output_format (str): "xlsx" or "csv".
+    io_pool (ThreadPoolExecutor): The pool reading files and writing outputs.
+    cpu_pool (ProcessPoolExecutor): The pool parsing files.
+    queue_size (int): The maximum number of files waiting to be parsed, and being parsed.
+    reuse_outputs (bool): Whether to skip the unchanged sheets of the xlsx workbook. Default is False.
+
+    Returns:
+    tuple[int, list[Path]]: The exit code of the job and the paths of the written files.
+    """
+    loop = asyncio.get_running_loop()
+    file_paths = find_job_files(job, str_start_date, str_end_date)
+    if not file_paths:
+        logging.error(f"{job.name}: no .{job.extension} files found in {job.input_folder}")
+        return EXIT_VALIDATION_FAILED, []
+    logging.info(f"{job.name}: parsing {len(file_paths)} files from {job.input_folder}")
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    parsing = asyncio.Semaphore(queue_size)
+    parser = functools.partial(read_scada_file, rename_dict=job.rename_dict, timestamp_rule=job.timestamp_rule)
+
+    async def read_files():
+        for file_path in file_paths:
+            data = await loop.run_in_executor(io_pool, _read_bytes, file_path)
+            await queue.put((file_path, data))
+        await queue.put(None)
+
+    async def parse_file(file_path: str, data: bytes):
+        try:
+            # The profile records of the worker are sent back with the result
+            result, records = await loop.run_in_executor(
+                cpu_pool, functools.partial(run_profiled, parser, file_path, data=data)
+            )
+            add_profile_records(records)
+            return result
+        finally:
+            parsing.release()
+
+    async def parse_files():
+        tasks = []
+        while (item := await queue.get()) is not None:
+            await parsing.acquire()
+            tasks.append(asyncio.ensure_future(parse_file(*item)))
+        return await asyncio.gather(*tasks)
+
+    _, results = await asyncio.gather(read_files(), parse_files())
+
+    errors = [message for _, message in results if message != "OK"]
+    if errors:
+        for error in errors:
+            logging.error(f"{job.name}: {error}")
+        return EXIT_VALIDATION_FAILED, []
+
+    # The parsed DataFrames stay in this process: sending the whole month to a worker would copy it
+    outputs = await loop.run_in_executor(
+        None, _combine_and_aggregate, job, [df for df, _ in results], str_start_date, str_end_date
+    )
+    if not outputs:
+        logging.error(f"{job.name}: no data between {str_start_date} and {str_end_date} in {job.input_folder}")
+        return EXIT_VALIDATION_FAILED, []
+    logging.info(f"{job.name}: aggregated, writing {job.output_path}")
+
+    written = await loop.run_in_executor(
+        io_pool, write_outputs_overlapped, outputs, job.output_path, output_format, reuse_outputs
+    )
+    if job.archive_folder is not None:
+        written.append(await loop.run_in_executor(io_pool, write_month_archive, job.archive_folder, dict(outputs)))
+    for path in written:
+        logging.info(f"{job.name}: output written: {path}")
+    return EXIT_OK, written
+
+# %%
+async def run_jobs_async(
+    jobs: list[PipelineJob],
+    str_start_date: str,
+    str_end_date: str,
+    output_format: str = "xlsx",
+    io_workers: int = 4,
+    cpu_workers: Union[int, None] = None,
+    queue_size: int = 4,
+    reuse_outputs: bool = False
+    ) -> dict[str, int]:
+    """
+    Runs several jobs (e.g. inverters and sensors) concurrently with overlapped I/O and computation.
+
+    File reads and output writes run in a thread pool, parsing in a process pool and aggregation in a thread.
+    Each job moves on to its own aggregation and writing as soon as its files are parsed, so the
+    sensors workbook can be written while the inverters are still being aggregated.
+
+    Parameters:
+    jobs (list[PipelineJob]): The jobs to run.
+    str_start_date (str): The start date in the format '%d-%m-%Y'.
+    str_end_date (str): The end date in the format '%d-%m-%Y'.
+    output_format (str): "xlsx" or "csv". Default is "xlsx".
+    io_workers (int): The number of threads reading files and writing outputs. Default is 4.
+    cpu_workers (int | None): The number of processes parsing files. Default is None (number of CPUs).
+    queue_size (int): The maximum number of files read but not yet parsed, and being parsed, per job. Default is 4.
+    reuse_outputs (bool): Whether to skip the unchanged sheets of the xlsx workbooks. Default is False.
+
+    Returns:
+    dict[str, int]: A dictionary with the job names as keys and their exit codes as values
+                    (EXIT_VALIDATION_FAILED for every job if the date range is not valid).
+    """
+    message = check_date_range(str_start_date, str_end_date)
+    if message != "OK":
+        logging.error(message)
+        return {job.name: EXIT_VALIDATION_FAILED for job in jobs}
+
+    with ThreadPoolExecutor(max_workers=io_workers) as io_pool, ProcessPoolExecutor(max_workers=cpu_workers) as cpu_pool:
+        results = await asyncio.gather(*[
+            _run_job(job, str_start_date, str_end_date, output_format, io_pool, cpu_pool, queue_size, reuse_outputs)
+            for job in jobs
+        ])
+
+    log_profile_summary()
+    return {job.name: exit_code for job, (exit_code, _) in zip(jobs, results)}
+
+# %%
+def run_jobs(
+    jobs: list[PipelineJob],
+    str_start_date: str,
+    str_end_date: str,
+    output_format: str = "xlsx",
+    io_workers: int = 4,
+    cpu_workers: Union[int, None] = None,
+    queue_size: int = 4,
+    reuse_outputs: bool = False
+    ) -> int:
+    """
+    Runs run_jobs_async from synchronous code (scripts and notebooks without a running event loop).
+
+    Parameters:
+    See run_jobs_async.
+
+    Returns:
+    int: EXIT_OK if every job succeeded, EXIT_VALIDATION_FAILED otherwise.
+    """
+    exit_codes = asyncio.run(
+        run_jobs_async(jobs, str_start_date, str_end_date, output_format, io_workers, cpu_workers, queue_size, reuse_outputs)
+    )
+    return EXIT_OK if all(exit_code == EXIT_OK for exit_code in exit_codes.values()) else EXIT_VALIDATION_FAILED
@@ -0,0 +1,126 @@
+# %%
+import sys
+import json
+import inspect
+import logging
+import pandas as pd
+from pathlib import Path
+from typing import Callable
+from openpyxl import load_workbook
+from .excel import create_and_open_workbook, write_dataframe_to_sheet, delete_default_sheet, set_format_01
+from .stage_cache import fingerprint
+from .profiling import profile_stage
+
+# The manifest is written next to the workbook: '<workbook>.manifest.json'
+MANIFEST_SUFFIX = ".manifest.json"
+
+# %%
+def format_fingerprint(
+    format_function: Callable
+    ) -> str:
+    """
+    Fingerprints a sheet format (e.g. set_format_01) by its name and the source of its module (e.g. excel.py) only,
+    so a change in any of the helpers it calls (set_font_size, set_full_grid, ...) changes the fingerprint, while a
+    change anywhere else in the package (data.py, stage_cache.py, ...) keeps the cached sheets.
+
+    Parameters:
+    format_function (Callable): The function formatting a worksheet.
+
+    Returns:
+    str: The hexadecimal fingerprint.
+    """
+    module_name = format_function.__module__
+    module = sys.modules.get(module_name)
+    try:
+        module_source = inspect.getsource(module) if module is not None else ""
+    except (OSError, TypeError):
+        module_source = ""
+    return fingerprint(['format', module_name, format_function.__qualname__, module_source])
+
+# %%
+def _read_manifest(
+    output_path: Path
+    ) -> dict:
+    """
+    Reads the manifest of a workbook, if it still describes the file on disk (same size and mtime).
+
+    Parameters:
+    output_path (Path): The path of the workbook.
+
+    Returns:
+    dict: The manifest ({'size', 'mtime_ns', 'sheets': [[name, fingerprint], ...]}), or an empty dictionary.
+    """
+    manifest_path = output_path.with_name(output_path.name + MANIFEST_SUFFIX)
+    if not output_path.exists() or not manifest_path.exists():
+        return {}
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except ValueError:
+        return {}
+    stat = output_path.stat()
+    if manifest.get('size') != stat.st_size or manifest.get('mtime_ns') != stat.st_mtime_ns:
+        return {}
+    return manifest
+
+# %%
+@profile_stage
+def write_workbook_cached(
+    outputs: list[tuple[str, pd.DataFrame]],
+    output_path: Path,
+    format_function: Callable = set_format_01
+    ) -> bool:
+    """
+    Writes the outputs as the sheets of a formatted workbook, skipping the sheets that did not change.
+
+    Every sheet is fingerprinted by its name, its DataFrame (values, index and columns) and its format
+    (format_fingerprint). The fingerprints are stored in a manifest next to the workbook:
+        - If every fingerprint matches and the workbook was not modified since, nothing is written.
+        - If some sheets changed, the workbook is opened and only those sheets are rewritten and formatted;
+          the unchanged sheets keep their rendered cells and formats.
+        - Otherwise (no manifest, or the workbook was modified by hand) the workbook is written from scratch.
+
+    Parameters:
+    outputs (list[tuple[str, pd.DataFrame]]): Pairs of sheet name and DataFrame, in sheet order.
+    output_path (Path): The path of the output workbook (.xlsx).
+    format_function (Callable): The function formatting every written worksheet. Default is set_format_01.
+
+    Returns:
+    bool: True if the workbook was written, False if it was already up to date.
+    """
+    format_key = format_fingerprint(format_function)
+    sheets = [[name, fingerprint(name, df, format_key)] for name, df in outputs]
+
+    manifest = _read_manifest(output_path)
+    if manifest.get('sheets') == sheets:
+        logging.info(f"Workbook up to date, not written: {output_path}")
+        return False
+
+    cached = {name: key for name, key in manifest.get('sheets', [])}
+    if cached:
+        wb = load_workbook(output_path)
+        for name in wb.sheetnames:
+            if name not in dict(sheets):
+                wb.remove(wb[name])
+    else:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        wb = create_and_open_workbook(output_path)
+
+    rewritten = []
+    for (name, df), (_, key) in zip(outputs, sheets):
+        if cached.get(name) == key and name in wb.sheetnames:
+            continue
+        format_function(write_dataframe_to_sheet(wb, df, name))
+        rewritten.append(name)
+
+    delete_default_sheet(wb)
+    # Keep the order of the outputs
+    for position, (name, _) in enumerate(outputs):
+        wb.move_sheet(wb[name], position - wb.index(wb[name]))
+    wb.active = 0
+    wb.save(str(output_path))
+    logging.info(f"Workbook written ({', '.join(rewritten)} rewritten): {output_path}")
+
+    stat = output_path.stat()
+    manifest_path = output_path.with_name(output_path.name + MANIFEST_SUFFIX)
+    manifest_path.write_text(json.dumps({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sheets': sheets}, indent=2))
+    return True
@@ -0,0 +1,670 @@
+# %%
+import logging
+import argparse
+import datetime
+import functools
+import pandas as pd
+from io import BytesIO
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Callable, Iterable, Union
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from .data import (
+    read_xls_file,
+    trim_column_names,
+    rename_columns,
+    check_columns_in_list,
+    clean_dataframe,
+    combine_dataframes,
+    create_range_datetimes,
+    merge_list,
+    set_date_as_index
+)
+from .excel import (
+    create_and_open_workbook,
+    write_dataframe_to_sheet,
+    set_format_01,
+    delete_default_sheet
+)
+from .catalog import find_raw_files
+from .timestamps import localize_dataframe_dates, to_wall_clock
+from .archive import write_month_archive
+from .output_cache import write_workbook_cached
+from .stage_cache import Stage, StageCheckError, run_stages
+from .profiling import profile_stage, log_profile_summary, run_profiled, add_profile_records
+
+OUTPUT_FORMATS = ["xlsx", "csv"]
+
+# Modules called by the cached stages, besides pipeline itself, whose source is part of their fingerprint
+STAGE_CODE_MODULES = [f"{__package__}.data", f"{__package__}.catalog"]
+
+# Exit codes of the command line entry points
+EXIT_OK = 0
+EXIT_VALIDATION_FAILED = 1
+
+# %%
+@dataclass
+class PipelineJob:
+    """
+    Ingestion -> cleaning -> aggregation -> output of one source (e.g. inverters or sensors) for a period.
+
+    Attributes:
+    name (str): The name of the source, used in logs.
+    input_folder (Path): The folder with the raw files.
+    rename_dict (dict[str, str]): A dictionary with SCADA names as keys and tags as values.
+    aggregate (Callable): A module level function receiving the combined DataFrame and the start and end dates
+                          and yielding (name, DataFrame) pairs, one per output period.
+    output_path (Path): The path of the output workbook.
+    input_agg_period (int): The period of the raw data in minutes.
+    extension (str): The extension of the raw files. Default is "xls".
+    archive_folder (Path | None): The folder of the memory-mapped month archive of the outputs
+                                  (see write_month_archive). Default is None (no archive).
+    source_type (str): The source type of the raw files in the catalog (e.g. 'inverter'). Default is "".
+    catalog_path (Path | None): The raw files catalog used to find the raw files (see find_raw_files).
+                                Default is None (the input folder is globbed).
+    timestamp_rule (dict | None): The timestamp rule of the raw files (e.g. TIMESTAMP_RULES['inverter']), so the
+                                  repeated hour of the fall-back day is kept (see read_scada_file).
+                                  Default is None (naive dates, the repeated hour is dropped).
+    """
+    name: str
+    input_folder: Path
+    rename_dict: dict[str, str]
+    aggregate: Callable[[pd.DataFrame, str, str], Iterable[tuple[str, pd.DataFrame]]]
+    output_path: Path
+    input_agg_period: int
+    extension: str = "xls"
+    archive_folder: Union[Path, None] = None
+    source_type: str = ""
+    catalog_path: Union[Path, None] = None
+    timestamp_rule: Union[dict, None] = None
+
+# %%
+def build_arg_parser(
+    description: str,
+    default_start: str,
+    default_end: str
+    ) -> argparse.ArgumentParser:
+    """
+    Builds the argument parser shared by the dom_get_* command line entry points.
+
+    Parameters:
+    description (str): The description of the entry point.
+    default_start (str): The default start date in the format '%d-%m-%Y' (e.g. START_DATE).
+    default_end (str): The default end date in the format '%d-%m-%Y' (e.g. END_DATE).
+
+    Returns:
+    argparse.ArgumentParser: The argument parser.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--start", default=default_start, help="Start date, format dd-mm-yyyy (inclusive).")
+    parser.add_argument("--end", default=default_end, help="End date, format dd-mm-yyyy (exclusive).")
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes parsing raw files.")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default=OUTPUT_FORMATS[0], help="Output format.")
+    parser.add_argument("--archive", action="store_true", help="Also write the memory-mapped month archive.")
+    parser.add_argument("--no-catalog", action="store_true", help="Glob the raw folders instead of using the raw files catalog.")
+    parser.add_argument("--cache-dir", type=Path, default=None, help="Folder caching the parsed, combined and aggregated data.")
+    parser.add_argument("--reuse-outputs", action="store_true", help="Only rewrite the workbook sheets that changed.")
+    parser.add_argument("--cache-max-mb", type=int, default=2048, help="Maximum size of the cache in MB.")
+    return parser
+
+# %%
+def check_date_range(
+    str_start_date: str,
+    str_end_date: str
+    ) -> str:
+    """
+    Checks that the start and end dates are valid and the start date is before the end date.
+
+    Parameters:
+    str_start_date (str): The start date in the format '%d-%m-%Y'.
+    str_end_date (str): The end date in the format '%d-%m-%Y'.
+
+    Returns:
+    str: "OK" if the range is valid, or the error.
+    """
+    try:
+        start = datetime.datetime.strptime(str_start_date, "%d-%m-%Y")
+        end = datetime.datetime.strptime(str_end_date, "%d-%m-%Y")
+    except ValueError as e:
+        return f"Invalid date: {e}"
+    if start >= end:
+        return f"The start date {str_start_date} must be before the end date {str_end_date}"
+    return "OK"
+
+# %%
+def month_root_path(
+    str_start_date: str,
+    root_path: Path,
+    folder_path: Path
+    ) -> Path:
+    """
+    Rebases a folder of dom_constants (defined under ROOT_PATH) on the 'YYYY_MM' root of another start date.
+
+    Parameters:
+    str_start_date (str): The start date in the format '%d-%m-%Y'.
+    root_path (Path): The ROOT_PATH of dom_constants.
+    folder_path (Path): A folder of dom_constants under ROOT_PATH (e.g. INPUT_FOLDER_PATH_INVERTERS).
+
+    Returns:
+    Path: The same folder under the root of the given start date.
+    """
+    date_object = datetime.datetime.strptime(str_start_date, "%d-%m-%Y")
+    return Path(f"{date_object.year}_{date_object.month:02}") / folder_path.relative_to(root_path)
+
+# %%
+def read_scada_file(
+    file_path: str,
+    rename_dict: dict[str, str],
+    data: Union[bytes, None] = None,
+    timestamp_rule: Union[dict, None] = None
+    ) -> tuple[pd.DataFrame, str]:
+    """
+    Reads and cleans one SDI (SCADA) export: read_xls_file, trim_column_names, rename_columns and clean_dataframe.
+
+    With a timestamp rule, the dates are localized before cleaning (see localize_dataframe_dates), so the two
+    occurrences of the repeated hour of the fall-back day are kept instead of dropping the second one.
+
+    Parameters:
+    file_path (str): The path to the Excel file.
+    rename_dict (dict[str, str]): A dictionary with SCADA names as keys and tags as values.
+    data (bytes | None): The content of the file, if already read. Default is None (read from file_path).
+    timestamp_rule (dict | None): The timestamp rule of the file (e.g. TIMESTAMP_RULES['inverter']).
+                                  Default is None (naive dates).
+
+    Returns:
+    tuple[pandas.DataFrame, str]: The cleaned DataFrame and the result of check_columns_in_list ("OK" or the error).
+    """
+    df = read_xls_file(file_path if data is None else BytesIO(data))
+    df = trim_column_names(df)
+    df = rename_columns(df, rename_dict)
+    message = check_columns_in_list(Path(file_path).name, ['date'] + list(rename_dict.values()), list(df.columns))
+    if timestamp_rule is not None:
+        df = localize_dataframe_dates(df, timestamp_rule)
+    df = clean_dataframe(df)
+    return df, message
+
+# %%
+@profile_stage
+def read_files_in_parallel(
+    file_paths: list[str],
+    rename_dict: dict[str, str],
+    workers: Union[int, None] = None,
+    timestamp_rule: Union[dict, None] = None
+    ) -> tuple[list[pd.DataFrame], list[str]]:
+    """
+    Parses SDI (SCADA) exports in parallel processes with read_scada_file.
+
+    Parameters:
+    file_paths (list[str]): The paths to the Excel files.
+    rename_dict (dict[str, str]): A dictionary with SCADA names as keys and tags as values.
+    workers (int | None): The number of processes. Default is None (number of CPUs). 1 parses in this process.
+    timestamp_rule (dict | None): The timestamp rule of the files (see read_scada_file). Default is None.
+
+    Returns:
+    tuple[list[pandas.DataFrame], list[str]]: The cleaned DataFrames and the validation errors found.
+    """
+    reader = functools.partial(read_scada_file, rename_dict=rename_dict, timestamp_rule=timestamp_rule)
+    if workers == 1:
+        results = list(map(reader, file_paths))
+    else:
+        # The profile records of the workers are sent back with the results
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = []
+            for result, records in executor.map(functools.partial(run_profiled, reader), file_paths):
+                add_profile_records(records)
+                results.append(result)
+
+    dfs = [df for df, _ in results]
+    errors = [message for _, message in results if message != "OK"]
+    return dfs, errors
+
+# %%
+@profile_stage
+def combine_on_range(
+    dfs: list[pd.DataFrame],
+    str_start_date: str,
+    str_end_date: str,
+    agg_period: int
+    ) -> pd.DataFrame:
+    """
+    Combines the DataFrames of every file and merges them on the full range of datetimes,
+    so missing timestamps are kept as NaN. The end date is excluded. With timezone-aware dates
+    (see read_scada_file), the range steps in absolute time and has the repeated hour of the fall-back day.
+
+    Parameters:
+    dfs (list[pandas.DataFrame]): The cleaned DataFrames with the 'date' column.
+    str_start_date (str): The start date in the format '%d-%m-%Y'.
+    str_end_date (str): The end date in the format '%d-%m-%Y'.
+    agg_period (int): The period of the raw data in minutes.
+
+    Returns:
+    pandas.DataFrame: The combined DataFrame indexed by date.
+    """
+    df_combined = combine_dataframes([set_date_as_index(df) for df in dfs]).reset_index()
+    timezone = getattr(df_combined['date'].dtype, 'tz', None)
+    if timezone is None:
+        df_datetimes = create_range_datetimes(str_start_date, str_end_date, agg_period)
+        df_datetimes = df_datetimes[df_datetimes['date'] < pd.to_datetime(str_end_date, format='%d-%m-%Y')]
+    else:
+        start, end = [
+            pd.to_datetime(str_date, format='%d-%m-%Y').tz_localize(timezone, nonexistent='shift_forward')
+            for str_date in (str_start_date, str_end_date)
+        ]
+        df_datetimes = pd.DataFrame({'date': pd.date_range(start, end, freq=f'{agg_period}min', inclusive='left')})
+    df_datetimes['date'] = df_datetimes['date'].astype(df_combined['date'].dtype)
+    return set_date_as_index(merge_list(df_datetimes, [df_combined]))
+
+# %%
+def wall_clock_outputs(
+    outputs: Iterable[tuple[str, pd.DataFrame]]
+    ) -> Iterable[tuple[str, pd.DataFrame]]:
+    """
+    Converts the outputs of an aggregation to naive wall clock dates, as written in the reports (see to_wall_clock).
+
+    Parameters:
+    outputs (Iterable[tuple[str, pd.DataFrame]]): Pairs of name and DataFrame indexed by date.
+
+    Yields:
+    tuple[str, pd.DataFrame]: The name and the DataFrame with a naive index.
+    """
+    for name, df in outputs:
+        yield name, to_wall_clock(df)
+
+# %%
+def _write_xlsx_sheet(
+    wb,
+    df: pd.DataFrame,
+    ws_name: str
+    ) -> None:
+    """
+    Writes a DataFrame to a sheet of a workbook and applies set_format_01.
+
+    Parameters:
+    wb (Workbook): The openpyxl workbook object.
+    df (pd.DataFrame): The DataFrame to save.
+    ws_name (str): The name of the sheet.
+    """
+    ws = write_dataframe_to_sheet(wb, df, ws_name)
+    set_format_01(ws)
+
+# %%
+@profile_stage
+def write_outputs_overlapped(
+    outputs: Iterable[tuple[str, pd.DataFrame]],
+    output_path: Path,
+    output_format: str,
+    reuse_unchanged: bool = False
+    ) -> list[Path]:
+    """
+    Writes the outputs as they are produced, in a writer thread, while the next output is computed.
+
+    The outputs are consumed lazily: while the writer thread writes (and formats) one output, the
+    generator computes the next one in the calling thread. With reuse_unchanged, the xlsx workbook is
+    written with write_workbook_cached instead, so the sheets that did not change are not rewritten.
+
+    Parameters:
+    outputs (Iterable[tuple[str, pd.DataFrame]]): Pairs of sheet name (or file suffix) and DataFrame.
+    output_path (Path): The path of the output workbook (.xlsx). For csv, one file per output is written
+                        next to it, named '<stem>_<name>.csv'.
+    output_format (str): "xlsx" or "csv".
+    reuse_unchanged (bool): Whether to skip the unchanged sheets of the xlsx workbook. Default is False.
+
+    Returns:
+    list[Path]: The paths of the written files.
+
+    Raises:
+    ValueError: If the output format is not valid.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Invalid output format '{output_format}'. Valid formats are {', '.join(OUTPUT_FORMATS)}")
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if reuse_unchanged and output_format == "xlsx":
+        write_workbook_cached(list(outputs), output_path)
+        return [output_path]
+
+    written = []
+    futures = []
+
+    # A single writer thread keeps the writes in order and openpyxl objects in one thread
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        if output_format == "xlsx":
+            wb = create_and_open_workbook(output_path)
+            for name, df in outputs:
+                futures.append(writer.submit(_write_xlsx_sheet, wb, df, name))
+            futures.append(writer.submit(delete_default_sheet, wb))
+            futures.append(writer.submit(wb.save, str(output_path)))
+            written.append(output_path)
+        else:
+            for name, df in outputs:
+                csv_path = output_path.with_name(f"{output_path.stem}_{name}.csv")
+                futures.append(writer.submit(df.to_csv, csv_path))
+                written.append(csv_path)
+
+        # Raise any error of the writer thread
+        for future in futures:
+            future.result()
+
+    return written
+
+# %%
+def find_job_files(
+    job: PipelineJob,
+    str_start_date: Union[str, None] = None,
+    str_end_date: Union[str, None] = None
+    ) -> list[str]:
+    """
+    Returns the sorted raw files of a job, searching the subfolders of its input folder. With a catalog
+    (job.catalog_path), only the files overlapping the period are returned (see find_raw_files).
+
+    Parameters:
+    job (PipelineJob): The job.
+    str_start_date (str | None): The start date in the format '%d-%m-%Y'. Default is None (unbounded).
+    str_end_date (str | None): The end date in the format '%d-%m-%Y'. Default is None (unbounded).
+
+    Returns:
+    list[str]: The paths of the raw files.
+    """
+    df_files = find_raw_files(
+        job.input_folder,
+        job.extension,
+        job.source_type,
+        job.catalog_path,
+        pd.to_datetime(str_start_date, format='%d-%m-%Y') if str_start_date else None,
+        pd.to_datetime(str_end_date, format='%d-%m-%Y') if str_end_date else None
+    )
+    return df_files['path'].tolist()
+
+# %%
+def _list_raw_files(
+    input_folder: Path,
+    extension: str,
+    source_type: str,
+    catalog_path: Union[Path, None],
+    str_start_date: str,
+    str_end_date: str
+    ) -> list[tuple[str, int, int]]:
+    """
+    Lists the raw files of a folder with their size and modification time, so a changed file changes the fingerprint.
+
+    Parameters:
+    input_folder (Path): The folder with the raw files.
+    extension (str): The extension of the raw files.
+    source_type (str): The source type of the raw files in the catalog.
+    catalog_path (Path | None): The raw files catalog, or None to glob the folder (see find_raw_files).
+    str_start_date (str): The start date in the format '%d-%m-%Y'.
+    str_end_date (str): The end date in the format '%d-%m-%Y'.
+
+    Returns:
+    list[tuple[str, int, int]]: The sorted (path, size, mtime_ns) of the raw files.
+    """
+    df_files = find_raw_files(
+        input_folder,
+        extension,
+        source_type,
+        catalog_path,
+        pd.to_datetime(str_start_date, format='%d-%m-%Y'),
+        pd.to_datetime(str_end_date, format='%d-%m-%Y')
+    )
+    return list(zip(df_files['path'].tolist(), df_files['size'].tolist(), df_files['mtime_ns'].tolist()))
+
+# %%
+def _parse_raw_files(
+    files: list[tuple[str, int, int]],
+    rename_dict: dict[str, str],
+    timestamp_rule: Union[dict, None] = None,
+    workers: Union[int, None] = None
+    ) -> tuple[list[pd.DataFrame], list[str]]:
+    """
+    Stage wrapper of read_files_in_parallel.
+    """
+    return read_files_in_parallel([file_path for file_path, _, _ in files], rename_dict, workers, timestamp_rule)
+
+# %%
+def _combine_parsed(
+    parsed: tuple[list[pd.DataFrame], list[str]],
+    str_start_date: str,
+    str_end_date: str,
+    agg_period: int
+    ) -> pd.DataFrame:
+    """
+    Stage wrapper of combine_on_range.
+    """
+    return combine_on_range(parsed[0], str_start_date, str_end_date, agg_period)
+
+# %%
+def _aggregate_all(
+    df: pd.DataFrame,
+    aggregate: Callable[[pd.DataFrame, str, str], Iterable[tuple[str, pd.DataFrame]]],
+    str_start_date: str,
+    str_end_date: str
+    ) -> list[tuple[str, pd.DataFrame]]:
+    """
+    Stage wrapper of the aggregation of a job, collecting every output period in wall clock dates.
+    """
+    return list(wall_clock_outputs(aggregate(df, str_start_date, str_end_date)))
+
+# %%
+def _check_raw_files(
+    files: list[tuple[str, int, int]],
+    input_folder: Path,
+    extension: str
+    ) -> str:
+    """
+    Stage check of _list_raw_files: returns "OK" or an error message if no files were found.
+    """
+    return "OK" if files else f"No .{extension} files found in {input_folder}"
+
+# %%
+def _check_parsed(
+    parsed: tuple[list[pd.DataFrame], list[str]]
+    ) -> str:
+    """
+    Stage check of _parse_raw_files: returns "OK" or the errors of the files with unexpected columns, one per line.
+    """
+    return "\n".join(parsed[1]) if parsed[1] else "OK"
+
+# %%
+def _check_combined(
+    df: pd.DataFrame,
+    input_folder: Path,
+    str_start_date: str,
+    str_end_date: str
+    ) -> str:
+    """
+    Stage check of _combine_parsed: returns "OK" or an error message if there is no data in the date range.
+    """
+    return f"No data between {str_start_date} and {str_end_date} in {input_folder}" if df.dropna(how='all').empty else "OK"
+
+# %%
+def pipeline_stages(
+    args: argparse.Namespace,
+    job: PipelineJob
+    ) -> list[Stage]:
+    """
+    Describes run_pipeline as a stage graph for run_stages: files -> parse -> combine -> aggregate.
+
+    The 'files' stage runs every time and lists the raw files with their size and mtime; the other stages are
+    cached. Their fingerprints include the rename dict, the dates, the aggregation function (source code of
+    its module and the dom_constants mappings it imports) and the source of the modules the stages depend on:
+    pipeline (the stage wrappers), data and catalog (STAGE_CODE_MODULES). A new raw file re-parses, a changed
+    mapping re-aggregates and a change of the Excel format (excel.py) only rewrites the outputs.
+    Every stage is checked as in run_pipeline (files found, no unexpected columns, data in the date range).
+
+    Parameters:
+    args (argparse.Namespace): The parsed arguments (see build_arg_parser).
+    job (PipelineJob): The source to process.
+
+    Returns:
+    list[Stage]: The stages.
+    """
+    return [
+        Stage(
+            f"{job.name}_files", _list_raw_files,
+            params={
+                'input_folder': job.input_folder, 'extension': job.extension, 'source_type': job.source_type,
+                'catalog_path': job.catalog_path, 'str_start_date': args.start, 'str_end_date': args.end
+            },
+            cache=False, code_modules=STAGE_CODE_MODULES,
+            check=functools.partial(_check_raw_files, input_folder=job.input_folder, extension=job.extension)
+        ),
+        Stage(
+            f"{job.name}_parse", _parse_raw_files, inputs=[f"{job.name}_files"],
+            params={'rename_dict': job.rename_dict, 'timestamp_rule': job.timestamp_rule}, options={'workers': args.workers},
+            code_modules=STAGE_CODE_MODULES, check=_check_parsed
+        ),
+        Stage(
+            f"{job.name}_combine", _combine_parsed, inputs=[f"{job.name}_parse"],
+            params={'str_start_date': args.start, 'str_end_date': args.end, 'agg_period': job.input_agg_period},
+            code_modules=STAGE_CODE_MODULES,
+            check=functools.partial(
+                _check_combined, input_folder=job.input_folder, str_start_date=args.start, str_end_date=args.end
+            )
+        ),
+        Stage(
+            f"{job.name}_aggregate", _aggregate_all, inputs=[f"{job.name}_combine"],
+            params={'aggregate': job.aggregate, 'str_start_date': args.start, 'str_end_date': args.end},
+            code_modules=STAGE_CODE_MODULES
+        ),
+    ]
+
+# %%
+def compute_job_outputs(
+    args: argparse.Namespace,
+    job: PipelineJob
+    ) -> Union[list[tuple[str, pd.DataFrame]], None]:
+    """
+    Runs ingestion -> cleaning -> aggregation of one source and returns the outputs without writing them
+    (e.g. the inverter energy reconciled against the meters). With args.cache_dir the stage graph is evaluated
+    once through the cache, checking every stage as it is computed (see pipeline_stages); the stages upstream
+    of a cached aggregation are not loaded.
+
+    Parameters:
+    args (argparse.Namespace): The parsed arguments (see build_arg_parser), with a valid date range.
+    job (PipelineJob): The source to process.
+
+    Returns:
+    list[tuple[str, pandas.DataFrame]] | None: The (name, DataFrame) outputs, or None (errors logged) if no files
+                                               were found, any file has unexpected columns or there is no data
+                                               in the date range.
+    """
+    if getattr(args, 'cache_dir', None) is not None:
+        target = f"{job.name}_aggregate"
+        try:
+            return run_stages(pipeline_stages(args, job), [target], args.cache_dir, args.cache_max_mb * 2**20)[target]
+        except StageCheckError as error:
+            for message in str(error).splitlines():
+                logging.error(message)
+            return None
+
+    file_paths = find_job_files(job, args.start, args.end)
+    if not file_paths:
+        logging.error(f"No .{job.extension} files found in {job.input_folder}")
+        return None
+    logging.info(f"Parsing {len(file_paths)} files from {job.input_folder}")
+
+    dfs, errors = read_files_in_parallel(file_paths, job.rename_dict, args.workers, job.timestamp_rule)
+    if errors:
+        for error in errors:
+            logging.error(error)
+        return None
+
+    df = combine_on_range(dfs, args.start, args.end, job.input_agg_period)
+    if df.dropna(how='all').empty:
+        logging.error(f"No data between {args.start} and {args.end} in {job.input_folder}")
+        return None
+
+    return list(wall_clock_outputs(job.aggregate(df, args.start, args.end)))
+
+# %%
+def _run_cached_pipeline(
+    args: argparse.Namespace,
+    job: PipelineJob
+    ) -> int:
+    """
+    Runs run_pipeline through the stage cache in args.cache_dir (see pipeline_stages).
+
+    Parameters:
+    args (argparse.Namespace): The parsed arguments (see build_arg_parser), with a valid date range.
+    job (PipelineJob): The source to process.
+
+    Returns:
+    int: EXIT_OK, or EXIT_VALIDATION_FAILED if no files were found, any file has unexpected columns
+         or there is no data in the date range.
+    """
+    outputs = compute_job_outputs(args, job)
+    if outputs is None:
+        return EXIT_VALIDATION_FAILED
+
+    written = write_outputs_overlapped(outputs, job.output_path, args.output_format, getattr(args, 'reuse_outputs', False))
+    if job.archive_folder is not None:
+        written.append(write_month_archive(job.archive_folder, dict(outputs)))
+    for path in written:
+        logging.info(f"Output written: {path}")
+
+    log_profile_summary()
+    return EXIT_OK
+
+# %%
+def run_pipeline(
+    args: argparse.Namespace,
+    job: PipelineJob
+    ) -> int:
+    """
+    Runs ingestion -> cleaning -> aggregation -> output for one source, as used by the dom_get_* entry points.
+    With args.cache_dir, the intermediate results are cached and only the stages whose inputs changed are
+    recomputed (see pipeline_stages).
+
+    Parameters:
+    args (argparse.Namespace): The parsed arguments (see build_arg_parser).
+    job (PipelineJob): The source to process.
+
+    Returns:
+    int: EXIT_OK, or EXIT_VALIDATION_FAILED if the date range is not valid, no files were found, any file has
+         unexpected columns or there is no data in the date range.
+    """
+    message = check_date_range(args.start, args.end)
+    if message != "OK":
+        logging.error(message)
+        return EXIT_VALIDATION_FAILED
+
+    if getattr(args, 'cache_dir', None) is not None:
+        return _run_cached_pipeline(args, job)
+
+    file_paths = find_job_files(job, args.start, args.end)
+    if not file_paths:
+        logging.error(f"No .{job.extension} files found in {job.input_folder}")
+        return EXIT_VALIDATION_FAILED
+    logging.info(f"Parsing {len(file_paths)} files from {job.input_folder}")
+
+    dfs, errors = read_files_in_parallel(file_paths, job.rename_dict, args.workers, job.timestamp_rule)
+    if errors:
+        for error in errors:
+            logging.error(error)
+        return EXIT_VALIDATION_FAILED
+
+    df = combine_on_range(dfs, args.start, args.end, job.input_agg_period)
+    if df.dropna(how='all').empty:
+        logging.error(f"No data between {args.start} and {args.end} in {job.input_folder}")
+        return EXIT_VALIDATION_FAILED
+
+    # Keep the outputs as they are written, for the archive
+    outputs = {}
+    def keep_outputs(pairs):
+        for name, df_output in pairs:
+            outputs[name] = df_output
+            yield name, df_output
+
+    written = write_outputs_overlapped(
+        keep_outputs(wall_clock_outputs(job.aggregate(df, args.start, args.end))),
+        job.output_path,
+        args.output_format,
+        getattr(args, 'reuse_outputs', False)
+    )
+    if job.archive_folder is not None:
+        written.append(write_month_archive(job.archive_folder, outputs))
+    for path in written:
+        logging.info(f"Output written: {path}")
+
+    log_profile_summary()
+    return EXIT_OK
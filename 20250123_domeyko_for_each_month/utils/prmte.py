@@ -0,0 +1,125 @@
+# %%
+import io
+import re
+import csv
+import codecs
+import logging
+import pandas as pd
+from typing import Union
+from .profiling import profile_stage
+
+# Columns of the CEN export with the components of the interval start
+PRMTE_DATE_COLUMNS = {
+    'AÑO': 'year',
+    'MES': 'month',
+    'DIA': 'day',
+    'HORA': 'hour',
+    'INICIO INTERVALO': 'minute',
+}
+
+# Non-printable bytes and UTF-8 sequences removed from the exports before parsing:
+# - control bytes (except tab, line feed and carriage return) and DEL
+# - C1 controls (U+0080-U+009F), non-breaking space (U+00A0) and soft hyphen (U+00AD)
+# - Arabic letter mark (U+061C) and Mongolian vowel separator (U+180E)
+# - spaces, zero-width characters and direction marks (U+2000-U+200F), separators, embeddings and
+#   narrow non-breaking space (U+2028-U+202F), word joiner, invisible operators and isolates (U+205F-U+206F)
+# - ideographic space (U+3000) and byte order mark / zero-width non-breaking space (U+FEFF)
+_NON_PRINTABLE = re.compile(
+    rb'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]'
+    rb'|\xc2[\x80-\xa0\xad]'
+    rb'|\xd8\x9c'
+    rb'|\xe1\xa0\x8e'
+    rb'|\xe2\x80[\x80-\x8f\xa8-\xaf]'
+    rb'|\xe2\x81[\x9f-\xaf]'
+    rb'|\xe3\x80\x80'
+    rb'|\xef\xbb\xbf'
+)
+
+# %%
+def strip_non_printable_bytes(
+    data: bytes
+    ) -> bytes:
+    """
+    Removes the non-printable characters of a UTF-8 text file at the byte level (see _NON_PRINTABLE):
+    control bytes, byte order marks, invisible spaces and separators, zero-width characters and direction marks.
+    Accented characters (e.g. 'Ñ') are kept.
+
+    Parameters:
+    data (bytes): The content of the file, encoded in UTF-8.
+
+    Returns:
+    bytes: The content without non-printable characters.
+    """
+    return _NON_PRINTABLE.sub(b'', data)
+
+# %%
+@profile_stage
+def read_prmte_file(
+    filename: str,
+    indexes_to_remove: Union[list[int], None] = None,
+    sep: str = ';',
+    encoding: str = 'utf-8'
+    ) -> pd.DataFrame:
+    """
+    Reads a PRMTE export of the CEN in one pass: replaces read + filter_prmte + clean_prmte.
+
+    1. The file is converted to UTF-8 if needed and its non-printable bytes are stripped before parsing
+       (strip_non_printable_bytes). The header is read from the first line of the stripped content.
+    2. The columns in indexes_to_remove (e.g. PRMTE_INDEXES_TO_REMOVE, positions in the DataFrame returned by
+       filter_prmte, with 'date' at 0) are not parsed.
+    3. The Chilean formatted numbers ('1.234,5') are converted by the csv parser (thousands '.', decimal ',').
+    4. The 'date' column is assembled from the integer components of PRMTE_DATE_COLUMNS.
+       Rows without a complete date (blank or footer rows) are dropped.
+
+    Parameters:
+    filename (str): The path to the PRMTE file.
+    indexes_to_remove (list[int] | None): The positions of the columns to drop, as in the output ('date' at 0).
+                                          Default is None (keep all).
+    sep (str): The column separator. Default is ';'.
+    encoding (str): The encoding of the file. Default is 'utf-8'.
+
+    Returns:
+    pandas.DataFrame: A DataFrame with the 'date' column first and the measures as floats, sorted by date.
+
+    Raises:
+    ValueError: If a date component column is missing.
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if codecs.lookup(encoding).name != 'utf-8':
+        data = data.decode(encoding).encode('utf-8')
+    data = strip_non_printable_bytes(data)
+
+    first_line = data.split(b'\n', 1)[0].decode('utf-8')
+    header = [column.strip() for column in next(csv.reader([first_line], delimiter=sep), [])]
+    missing = [column for column in PRMTE_DATE_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"Date columns not found in '{filename}': {', '.join(missing)}")
+
+    # indexes_to_remove are positions after filter_prmte: 'date' first, then the other columns in file order
+    measures = [n for n, column in enumerate(header) if column not in PRMTE_DATE_COLUMNS]
+    removed = {measures[index - 1] for index in (indexes_to_remove or []) if 0 < index <= len(measures)}
+    usecols = [n for n in range(len(header)) if n not in removed]
+
+    df = pd.read_csv(
+        io.BytesIO(data),
+        sep=sep,
+        encoding='utf-8',
+        header=0,
+        names=header,
+        usecols=usecols,
+        thousands='.',
+        decimal=',',
+        skipinitialspace=True
+    )
+
+    df_date = df[list(PRMTE_DATE_COLUMNS)].rename(columns=PRMTE_DATE_COLUMNS).apply(pd.to_numeric, errors='coerce')
+    complete = df_date.notna().all(axis=1)
+    if not complete.all():
+        logging.warning(f"{(~complete).sum()} rows without a complete date dropped from '{filename}'")
+        df, df_date = df[complete], df_date[complete]
+    dates = pd.to_datetime(df_date.astype('int64'))
+    df = df.drop(columns=list(PRMTE_DATE_COLUMNS))
+    df = df.apply(pd.to_numeric, errors='coerce')
+    df.insert(0, 'date', dates)
+    return df.sort_values(by='date', kind='stable').reset_index(drop=True)
@@ -0,0 +1,266 @@
+# %%
+import os
+import time
+import logging
+import functools
+import threading
+import tracemalloc
+import pandas as pd
+from typing import Any, Callable, Union
+
+# Set DOM_PROFILE=1 (or true/yes/on) before importing the utils modules to enable profiling.
+# When disabled, profile_stage returns the decorated function untouched, so there is no overhead.
+PROFILE_ENV_VAR = "DOM_PROFILE"
+PROFILE_ENABLED = os.environ.get(PROFILE_ENV_VAR, "").strip().lower() in {"1", "true", "yes", "on"}
+
+logger = logging.getLogger("domeyko.profiling")
+
+# Records of every profiled call of the current run
+_PROFILE_RECORDS: list[dict[str, Any]] = []
+
+# tracemalloc is global to the process while profiled calls run in several threads (writer thread, thread pools):
+# tracing is started by the first call in progress and stopped by the last one (reference count under the lock).
+# Every thread keeps the peak traced memory of its calls in progress (outermost first) in its own stack. Every call
+# resets the tracemalloc peak, so before resetting it the peak reached so far is kept in the stacks of all threads
+_TRACE_LOCK = threading.Lock()
+_TRACE_STATE = {'calls': 0, 'started': False}
+_THREAD_STATE = threading.local()
+_ACTIVE_STACKS: list[list[int]] = []
+
+# %%
+def _frame_shape(
+    obj: Any
+    ) -> tuple[Union[int, None], Union[int, None]]:
+    """
+    Returns the number of rows and columns of a DataFrame or Series, or (None, None) for other objects.
+
+    Parameters:
+    obj (Any): The object to inspect.
+
+    Returns:
+    tuple[int | None, int | None]: The number of rows and columns.
+    """
+    if isinstance(obj, pd.DataFrame):
+        return obj.shape[0], obj.shape[1]
+    if isinstance(obj, pd.Series):
+        return obj.shape[0], 1
+    return None, None
+
+# %%
+def _first_frame(
+    args: tuple,
+    kwargs: dict
+    ) -> Any:
+    """
+    Returns the first DataFrame or Series found in the positional or keyword arguments.
+
+    Parameters:
+    args (tuple): Positional arguments of the profiled call.
+    kwargs (dict): Keyword arguments of the profiled call.
+
+    Returns:
+    Any: The first DataFrame or Series found, or None.
+    """
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return value
+    return None
+
+# %%
+def _keep_peak() -> int:
+    """
+    Keeps the tracemalloc peak reached so far in the innermost call of every thread (call with _TRACE_LOCK held).
+
+    Returns:
+    int: The current traced memory in bytes.
+    """
+    memory, peak = tracemalloc.get_traced_memory()
+    for stack in _ACTIVE_STACKS:
+        if stack:
+            stack[-1] = max(stack[-1], peak)
+    return memory
+
+# %%
+def _start_call() -> int:
+    """
+    Starts tracing memory for a profiled call of the current thread.
+
+    Returns:
+    int: The traced memory in bytes when the call starts.
+    """
+    stack = getattr(_THREAD_STATE, 'peaks', None)
+    if stack is None:
+        stack = _THREAD_STATE.peaks = []
+    with _TRACE_LOCK:
+        if _TRACE_STATE['calls'] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _TRACE_STATE['started'] = True
+        _TRACE_STATE['calls'] += 1
+        memory_before = _keep_peak()
+        if not stack:
+            _ACTIVE_STACKS.append(stack)
+        stack.append(memory_before)
+        tracemalloc.reset_peak()
+    return memory_before
+
+# %%
+def _end_call() -> int:
+    """
+    Stops tracing memory for the innermost profiled call of the current thread.
+
+    Returns:
+    int: The peak traced memory in bytes during the call.
+    """
+    stack = _THREAD_STATE.peaks
+    with _TRACE_LOCK:
+        _keep_peak()
+        memory_peak = stack.pop()
+        if stack:
+            stack[-1] = max(stack[-1], memory_peak)
+        else:
+            _ACTIVE_STACKS.remove(stack)
+        _TRACE_STATE['calls'] -= 1
+        if _TRACE_STATE['calls'] == 0 and _TRACE_STATE['started']:
+            tracemalloc.stop()
+            _TRACE_STATE['started'] = False
+    return memory_peak
+
+# %%
+def profile_stage(
+    func: Callable
+    ) -> Callable:
+    """
+    Decorator that records wall time, rows/columns processed and peak memory delta of a function call.
+
+    The record is emitted as a structured log on the 'domeyko.profiling' logger and stored for
+    the run summary (see get_profile_summary). Profiling is only active when the DOM_PROFILE
+    environment variable is set; otherwise the function is returned unchanged.
+
+    Calls may run at the same time in several threads. The memory traced is the one of the whole process,
+    so the peak delta of a call also includes what the other threads allocated meanwhile.
+
+    Parameters:
+    func (Callable): The function to profile.
+
+    Returns:
+    Callable: The profiled function, or the original function if profiling is disabled.
+    """
+    if not PROFILE_ENABLED:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        memory_before = _start_call()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            wall_time = time.perf_counter() - start
+            memory_peak = _end_call()
+
+        rows_in, columns_in = _frame_shape(_first_frame(args, kwargs))
+        rows_out, columns_out = _frame_shape(result)
+        record = {
+            'stage': f"{func.__module__}.{func.__qualname__}",
+            'wall_time_s': wall_time,
+            'rows_in': rows_in,
+            'columns_in': columns_in,
+            'rows_out': rows_out,
+            'columns_out': columns_out,
+            'peak_memory_delta_mb': max(memory_peak - memory_before, 0) / 2**20,
+        }
+        _PROFILE_RECORDS.append(record)
+        logger.info(
+            "%s took %.4f s (in: %s x %s, out: %s x %s, peak mem +%.2f MB)",
+            record['stage'], wall_time, rows_in, columns_in, rows_out, columns_out,
+            record['peak_memory_delta_mb'],
+            extra={'profile': record}
+        )
+        return result
+
+    return wrapper
+
+# %%
+def get_profile_summary() -> pd.DataFrame:
+    """
+    Builds a run summary table from every profiled call recorded so far.
+
+    Returns:
+    pd.DataFrame: One row per stage with the number of calls, total and max wall time,
+    total rows processed and max peak memory delta, sorted by total wall time.
+    """
+    columns = ['stage', 'calls', 'total_time_s', 'max_time_s', 'rows_in', 'max_peak_memory_delta_mb']
+    if not _PROFILE_RECORDS:
+        return pd.DataFrame(columns=columns)
+
+    df = pd.DataFrame(_PROFILE_RECORDS)
+    df_summary = df.groupby('stage').agg(
+        calls=('wall_time_s', 'size'),
+        total_time_s=('wall_time_s', 'sum'),
+        max_time_s=('wall_time_s', 'max'),
+        rows_in=('rows_in', 'sum'),
+        max_peak_memory_delta_mb=('peak_memory_delta_mb', 'max'),
+    ).reset_index()
+
+    return df_summary.sort_values(by='total_time_s', ascending=False)[columns].reset_index(drop=True)
+
+# %%
+def log_profile_summary() -> None:
+    """
+    Logs the run summary table on the 'domeyko.profiling' logger, if profiling is enabled.
+
+    Returns:
+    None
+    """
+    if not PROFILE_ENABLED:
+        return
+    logger.info("Profile summary:\n%s", get_profile_summary().to_string(index=False))
+
+# %%
+def reset_profile() -> None:
+    """
+    Clears every profiled call recorded so far.
+
+    Returns:
+    None
+    """
+    _PROFILE_RECORDS.clear()
+
+# %%
+def run_profiled(
+    func: Callable,
+    *args,
+    **kwargs
+    ) -> tuple[Any, list[dict[str, Any]]]:
+    """
+    Calls a function and returns its result with the profile records it produced, so the records of calls run in
+    worker processes can be sent back to the parent and merged with add_profile_records. The worker must not run
+    other profiled calls at the same time (one call per process, as in a ProcessPoolExecutor).
+
+    Parameters:
+    func (Callable): The function to call (e.g. read_scada_file in a ProcessPoolExecutor).
+    *args, **kwargs: The arguments of the call.
+
+    Returns:
+    tuple[Any, list[dict]]: The result of the call and its profile records (empty if profiling is disabled).
+    """
+    n_records = len(_PROFILE_RECORDS)
+    result = func(*args, **kwargs)
+    records = _PROFILE_RECORDS[n_records:]
+    del _PROFILE_RECORDS[n_records:]
+    return result, records
+
+# %%
+def add_profile_records(
+    records: list[dict[str, Any]]
+    ) -> None:
+    """
+    Adds profile records produced elsewhere (see run_profiled) to the records of this process.
+
+    Parameters:
+    records (list[dict]): The profile records.
+
+    Returns:
+    None
+    """
+    _PROFILE_RECORDS.extend(records)
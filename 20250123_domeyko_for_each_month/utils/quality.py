@@ -0,0 +1,191 @@
+# %%
+import logging
+import pandas as pd
+import numpy as np
+from typing import Union
+from .profiling import profile_stage
+
+# Quality flags, combined as a bitmask per cell
+FLAG_STUCK = 1
+FLAG_SPIKE = 2
+FLAG_NEGATIVE_IRRADIANCE = 4
+FLAG_OUT_OF_RANGE = 8
+FLAG_TEMPERATURE_INCONSISTENT = 16
+
+QUALITY_FLAGS = {
+    'stuck': FLAG_STUCK,
+    'spike': FLAG_SPIKE,
+    'negative irradiance': FLAG_NEGATIVE_IRRADIANCE,
+    'out of range': FLAG_OUT_OF_RANGE,
+    'temperature inconsistent': FLAG_TEMPERATURE_INCONSISTENT,
+}
+
+# %%
+def run_lengths(
+    continues: np.ndarray
+    ) -> np.ndarray:
+    """
+    Computes, for every cell of a 2D array, the length of the run (along the rows) it belongs to.
+
+    A run is a sequence of consecutive cells of a column where every cell but the first
+    continues the previous one. All columns are processed at once: the run ids of every column
+    are offset so one np.bincount gives the length of every run.
+
+    Parameters:
+    continues (np.ndarray): A (rows x columns) boolean array, True where a cell continues the run of the previous row.
+                            The first row is ignored (it always starts a run).
+
+    Returns:
+    np.ndarray: A (rows x columns) integer array with the length of the run of each cell.
+    """
+    n_rows, n_columns = continues.shape
+    if n_rows == 0:
+        return np.zeros(continues.shape, dtype=np.int64)
+
+    starts = ~continues
+    starts[0, :] = True
+    run_ids = np.cumsum(starts, axis=0) - 1
+    run_ids += np.arange(n_columns) * n_rows
+    lengths = np.bincount(run_ids.ravel(), minlength=n_rows * n_columns)
+    return lengths[run_ids]
+
+# %%
+def _rules_per_column(
+    columns: list[str],
+    rules_per_unit: dict[str, dict]
+    ) -> dict[str, dict]:
+    """
+    Assigns to every column the rules of the unit its tag ends with.
+
+    Parameters:
+    columns (list[str]): The column names.
+    rules_per_unit (dict[str, dict]): The rules per unit (e.g. QUALITY_RULES_PER_UNIT).
+
+    Returns:
+    dict[str, dict]: A dictionary with the columns that have rules as keys and their rules as values.
+    """
+    rules = {}
+    for column in columns:
+        for unit, unit_rules in rules_per_unit.items():
+            if column.endswith(unit):
+                rules[column] = dict(unit_rules, unit=unit)
+    return rules
+
+# %%
+@profile_stage
+def run_quality_checks(
+    df: pd.DataFrame,
+    rules_per_unit: dict[str, dict],
+    temperature_rule: Union[dict, None] = None
+    ) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Runs the data-quality rules over the whole DataFrame in one pass and returns a bitmask per cell.
+
+    Rules, applied to the columns whose tag ends with a unit of rules_per_unit:
+        - FLAG_STUCK: the value repeats for at least 'stuck_min_run' consecutive rows
+          (runs of zeros are ignored if 'stuck_ignore_zero').
+        - FLAG_SPIKE: the absolute rates of change from the previous row and to the next row both exceed
+          'max_rate_per_minute', with opposite signs (the first and last rows are never spikes).
+        - FLAG_NEGATIVE_IRRADIANCE: an irradiance ([W/m2]) value is below 'min'.
+        - FLAG_OUT_OF_RANGE: the value is above 'max', or below 'min' for other units.
+        - FLAG_TEMPERATURE_INCONSISTENT: the module temperature minus the ambient temperature is
+          outside ['min_delta', 'max_delta'] (see QUALITY_TEMPERATURE_RULE).
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame with a datetime index (e.g. the 1 minute sensors of the month).
+    rules_per_unit (dict[str, dict]): The rules per unit (e.g. QUALITY_RULES_PER_UNIT).
+    temperature_rule (dict | None): The module/ambient temperature rule (e.g. QUALITY_TEMPERATURE_RULE).
+                                    Default is None (not checked).
+
+    Returns:
+    tuple[pd.DataFrame, pd.DataFrame]:
+        - The flags (uint8 bitmask) with the same index and columns as df; 0 means no flag.
+        - A summary per tag with the number of cells raising each flag and the fraction of flagged cells.
+
+    Raises:
+    ValueError: If the DataFrame index is not datetime.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(df.index):
+        raise ValueError("DataFrame index must be a datetime type")
+
+    rules = _rules_per_column(list(df.columns), rules_per_unit)
+    columns = list(rules)
+    values = df[columns].to_numpy(dtype=float)
+    flags = np.zeros(values.shape, dtype=np.uint8)
+
+    def rule_array(name: str, default: float) -> np.ndarray:
+        return np.array([rules[column].get(name, default) for column in columns], dtype=float)
+
+    is_irradiance = np.array([rules[column]['unit'] == '[W/m2]' for column in columns], dtype=bool)
+    minimum = rule_array('min', -np.inf)
+    maximum = rule_array('max', np.inf)
+    max_rate = rule_array('max_rate_per_minute', np.inf)
+    stuck_min_run = rule_array('stuck_min_run', np.inf)
+    stuck_ignore_zero = np.array([rules[column].get('stuck_ignore_zero', False) for column in columns], dtype=bool)
+
+    with np.errstate(invalid='ignore'):
+        # Stuck values: runs of equal consecutive values
+        same_as_previous = np.zeros(values.shape, dtype=bool)
+        same_as_previous[1:] = values[1:] == values[:-1]
+        stuck = run_lengths(same_as_previous) >= stuck_min_run
+        stuck &= ~(stuck_ignore_zero & (values == 0))
+        flags[stuck] |= FLAG_STUCK
+
+        # Spikes: the value jumps away from the previous row and back on the next one (rates per minute),
+        # so the good value after a spike is not flagged
+        minutes = np.diff(df.index.as_unit('ns').asi8) / 6e10
+        rate = np.diff(values, axis=0) / minutes[:, None]
+        spike = np.zeros(values.shape, dtype=bool)
+        spike[1:-1] = (
+            (np.abs(rate[:-1]) > max_rate) & (np.abs(rate[1:]) > max_rate) & (np.sign(rate[:-1]) != np.sign(rate[1:]))
+        )
+        flags[spike] |= FLAG_SPIKE
+
+        # Negative irradiance and out of range values
+        below = values < minimum
+        flags[below & is_irradiance] |= FLAG_NEGATIVE_IRRADIANCE
+        flags[(below & ~is_irradiance) | (values > maximum)] |= FLAG_OUT_OF_RANGE
+
+        # Module temperature against ambient temperature
+        if temperature_rule is not None:
+            ambient_tag = temperature_rule['ambient_tag']
+            if ambient_tag in columns:
+                ambient = values[:, columns.index(ambient_tag)][:, None]
+                module_positions = [
+                    n for n, column in enumerate(columns) if column.startswith(temperature_rule['module_tag_prefix'])
+                ]
+                delta = values[:, module_positions] - ambient
+                inconsistent = (delta < temperature_rule['min_delta']) | (delta > temperature_rule['max_delta'])
+                flags[:, module_positions] |= np.where(inconsistent, FLAG_TEMPERATURE_INCONSISTENT, 0).astype(np.uint8)
+            else:
+                logging.warning(f"Column '{ambient_tag}' not found in the DataFrame.")
+
+    df_flags = pd.DataFrame(0, index=df.index, columns=df.columns, dtype=np.uint8)
+    df_flags[columns] = flags
+
+    summary = {name: (flags & flag).astype(bool).sum(axis=0) for name, flag in QUALITY_FLAGS.items()}
+    summary['flagged fraction'] = (flags != 0).mean(axis=0) if len(flags) else np.zeros(len(columns))
+    df_summary = pd.DataFrame(summary, index=pd.Index(columns, name='tag'))
+
+    return df_flags, df_summary
+
+# %%
+@profile_stage
+def apply_quality_flags(
+    df: pd.DataFrame,
+    df_flags: pd.DataFrame,
+    flags_to_remove: int = FLAG_STUCK | FLAG_SPIKE | FLAG_NEGATIVE_IRRADIANCE | FLAG_OUT_OF_RANGE
+    ) -> pd.DataFrame:
+    """
+    Replaces with NaN the cells raising any of the given flags.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame checked with run_quality_checks.
+    df_flags (pd.DataFrame): The flags returned by run_quality_checks.
+    flags_to_remove (int): The flags to remove, combined with '|'. Default is every flag but
+                           FLAG_TEMPERATURE_INCONSISTENT.
+
+    Returns:
+    pd.DataFrame: A copy of the DataFrame with the flagged cells set to NaN.
+    """
+    return df.mask((df_flags.to_numpy() & flags_to_remove) != 0)
@@ -0,0 +1,196 @@
+# %%
+import re
+import pandas as pd
+import numpy as np
+from typing import Union
+from .profiling import profile_stage
+
+ROLLUP_LEVELS = ['cabin', 'substation', 'park']
+
+# %%
+def indicator_matrix(
+    columns: list[str],
+    groups: dict[str, str],
+    group_names: list[str]
+    ) -> np.ndarray:
+    """
+    Builds the (columns x groups) indicator matrix: 1 where the column belongs to the group, 0 otherwise.
+
+    Multiplying a (time x columns) array by this matrix sums the columns of every group at once.
+
+    Parameters:
+    columns (list[str]): The column names (rows of the matrix).
+    groups (dict[str, str]): A dictionary with column names as keys and group names as values.
+                             Columns not in the dictionary belong to no group.
+    group_names (list[str]): The group names (columns of the matrix), in output order.
+
+    Returns:
+    np.ndarray: The indicator matrix.
+    """
+    group_position = {group: n for n, group in enumerate(group_names)}
+    matrix = np.zeros((len(columns), len(group_names)))
+    for n, column in enumerate(columns):
+        group = groups.get(column)
+        if group in group_position:
+            matrix[n, group_position[group]] = 1
+    return matrix
+
+# %%
+def inverter_cabin_groups(
+    columns: list[str]
+    ) -> dict[str, str]:
+    """
+    Maps every inverter column named 'Cabin N inverter M [...]' to its cabin ('Cabin N').
+
+    Parameters:
+    columns (list[str]): The inverter column names.
+
+    Returns:
+    dict[str, str]: A dictionary with inverter columns as keys and cabin names as values.
+    """
+    return {column: _cabin_of(column) for column in columns if _cabin_of(column) is not None}
+
+# %%
+def _cabin_of(
+    tag: str
+    ) -> Union[str, None]:
+    """
+    Returns the cabin ('Cabin N') of an inverter tag named 'Cabin N inverter M [...]'.
+
+    Parameters:
+    tag (str): The inverter tag.
+
+    Returns:
+    str | None: The cabin name, or None if the tag does not follow the naming.
+    """
+    match = re.match(r'^(Cabin \d+) inverter \d+', tag)
+    return match.group(1) if match else None
+
+# %%
+def build_rollup_matrices(
+    inverter_tags: list[str],
+    cabin_to_substation: Union[dict[str, str], None] = None,
+    park: str = "DOM",
+    unit: str = ""
+    ) -> dict[str, tuple[list[str], np.ndarray]]:
+    """
+    Precomputes, from the inverter tag registry, the indicator matrices mapping the inverters
+    to every level of the hierarchy: inverter -> cabin -> substation -> park.
+
+    The substation matrix is the product of the inverter -> cabin and cabin -> substation matrices,
+    so every level is computed directly from the inverters with one matrix multiply.
+
+    Parameters:
+    inverter_tags (list[str]): The inverter tags, named 'Cabin N inverter M [unit]' (e.g. INVERTERS_KW_TO_KWH values).
+    cabin_to_substation (dict[str, str] | None): A dictionary with cabins ('Cabin N') as keys and substations
+                                                 (e.g. 'EMELDA_1') as values. Default is None (no substation level).
+    park (str): The park name. Default is "DOM".
+    unit (str): The unit appended to the output column names (e.g. " [kWh]"). Default is "".
+
+    Returns:
+    dict[str, tuple[list[str], np.ndarray]]: A dictionary with the levels ('cabin', 'substation', 'park') as keys
+                                             and, as values, the output column names and the
+                                             (inverters x groups) indicator matrix.
+    """
+    cabin_groups = inverter_cabin_groups(inverter_tags)
+    cabins = sorted(set(cabin_groups.values()), key=lambda cabin: int(cabin.split()[1]))
+    inverter_to_cabin = indicator_matrix(inverter_tags, cabin_groups, cabins)
+
+    matrices = {
+        'cabin': ([f"{cabin}{unit}" for cabin in cabins], inverter_to_cabin),
+        'park': ([f"{park}{unit}"], np.ones((len(inverter_tags), 1))),
+    }
+
+    if cabin_to_substation:
+        substations = sorted(set(cabin_to_substation.values()))
+        cabin_to_substation_matrix = indicator_matrix(cabins, cabin_to_substation, substations)
+        matrices['substation'] = (
+            [f"{substation}{unit}" for substation in substations],
+            inverter_to_cabin @ cabin_to_substation_matrix
+        )
+
+    return {level: matrices[level] for level in ROLLUP_LEVELS if level in matrices}
+
+# %%
+def cabin_to_substation_from_groups(
+    groups: dict[str, str]
+    ) -> dict[str, str]:
+    """
+    Derives the cabin -> substation mapping from inverter columns mapped to substations
+    (e.g. the result of substation_groups over the inverter files read per substation folder).
+
+    Parameters:
+    groups (dict[str, str]): A dictionary with inverter tags as keys and substation names as values.
+
+    Returns:
+    dict[str, str]: A dictionary with cabins ('Cabin N') as keys and substations as values.
+    """
+    return {cabin: groups[tag] for tag, cabin in inverter_cabin_groups(list(groups)).items()}
+
+# %%
+@profile_stage
+def rollup(
+    df: pd.DataFrame,
+    inverter_tags: list[str],
+    matrices: dict[str, tuple[list[str], np.ndarray]],
+    skipna: bool = True
+    ) -> dict[str, pd.DataFrame]:
+    """
+    Computes the cabin, substation and park totals of the inverter columns, one matrix multiply per level.
+
+    Parameters:
+    df (pd.DataFrame): The inverter DataFrame (any period: 15M, 1H or 1D) with a datetime index.
+    inverter_tags (list[str]): The inverter tags used to build the matrices (same order).
+    matrices (dict[str, tuple[list[str], np.ndarray]]): The matrices returned by build_rollup_matrices.
+    skipna (bool): If True, missing inverters are skipped and a group is NaN only if all its inverters
+                   are missing (as to_agg_period_beta 'sum'). If False, a group is NaN if any inverter is missing.
+                   Default is True.
+
+    Returns:
+    dict[str, pd.DataFrame]: A dictionary with the levels as keys and the totals, indexed as df, as values.
+
+    Raises:
+    ValueError: If any of the inverter tags is not found in the DataFrame.
+    """
+    missing = [tag for tag in inverter_tags if tag not in df.columns]
+    if missing:
+        raise ValueError(f"Columns not found in the DataFrame: {', '.join(missing)}")
+
+    values = df[inverter_tags].to_numpy(dtype=float)
+    is_nan = np.isnan(values)
+    values = np.where(is_nan, 0, values)
+
+    rollups = {}
+    for level, (names, matrix) in matrices.items():
+        totals = values @ matrix
+        if skipna:
+            totals[((~is_nan) @ matrix) == 0] = np.nan
+        else:
+            totals[(is_nan @ matrix) > 0] = np.nan
+        rollups[level] = pd.DataFrame(totals, index=df.index, columns=names)
+
+    return rollups
+
+# %%
+def rollup_periods(
+    dfs_per_period: dict[str, pd.DataFrame],
+    inverter_tags: list[str],
+    matrices: dict[str, tuple[list[str], np.ndarray]],
+    skipna: bool = True
+    ) -> dict[str, dict[str, pd.DataFrame]]:
+    """
+    Applies rollup to the inverter DataFrames of every output period (e.g. {'15M': ..., '1H': ..., '1D': ...}).
+
+    Parameters:
+    dfs_per_period (dict[str, pd.DataFrame]): The inverter DataFrames per period.
+    inverter_tags (list[str]): The inverter tags used to build the matrices (same order).
+    matrices (dict[str, tuple[list[str], np.ndarray]]): The matrices returned by build_rollup_matrices.
+    skipna (bool): See rollup. Default is True.
+
+    Returns:
+    dict[str, dict[str, pd.DataFrame]]: The rollups per period and level.
+    """
+    return {
+        period: rollup(df, inverter_tags, matrices, skipna)
+        for period, df in dfs_per_period.items()
+    }
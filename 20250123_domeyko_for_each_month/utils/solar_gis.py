@@ -0,0 +1,291 @@
+# %%
+import io
+import re
+import pandas as pd
+import numpy as np
+from typing import Union
+from .data import to_agg_period_beta
+from .timestamps import TIMESTAMP_CONVENTIONS, normalize_timestamps, utc_to_local
+from .profiling import profile_stage
+
+# %%
+def _parse_solar_gis_metadata(
+    metadata_lines: list[str]
+    ) -> dict:
+    """
+    Extracts the UTC offset, the time step and the timestamp convention from the '#' header lines of a Solar GIS file.
+
+    Parameters:
+    metadata_lines (list[str]): The header lines of the file, without the leading '#'.
+
+    Returns:
+    dict: A dictionary with the keys 'utc_offset_hours', 'interval_minutes' and 'timestamp_convention'
+          (None when the value is not found in the header).
+    """
+    text = "\n".join(metadata_lines).lower()
+    metadata = {'utc_offset_hours': None, 'interval_minutes': None, 'timestamp_convention': None}
+
+    match = re.search(r'utc\s*([+-])\s*(\d{1,2})(?::?(\d{2}))?', text)
+    if match:
+        sign = -1 if match.group(1) == '-' else 1
+        metadata['utc_offset_hours'] = sign * (int(match.group(2)) + int(match.group(3) or 0) / 60)
+
+    match = re.search(r'time step\s*:?\s*(\d+)\s*min', text)
+    if match:
+        metadata['interval_minutes'] = int(match.group(1))
+
+    if re.search(r'(end|ending) of (the )?(averaging )?interval', text):
+        metadata['timestamp_convention'] = 'end'
+    elif re.search(r'(center|centre|middle) of (the )?(averaging )?interval', text):
+        metadata['timestamp_convention'] = 'center'
+    elif re.search(r'(start|beginning) of (the )?(averaging )?interval', text):
+        metadata['timestamp_convention'] = 'start'
+
+    return metadata
+
+# %%
+@profile_stage
+def read_solar_gis_file(
+    filename: str,
+    rename_dict: Union[dict[str, str], None] = None,
+    missing_values: tuple = (-9, -99, -999)
+    ) -> tuple[pd.DataFrame, dict]:
+    """
+    Read a Solar GIS time series file (';' separated, '#' header lines) and create a datetime column.
+
+    The 'date' column is built from the 'Date' (DD.MM.YYYY) and 'Time' (HH:MM) columns and is left
+    as written in the file; use align_solar_gis_to_grid to move it to interval-start UTC and local time.
+
+    Parameters:
+    filename (str): The path to the Solar GIS file.
+    rename_dict (dict[str, str] | None): A dictionary to rename the Solar GIS columns (e.g. SOLAR_GIS_TO_TAG).
+                                         Columns not in the dictionary are dropped. Default is None (keep all).
+    missing_values (tuple): Values used by Solar GIS to flag missing data, replaced with NaN.
+
+    Returns:
+    tuple[pandas.DataFrame, dict]: The DataFrame with the 'date' column and the metadata read from the header
+                                   ('utc_offset_hours', 'interval_minutes', 'timestamp_convention').
+    """
+    with open(filename, 'r', encoding='utf-8', errors='replace') as f:
+        lines = f.read().splitlines()
+
+    # Header lines start with '#'. The column names are either the first line without '#'
+    # or the last header line starting with '#Date'.
+    metadata_lines = []
+    header = None
+    first_data_line = len(lines)
+    for n, line in enumerate(lines):
+        if line.startswith('#'):
+            metadata_lines.append(line[1:].strip())
+            if line[1:].strip().lower().startswith('date;'):
+                header = line[1:].strip()
+        elif line.strip():
+            first_data_line = n
+            break
+
+    data_lines = lines[first_data_line:]
+    if header is not None:
+        data_lines = [header] + data_lines
+
+    df = pd.read_csv(io.StringIO("\n".join(data_lines)), sep=';')
+    df.columns = [column.strip() for column in df.columns]
+
+    # Build the datetime from the 'Date' and 'Time' columns; 24:00 means midnight of the next day
+    time = df['Time'].astype(str).str.strip()
+    end_of_day = time.eq('24:00')
+    df.insert(
+        0,
+        'date',
+        pd.to_datetime(df['Date'].astype(str).str.strip() + ' ' + time.where(~end_of_day, '00:00'), format='%d.%m.%Y %H:%M')
+        + pd.to_timedelta(end_of_day.astype(int), unit='D')
+    )
+    df = df.drop(['Date', 'Time'], axis=1)
+
+    if rename_dict is not None:
+        df = df[['date'] + [column for column in df.columns if column in rename_dict]].rename(columns=rename_dict)
+
+    value_columns = df.columns[1:]
+    df[value_columns] = df[value_columns].apply(pd.to_numeric, errors='coerce')
+    df[value_columns] = df[value_columns].mask(df[value_columns].isin(missing_values))
+
+    return df.sort_values(by='date').reset_index(drop=True), _parse_solar_gis_metadata(metadata_lines)
+
+# %%
+def solar_gis_rule(
+    metadata: dict,
+    rule: dict
+    ) -> dict:
+    """
+    Completes the timestamp rule of the Solar GIS files (TIMESTAMP_RULES['solar_gis']) with the values read from
+    the header of a file, which take precedence. The result can be passed to align_solar_gis_to_grid:
+
+        align_solar_gis_to_grid(df, **solar_gis_rule(metadata, TIMESTAMP_RULES['solar_gis']))
+
+    Parameters:
+    metadata (dict): The metadata returned by read_solar_gis_file.
+    rule (dict): The default timestamp rule, with 'utc_offset_hours', 'interval_minutes' and 'timestamp_convention'.
+
+    Returns:
+    dict: The rule with the keys 'utc_offset_hours', 'interval_minutes' and 'timestamp_convention'.
+    """
+    keys = ['utc_offset_hours', 'interval_minutes', 'timestamp_convention']
+    return {key: metadata[key] if metadata.get(key) is not None else rule.get(key) for key in keys}
+
+# %%
+@profile_stage
+def align_solar_gis_to_grid(
+    df: pd.DataFrame,
+    utc_offset_hours: Union[float, None],
+    interval_minutes: Union[int, None],
+    timestamp_convention: str = 'end',
+    timezone: Union[str, None] = "America/Santiago"
+    ) -> pd.DataFrame:
+    """
+    Moves the Solar GIS timestamps to the start of each interval and converts them to UTC (see normalize_timestamps).
+
+    The 'utc' column (int64 ns) is the one to join on. The 'date' column is kept for reports, in naive local time
+    as the SCADA data (as create_range_datetimes and to_agg_period_beta do): on the fall-back day the repeated hour
+    appears twice in 'date', once per UTC offset.
+
+    Parameters:
+    df (pandas.DataFrame): The Solar GIS DataFrame with the 'date' column.
+    utc_offset_hours (float | None): The fixed UTC offset of the Solar GIS timestamps (e.g. 0 for UTC, -3 for UTC-3),
+                                     as read from the header (None if not found).
+    interval_minutes (int | None): The length of the Solar GIS averaging interval in minutes (None if not found).
+    timestamp_convention (str): Whether the timestamps label the 'start', 'center' or 'end' of the interval.
+                                Default is 'end'.
+    timezone (str | None): The local timezone of the SCADA data. Default is "America/Santiago".
+                           If None, 'date' is only shifted to interval start.
+
+    Returns:
+    pandas.DataFrame: A copy of the DataFrame with the 'date' column in naive local interval-start time and the
+                      'utc' column after it (only if the UTC offset is known).
+
+    Raises:
+    ValueError: If the timestamp convention is not valid, or the interval or the UTC offset (with a timezone) is unknown.
+    """
+    if interval_minutes is None:
+        raise ValueError("The Solar GIS interval is unknown: pass interval_minutes (e.g. SOLAR_GIS_AGG_PERIOD).")
+    if timezone is not None and utc_offset_hours is None:
+        raise ValueError("The Solar GIS UTC offset is unknown: pass utc_offset_hours.")
+    if timestamp_convention not in TIMESTAMP_CONVENTIONS:
+        raise ValueError(
+            f"Invalid timestamp convention '{timestamp_convention}'. Valid conventions are {', '.join(TIMESTAMP_CONVENTIONS)}"
+        )
+
+    df = df.copy()
+    if utc_offset_hours is None:
+        df['date'] = df['date'] - pd.Timedelta(minutes=interval_minutes * TIMESTAMP_CONVENTIONS[timestamp_convention])
+        return df
+
+    rule = {'utc_offset_hours': utc_offset_hours, 'timestamp_convention': timestamp_convention, 'interval_minutes': interval_minutes}
+    utc_ns, _ = normalize_timestamps(df['date'], rule)
+    if timezone is not None:
+        df['date'] = utc_to_local(utc_ns, timezone)
+    else:
+        df['date'] = df['date'] - pd.Timedelta(minutes=interval_minutes * TIMESTAMP_CONVENTIONS[timestamp_convention])
+    df.insert(1, 'utc', utc_ns)
+    return df
+
+# %%
+@profile_stage
+def join_solar_gis_with_sensors(
+    df_solar_gis: pd.DataFrame,
+    df_sensors: pd.DataFrame,
+    str_start_date: str,
+    str_end_date: str,
+    agg_period: int = 15,
+    sensor_columns: Union[list[str], None] = None,
+    timezone: str = "America/Santiago"
+    ) -> pd.DataFrame:
+    """
+    Joins the Solar GIS data to the on-site meteo sensors on a UTC grid.
+
+    The grid holds every interval between the local start and end dates, so no interval is lost or merged
+    around the DST changes: the repeated hour of the fall-back appears twice (same 'date', different 'utc') and
+    the skipped hour of the spring-forward does not appear. The sensors (naive local time) are converted to UTC
+    with normalize_timestamps and averaged to the aggregation period, and the Solar GIS data is attached to each
+    grid timestamp with an as-of join (nearest timestamp within half an interval), so small offsets between
+    both time bases do not leave the satellite data unmatched.
+
+    Parameters:
+    df_solar_gis (pandas.DataFrame): The aligned Solar GIS DataFrame with the 'utc' column (see align_solar_gis_to_grid).
+    df_sensors (pandas.DataFrame): The meteo sensors DataFrame with a naive local datetime index (e.g. 1 minute data).
+    str_start_date (str): The start date in the format '%d-%m-%Y'.
+    str_end_date (str): The end date in the format '%d-%m-%Y'.
+    agg_period (int): The aggregation period of the grid in minutes. Default is 15.
+    sensor_columns (list[str] | None): The sensor columns to join. Default is None (every pyranometer column).
+    timezone (str): The local timezone of the sensors and of the dates. Default is "America/Santiago".
+
+    Returns:
+    pandas.DataFrame: A DataFrame with the 'date' (naive local) and 'utc' (int64 ns) columns of the grid,
+                      the Solar GIS columns and the sensor columns.
+
+    Raises:
+    ValueError: If the Solar GIS DataFrame has no 'utc' column.
+    """
+    if 'utc' not in df_solar_gis.columns:
+        raise ValueError("The Solar GIS DataFrame has no 'utc' column: align it with align_solar_gis_to_grid and its UTC offset.")
+    if sensor_columns is None:
+        sensor_columns = [column for column in df_sensors.columns if column.startswith('Pyranometer')]
+
+    local_rule = {'timezone': timezone, 'timestamp_convention': 'start', 'interval_minutes': 0}
+    limits = pd.Series(pd.to_datetime([str_start_date, str_end_date], format='%d-%m-%Y'))
+    start_ns, end_ns = normalize_timestamps(limits, local_rule)[0]
+    step_ns = agg_period * 60 * 10**9
+    df_grid = pd.DataFrame({'utc': np.arange(start_ns, end_ns + 1, step_ns, dtype=np.int64)})
+    df_grid.insert(0, 'date', utc_to_local(df_grid['utc'].to_numpy(), timezone))
+
+    sensors_utc, _ = normalize_timestamps(pd.Series(df_sensors.index), local_rule)
+    df_sensors_utc = df_sensors[sensor_columns].set_axis(pd.DatetimeIndex(sensors_utc.view('datetime64[ns]'), name='date'), axis=0)
+    df_sensors_agg = to_agg_period_beta(df_sensors_utc, agg_period, {column: 'mean' for column in sensor_columns})
+    df_sensors_agg['utc'] = pd.DatetimeIndex(df_sensors_agg.pop('date')).as_unit('ns').asi8
+
+    df_solar_gis = df_solar_gis.drop(columns=['date'], errors='ignore')
+    df_solar_gis = df_solar_gis.sort_values(by='utc').drop_duplicates(subset=['utc'])
+    df_solar_gis['utc'] = df_solar_gis['utc'].astype(np.int64)
+
+    df_joined = pd.merge_asof(
+        df_grid,
+        df_solar_gis,
+        on='utc',
+        direction='nearest',
+        tolerance=step_ns // 2
+    )
+    df_joined = pd.merge(df_joined, df_sensors_agg, on='utc', how='left')
+
+    return df_joined
+
+# %%
+@profile_stage
+def solar_gis_deviation(
+    df_joined: pd.DataFrame,
+    comparisons: dict[str, list[str]]
+    ) -> pd.DataFrame:
+    """
+    Computes the relative deviation of each on-site sensor against its Solar GIS counterpart.
+
+    Parameters:
+    df_joined (pandas.DataFrame): The DataFrame returned by join_solar_gis_with_sensors.
+    comparisons (dict[str, list[str]]): A dictionary with Solar GIS columns as keys and the sensor columns
+                                        to compare against them as values (e.g. SOLAR_GIS_TAG_TO_METEO_TAGS).
+
+    Returns:
+    pandas.DataFrame: A DataFrame with the 'date' and 'utc' columns and one '<sensor> vs <Solar GIS> [%]' column per
+                      pair, computed as (sensor - Solar GIS) / Solar GIS * 100. Intervals where Solar GIS is 0 are NaN.
+    """
+    df_deviation = df_joined[[column for column in ['date', 'utc'] if column in df_joined.columns]].copy()
+    for solar_gis_column, sensor_columns in comparisons.items():
+        sensor_columns = [column for column in sensor_columns if column in df_joined.columns]
+        if solar_gis_column not in df_joined.columns or not sensor_columns:
+            continue
+
+        reference = df_joined[solar_gis_column].to_numpy(dtype=float)[:, None]
+        sensors = df_joined[sensor_columns].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deviation = np.where(reference > 0, (sensors - reference) / reference * 100, np.nan)
+
+        names = [f"{column.rsplit(' [', 1)[0]} vs {solar_gis_column.rsplit(' [', 1)[0]} [%]" for column in sensor_columns]
+        df_deviation = pd.concat([df_deviation, pd.DataFrame(deviation, columns=names, index=df_joined.index)], axis=1)
+
+    return df_deviation
@@ -0,0 +1,312 @@
+# %%
+import os
+import sys
+import json
+import types
+import functools
+import pickle
+import hashlib
+import inspect
+import logging
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Any, Callable, Union
+from .profiling import profile_stage
+
+# %%
+@dataclass
+class Stage:
+    """
+    One step of the processing graph (e.g. parse, combine, aggregate).
+
+    Attributes:
+    name (str): The unique name of the stage.
+    func (Callable): The function of the stage. It receives the results of the input stages (positionally,
+                     in order) and the params and options (as keywords).
+    inputs (list[str]): The names of the upstream stages. Default is no inputs.
+    params (dict): Keyword arguments that change the result; they are part of the fingerprint.
+    options (dict): Keyword arguments that do not change the result (e.g. number of workers); not fingerprinted.
+    cache (bool): Whether the result is cached on disk. Stages with cache=False run on every execution and are
+                  fingerprinted by their result (e.g. the list of raw files with their size and mtime).
+                  Default is True.
+    code_modules (list[str]): The names of the modules, besides the module of func, whose source is part of
+                              the fingerprint (e.g. the helpers called by func). Default is no modules.
+    check (Callable | None): Validates the result of the stage: returns "OK" or an error message, and run_stages
+                             stops at the first stage failing its check. Default is None (not checked).
+    """
+    name: str
+    func: Callable
+    inputs: list[str] = field(default_factory=list)
+    params: dict = field(default_factory=dict)
+    options: dict = field(default_factory=dict)
+    cache: bool = True
+    code_modules: list[str] = field(default_factory=list)
+    check: Union[Callable[[Any], str], None] = None
+
+# %%
+class StageCheckError(ValueError):
+    """
+    Raised by run_stages when the result of a stage fails its check.
+
+    Attributes:
+    stage (str): The name of the stage.
+    """
+    def __init__(self, stage: str, message: str):
+        super().__init__(message)
+        self.stage = stage
+
+# %%
+def _update(
+    sha1,
+    obj: Any
+    ) -> None:
+    """
+    Feeds a stable representation of an object into a hash.
+
+    Supports DataFrames, Series, numpy arrays, paths (by name only; list the files in a stage with
+    cache=False to follow their content), partials (by function and arguments), functions and other
+    callables (by source code, the source and upper case constants of their module, e.g. the mapping dicts
+    of dom_constants), modules (by their upper case constants), containers and JSON-serializable scalars.
+
+    Parameters:
+    sha1: The hashlib object to update.
+    obj (Any): The object to fingerprint.
+    """
+    if isinstance(obj, pd.DataFrame):
+        sha1.update(b'DataFrame')
+        _update(sha1, [str(column) for column in obj.columns])
+        sha1.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, pd.Series):
+        sha1.update(b'Series')
+        _update(sha1, str(obj.name))
+        sha1.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        sha1.update(f'ndarray{obj.dtype}{obj.shape}'.encode())
+        sha1.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, Path):
+        _update(sha1, ['Path', str(obj)])
+    elif isinstance(obj, types.ModuleType):
+        _update(sha1, ['module', obj.__name__, _constants(vars(obj))])
+    elif isinstance(obj, functools.partial):
+        _update(sha1, ['partial', obj.func, obj.args, obj.keywords])
+    elif callable(obj):
+        # Callable instances are fingerprinted by their class and their attributes
+        function = obj if inspect.isroutine(obj) or inspect.isclass(obj) else type(obj)
+        module_name = getattr(function, '__module__', None) or ''
+        try:
+            source = inspect.getsource(function)
+        except (OSError, TypeError):
+            source = f"{module_name}.{getattr(function, '__qualname__', type(function).__qualname__)}"
+        state = vars(obj) if function is not obj and hasattr(obj, '__dict__') else {}
+        _update(sha1, [
+            'callable', module_name, source, _module_source(module_name),
+            _constants(getattr(function, '__globals__', {})), state
+        ])
+    elif isinstance(obj, dict):
+        sha1.update(b'dict')
+        for key in sorted(obj, key=str):
+            _update(sha1, str(key))
+            _update(sha1, obj[key])
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        sha1.update(type(obj).__name__.encode())
+        for item in (sorted(obj, key=str) if isinstance(obj, (set, frozenset)) else obj):
+            _update(sha1, item)
+    else:
+        sha1.update(json.dumps(obj, default=str, ensure_ascii=False).encode())
+
+# %%
+def _constants(
+    namespace: dict
+    ) -> dict:
+    """
+    Returns the upper case constants (data only) of a module namespace, e.g. the mapping dicts of dom_constants.
+
+    Parameters:
+    namespace (dict): The namespace (module globals).
+
+    Returns:
+    dict: The constants.
+    """
+    return {
+        name: value for name, value in namespace.items()
+        if name.isupper() and isinstance(value, (dict, list, tuple, str, int, float, bool, Path))
+    }
+
+# %%
+def _module_source(
+    module_name: str
+    ) -> str:
+    """
+    Returns the source code of a loaded module, so a change in any helper called by a stage function
+    changes its fingerprint (as format_fingerprint does for excel.py).
+
+    Parameters:
+    module_name (str): The name of the module (e.g. 'dom_get_inverters').
+
+    Returns:
+    str: The source code, or an empty string if it is not available (builtins, extension modules).
+    """
+    module = sys.modules.get(module_name)
+    try:
+        return inspect.getsource(module) if module is not None else ""
+    except (OSError, TypeError):
+        return ""
+
+# %%
+def fingerprint(
+    *objs: Any
+    ) -> str:
+    """
+    Computes a stable SHA-1 fingerprint of the given objects.
+
+    Parameters:
+    *objs (Any): The objects to fingerprint.
+
+    Returns:
+    str: The hexadecimal fingerprint.
+    """
+    sha1 = hashlib.sha1()
+    for obj in objs:
+        _update(sha1, obj)
+    return sha1.hexdigest()
+
+# %%
+def evict_cache(
+    cache_dir: Union[str, Path],
+    max_cache_bytes: int
+    ) -> int:
+    """
+    Removes the least recently used cache entries until the cache is under max_cache_bytes.
+
+    Parameters:
+    cache_dir (str | Path): The cache folder.
+    max_cache_bytes (int): The maximum size of the cache in bytes.
+
+    Returns:
+    int: The number of entries removed.
+    """
+    entries = []
+    with os.scandir(cache_dir) as scanned:
+        for entry in scanned:
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_cache_bytes:
+            break
+        os.remove(path)
+        total -= size
+        removed += 1
+    return removed
+
+# %%
+@profile_stage
+def run_stages(
+    stages: list[Stage],
+    targets: Union[list[str], None] = None,
+    cache_dir: Union[str, Path, None] = None,
+    max_cache_bytes: int = 2 * 2**30
+    ) -> dict[str, Any]:
+    """
+    Runs a graph of stages, reusing the results cached on disk for the stages whose fingerprint did not change.
+
+    The fingerprint of a stage combines its function (source code, module source and constants), the source
+    of its code_modules, its params and the fingerprints of its input stages, so it is known without running
+    anything upstream and a change in a module the stage does not use keeps its cached result. When a parameter
+    changes, only that stage and the stages downstream of it are recomputed; cached stages upstream of a
+    recomputed stage are loaded from disk only if needed. The cache keeps the most recently used entries
+    up to max_cache_bytes.
+
+    Parameters:
+    stages (list[Stage]): The stages of the graph.
+    targets (list[str] | None): The stages whose results are needed. Default is None (every stage without
+                                downstream stages).
+    cache_dir (str | Path | None): The cache folder. Default is None (no cache, everything is computed).
+    max_cache_bytes (int): The maximum size of the cache in bytes. Default is 2 GiB.
+
+    Returns:
+    dict[str, Any]: A dictionary with the target names as keys and their results as values.
+
+    Raises:
+    ValueError: If a stage name is duplicated, an input stage is unknown or the graph has a cycle.
+    StageCheckError: If the result of a stage fails its check; the stages downstream of it are not run.
+    """
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"Duplicated stage '{stage.name}'.")
+        by_name[stage.name] = stage
+    for stage in stages:
+        for name in stage.inputs:
+            if name not in by_name:
+                raise ValueError(f"Stage '{stage.name}' has an unknown input stage '{name}'.")
+
+    if targets is None:
+        used = {name for stage in stages for name in stage.inputs}
+        targets = [stage.name for stage in stages if stage.name not in used]
+
+    if cache_dir is not None:
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+    keys: dict[str, str] = {}
+    results: dict[str, Any] = {}
+    visiting: set[str] = set()
+
+    def key_of(name: str) -> str:
+        if name in keys:
+            return keys[name]
+        if name in visiting:
+            raise ValueError(f"The stage graph has a cycle through '{name}'.")
+        visiting.add(name)
+        stage = by_name[name]
+        input_keys = [key_of(input_name) for input_name in stage.inputs]
+        code = [_module_source(module_name) for module_name in stage.code_modules]
+        if stage.cache:
+            keys[name] = fingerprint(stage.name, stage.func, code, stage.params, input_keys)
+        else:
+            # Volatile stages run now and are fingerprinted by their result
+            results[name] = checked(stage, stage.func(*[result_of(input_name) for input_name in stage.inputs], **stage.params, **stage.options))
+            keys[name] = fingerprint(stage.name, stage.func, code, stage.params, input_keys, results[name])
+        visiting.discard(name)
+        return keys[name]
+
+    def checked(stage: Stage, result: Any) -> Any:
+        if stage.check is not None:
+            message = stage.check(result)
+            if message != "OK":
+                raise StageCheckError(stage.name, message)
+        return result
+
+    def result_of(name: str) -> Any:
+        if name in results:
+            return results[name]
+        stage = by_name[name]
+        cache_path = cache_dir / f"{name}_{key_of(name)}.pkl" if cache_dir is not None and stage.cache else None
+
+        if cache_path is not None and cache_path.exists():
+            with open(cache_path, 'rb') as f:
+                results[name] = pickle.load(f)
+            os.utime(cache_path)  # most recently used
+            logging.info(f"Stage '{name}' loaded from cache.")
+            return checked(stage, results[name])
+
+        results[name] = stage.func(*[result_of(input_name) for input_name in stage.inputs], **stage.params, **stage.options)
+        logging.info(f"Stage '{name}' computed.")
+
+        if cache_path is not None:
+            temporary_path = cache_path.with_suffix('.tmp')
+            with open(temporary_path, 'wb') as f:
+                pickle.dump(results[name], f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, cache_path)
+            evict_cache(cache_dir, max_cache_bytes)
+        return checked(stage, results[name])
+
+    for name in targets:
+        key_of(name)
+    return {name: result_of(name) for name in targets}
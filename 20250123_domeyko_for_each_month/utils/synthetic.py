@@ -0,0 +1,357 @@
+# %%
+import sys
+import time
+import shutil
+import logging
+import tempfile
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from typing import Union
+from concurrent.futures import ProcessPoolExecutor
+from .data import rename_columns, to_agg_period_beta, set_date_as_index, watt_to_energy
+from .pipeline import read_files_in_parallel, combine_on_range, write_outputs_overlapped
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import xlwt
+except ImportError:  # Only needed to write the synthetic .xls exports
+    xlwt = None
+
+# Stages timed by run_scale, in pipeline order
+SCALING_STAGES = ["generate", "parse", "combine", "aggregate", "write"]
+
+# Columns of an SDI (SCADA) export before the measures (see read_xls_file)
+SDI_DATE_COLUMNS = ['L', 'gg', 'mm', 'aaaa', 'hh', 'mm', 'ss', 'mmm']
+
+# Maximum number of columns of an .xls sheet
+XLS_MAX_COLUMNS = 256
+
+# %%
+def synthetic_park(
+    n_cabins: int,
+    n_inverters_per_cabin: int,
+    n_cabins_per_station: int = 5
+    ) -> dict[str, dict]:
+    """
+    Builds the tag maps of a synthetic park, in the style of dom_constants
+    (e.g. 'PN1_S11_AN10028': 'Cabin 1 inverter 1 [kW]'), and the inverters exported by every SCADA station.
+
+    Parameters:
+    n_cabins (int): The number of cabins.
+    n_inverters_per_cabin (int): The number of inverters per cabin.
+    n_cabins_per_station (int): The number of cabins per SCADA station (the 'S' digits). Default is 5.
+
+    Returns:
+    dict[str, dict]: The maps 'kw_scada_to_tag', 'operations_1m_to_15m', 'kw_to_kwh' and
+                     'operations_15m_to_1h_1d', as INVERTERS_KW_SCADA_TO_TAG, INVERTERS_OPERATIONS_1M_TO_15M,
+                     INVERTERS_KW_TO_KWH and INVERTERS_OPERATIONS_15M_TO_1H_1D, and 'stations', the SCADA names
+                     of the inverters of every station (e.g. 'EMELDA_1': ['PN1_S11_AN10028', ...]).
+    """
+    kw_scada_to_tag = {}
+    stations = {}
+    for cabin in range(1, n_cabins + 1):
+        station, position = divmod(cabin - 1, n_cabins_per_station)
+        for inverter in range(1, n_inverters_per_cabin + 1):
+            scada_name = f'PN1_S{station + 1}{position + 1}_AN{inverter}0028'
+            kw_scada_to_tag[scada_name] = f'Cabin {cabin} inverter {inverter} [kW]'
+            stations.setdefault(f'EMELDA_{station + 1}', []).append(scada_name)
+
+    kw_to_kwh = {tag: tag[:-1] + 'h]' for tag in kw_scada_to_tag.values()}
+    return {
+        'kw_scada_to_tag': kw_scada_to_tag,
+        'operations_1m_to_15m': {tag: 'mean' for tag in kw_scada_to_tag.values()},
+        'kw_to_kwh': kw_to_kwh,
+        'operations_15m_to_1h_1d': {tag: 'sum' for tag in kw_to_kwh.values()},
+        'stations': stations,
+    }
+
+# %%
+def synthetic_inverter_day(
+    scada_names: list[str],
+    day: pd.Timestamp,
+    agg_period: int = 1,
+    rated_power_kw: float = 2500.0,
+    nan_fraction: float = 0.001,
+    seed: Union[int, None] = None
+    ) -> pd.DataFrame:
+    """
+    Generates one day of inverter power, shaped like a SCADA export after read_xls_file ('date' + SCADA names).
+
+    Every inverter follows a clear sky bell between 06:30 and 19:30 scaled by its own factor, with noise
+    and randomly missing values.
+
+    Parameters:
+    scada_names (list[str]): The SCADA names of the inverters.
+    day (pd.Timestamp): The day.
+    agg_period (int): The period of the data in minutes. Default is 1.
+    rated_power_kw (float): The rated power of the inverters. Default is 2500 kW.
+    nan_fraction (float): The fraction of missing values. Default is 0.001.
+    seed (int | None): The seed of the random generator. Default is None.
+
+    Returns:
+    pd.DataFrame: The 'date' column and one power column (kW) per inverter.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(day, periods=1440 // agg_period, freq=f'{agg_period}min')
+    hours = dates.hour.to_numpy() + dates.minute.to_numpy() / 60
+    bell = np.clip(np.sin(np.pi * (hours - 6.5) / 13), 0, None)
+
+    factors = rng.uniform(0.85, 1.0, len(scada_names))
+    values = bell[:, None] * factors[None, :] * rated_power_kw
+    values *= rng.normal(1.0, 0.02, values.shape)
+    values[rng.random(values.shape) < nan_fraction] = np.nan
+
+    df = pd.DataFrame(values, columns=scada_names)
+    df.insert(0, 'date', dates)
+    return df
+
+# %%
+def write_sdi_xls(
+    df: pd.DataFrame,
+    file_path: Path
+    ) -> None:
+    """
+    Writes a DataFrame ('date' + SCADA names) as an SDI (SCADA) .xls export, so it is parsed by read_xls_file:
+    the date components in the SDI_DATE_COLUMNS as text, then one column per SCADA name, missing values left blank.
+
+    Parameters:
+    df (pd.DataFrame): The 'date' column and the measures (see synthetic_inverter_day).
+    file_path (Path): The path of the .xls file.
+
+    Raises:
+    ImportError: If xlwt is not installed.
+    ValueError: If the export does not fit in an .xls sheet (XLS_MAX_COLUMNS).
+    """
+    if xlwt is None:
+        raise ImportError("xlwt is required to write the synthetic .xls exports")
+    scada_names = [column for column in df.columns if column != 'date']
+    if len(SDI_DATE_COLUMNS) + len(scada_names) > XLS_MAX_COLUMNS:
+        raise ValueError(f"{len(scada_names)} measures do not fit in an .xls sheet of {XLS_MAX_COLUMNS} columns")
+
+    dates = df['date']
+    date_parts = [
+        ['x'] * len(df),
+        dates.dt.strftime('%d').tolist(),
+        dates.dt.strftime('%m').tolist(),
+        dates.dt.strftime('%Y').tolist(),
+        dates.dt.strftime('%H').tolist(),
+        dates.dt.strftime('%M').tolist(),
+        dates.dt.strftime('%S').tolist(),
+        [0] * len(df),
+    ]
+    values = df[scada_names].to_numpy(dtype=float)
+
+    wb = xlwt.Workbook()
+    ws = wb.add_sheet('Sheet1')
+    for column, name in enumerate(SDI_DATE_COLUMNS + scada_names):
+        ws.write(0, column, name)
+    for row in range(len(df)):
+        for column, parts in enumerate(date_parts):
+            ws.write(row + 1, column, parts[row])
+        for column, value in enumerate(values[row], start=len(date_parts)):
+            if not np.isnan(value):
+                ws.write(row + 1, column, value)
+    wb.save(str(file_path))
+
+# %%
+def _write_station_day(
+    task: tuple[Path, list[str], pd.Timestamp, int]
+    ) -> None:
+    """
+    Generates one day of a SCADA station and writes it as an SDI .xls export (run in the generation processes).
+
+    Parameters:
+    task (tuple[Path, list[str], pd.Timestamp, int]): The path of the file, the SCADA names of the inverters
+                                                      of the station, the day and the seed.
+    """
+    file_path, scada_names, day, seed = task
+    write_sdi_xls(synthetic_inverter_day(scada_names, day, seed=seed), file_path)
+
+# %%
+def _aggregate_park(
+    df: pd.DataFrame,
+    park: dict[str, dict]
+    ) -> list[tuple[str, pd.DataFrame]]:
+    """
+    Aggregates the 1 minute power of a synthetic park as aggregate_inverters does for Domeyko.
+
+    Parameters:
+    df (pd.DataFrame): The combined 1 minute DataFrame indexed by date.
+    park (dict[str, dict]): The tag maps (see synthetic_park).
+
+    Returns:
+    list[tuple[str, pd.DataFrame]]: The 15M, 1H and 1D DataFrames.
+    """
+    df_15m = set_date_as_index(to_agg_period_beta(df, 15, park['operations_1m_to_15m']))
+    df_15m = watt_to_energy(df_15m, list(park['kw_scada_to_tag'].values()), 15 / 60)
+    df_15m = rename_columns(df_15m, park['kw_to_kwh'])
+    return [
+        ("15M", df_15m),
+        ("1H", set_date_as_index(to_agg_period_beta(df_15m, 60, park['operations_15m_to_1h_1d']))),
+        ("1D", set_date_as_index(to_agg_period_beta(df_15m, 1440, park['operations_15m_to_1h_1d']))),
+    ]
+
+# %%
+def _peak_rss_bytes() -> Union[int, None]:
+    """
+    Returns the peak resident set size of the current process, or None if it is not available.
+
+    Returns:
+    int | None: The peak RSS in bytes.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+# %%
+def run_scale(
+    scale: int,
+    n_cabins: int,
+    n_inverters_per_cabin: int,
+    months: list[pd.Timestamp],
+    output_format: Union[str, None] = "xlsx",
+    workers: Union[int, None] = None,
+    seed: int = 0
+    ) -> dict:
+    """
+    Runs the inverter pipeline (parse -> combine -> aggregate -> write) on a synthetic park of scale times the
+    size of the reference park, month by month, and times every stage.
+
+    The raw files are written as the SDI exports are: one .xls file per SCADA station and day (fewer than
+    XLS_MAX_COLUMNS columns each), in a temporary folder. They are parsed with read_files_in_parallel and the
+    outputs written with write_outputs_overlapped (set_format_01 on every sheet for xlsx).
+    Run it in a fresh process (see run_scaling) so the peak RSS belongs to this scale only.
+
+    Parameters:
+    scale (int): The size of the park relative to the reference park (cabins are multiplied).
+    n_cabins (int): The number of cabins of the reference park (e.g. N_CABINS).
+    n_inverters_per_cabin (int): The number of inverters per cabin (e.g. N_INVERTERS_PER_CABIN).
+    months (list[pd.Timestamp]): The first day of every month to process.
+    output_format (str | None): "xlsx", "csv" or None (outputs are not written). Default is "xlsx".
+    workers (int | None): The number of processes generating and parsing the raw files.
+                          Default is None (number of CPUs). 1 runs them in this process.
+    seed (int): The seed of the random generator. Default is 0.
+
+    Returns:
+    dict: The scale, number of tags, rows, seconds per stage (SCALING_STAGES), total seconds,
+          throughput (rows·tags/s, generation excluded) and peak RSS (bytes).
+    """
+    park = synthetic_park(n_cabins * scale, n_inverters_per_cabin)
+    scada_names = list(park['kw_scada_to_tag'])
+    seconds = {stage: 0.0 for stage in SCALING_STAGES}
+    rows = 0
+
+    with tempfile.TemporaryDirectory() as output_folder:
+        for n_month, month in enumerate(months):
+            next_month = month + pd.offsets.MonthBegin(1)
+            raw_folder = Path(output_folder) / f"{month:%Y_%m}_raw"
+            raw_folder.mkdir()
+            tasks = [
+                (raw_folder / f"{station}_{day:%Y%m%d}.xls", station_names, day, seed + 10000 * (31 * n_month + n_day) + n_station)
+                for n_day, day in enumerate(pd.date_range(month, next_month, freq='D', inclusive='left'))
+                for n_station, (station, station_names) in enumerate(park['stations'].items())
+            ]
+
+            start = time.perf_counter()
+            if workers == 1:
+                list(map(_write_station_day, tasks))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(_write_station_day, tasks))
+            seconds["generate"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            dfs, errors = read_files_in_parallel([str(task[0]) for task in tasks], park['kw_scada_to_tag'], workers)
+            seconds["parse"] += time.perf_counter() - start
+            for error in errors:
+                logging.warning(error)
+            shutil.rmtree(raw_folder)
+
+            start = time.perf_counter()
+            df = combine_on_range(dfs, month.strftime('%d-%m-%Y'), next_month.strftime('%d-%m-%Y'), 1)
+            seconds["combine"] += time.perf_counter() - start
+            rows += len(df)
+            del dfs
+
+            start = time.perf_counter()
+            outputs = _aggregate_park(df, park)
+            seconds["aggregate"] += time.perf_counter() - start
+            del df
+
+            if output_format is not None:
+                start = time.perf_counter()
+                write_outputs_overlapped(outputs, Path(output_folder) / f"{month:%Y_%m}.xlsx", output_format)
+                seconds["write"] += time.perf_counter() - start
+
+    n_tags = len(scada_names)
+    processing_seconds = sum(seconds[stage] for stage in SCALING_STAGES if stage != "generate")
+    return {
+        'scale': scale,
+        'tags': n_tags,
+        'rows': rows,
+        **{f'{stage} [s]': value for stage, value in seconds.items()},
+        'total [s]': processing_seconds,
+        'throughput [rows·tags/s]': rows * n_tags / processing_seconds if processing_seconds else np.nan,
+        'peak RSS [MB]': (_peak_rss_bytes() or np.nan) / 2**20,
+    }
+
+# %%
+def run_scaling(
+    scales: list[int],
+    n_cabins: int,
+    n_inverters_per_cabin: int,
+    months: list[pd.Timestamp],
+    output_format: Union[str, None] = "xlsx",
+    workers: Union[int, None] = None
+    ) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Runs run_scale for every scale, each one in a fresh process, and reports how every stage scales.
+
+    The scaling exponent of a stage is the slope of log(seconds) against log(scale): 1 means linear,
+    above 1 the stage grows faster than the data and is where the code stops scaling.
+
+    Parameters:
+    scales (list[int]): The scales to run (e.g. [1, 10, 100]).
+    n_cabins (int): The number of cabins of the reference park (e.g. N_CABINS).
+    n_inverters_per_cabin (int): The number of inverters per cabin (e.g. N_INVERTERS_PER_CABIN).
+    months (list[pd.Timestamp]): The first day of every month to process.
+    output_format (str | None): "xlsx", "csv" or None (outputs are not written). Default is "xlsx".
+    workers (int | None): The number of processes generating and parsing the raw files (see run_scale).
+                          Default is None (number of CPUs).
+
+    Returns:
+    tuple[pd.DataFrame, pd.DataFrame]:
+        - One row per scale with the results of run_scale.
+        - One row per stage with the scaling exponent (NaN with less than two scales).
+    """
+    results = []
+    for scale in scales:
+        logging.info(f"Running scale {scale}x ({n_cabins * scale * n_inverters_per_cabin} inverters, {len(months)} months)")
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(run_scale, scale, n_cabins, n_inverters_per_cabin, months, output_format, workers).result()
+        logging.info(
+            f"Scale {scale}x: {result['total [s]']:.1f} s, {result['throughput [rows·tags/s]']:.3g} rows·tags/s, "
+            f"peak RSS {result['peak RSS [MB]']:.0f} MB"
+        )
+        results.append(result)
+
+    df_results = pd.DataFrame(results).set_index('scale')
+
+    exponents = {}
+    for stage in SCALING_STAGES + ["total"]:
+        stage_seconds = df_results[f'{stage} [s]']
+        valid = stage_seconds > 0
+        if valid.sum() >= 2:
+            exponents[stage] = np.polyfit(np.log(stage_seconds.index[valid]), np.log(stage_seconds[valid]), 1)[0]
+        else:
+            exponents[stage] = np.nan
+    df_exponents = pd.DataFrame({'scaling exponent': exponents})
+    df_exponents.index.name = 'stage'
+    return df_results, df_exponents
@@ -0,0 +1,271 @@
+# %%
+import logging
+import datetime
+import pandas as pd
+import numpy as np
+from typing import Union
+from .profiling import profile_stage
+
+# Timestamp conventions and the shift (as a fraction of the interval) that moves them to the interval start
+TIMESTAMP_CONVENTIONS = {
+    'start': 0.0,
+    'center': 0.5,
+    'end': 1.0,
+}
+
+# %%
+def _occurrence(
+    values: np.ndarray
+    ) -> np.ndarray:
+    """
+    Numbers the repetitions of every value in order of appearance (0 for the first, 1 for the second, ...).
+
+    Parameters:
+    values (np.ndarray): A 1D array.
+
+    Returns:
+    np.ndarray: An integer array with the occurrence number of every value.
+    """
+    order = np.argsort(values, kind='stable')
+    sorted_values = values[order]
+    is_new = np.ones(len(values), dtype=bool)
+    is_new[1:] = sorted_values[1:] != sorted_values[:-1]
+    group_start = np.maximum.accumulate(np.where(is_new, np.arange(len(values)), 0))
+    occurrence = np.empty(len(values), dtype=np.int64)
+    occurrence[order] = np.arange(len(values)) - group_start
+    return occurrence
+
+# %%
+@profile_stage
+def normalize_timestamps(
+    dates: pd.Series,
+    rule: dict
+    ) -> tuple[np.ndarray, dict[str, int]]:
+    """
+    Converts naive timestamps, as written by a source, to UTC int64 nanoseconds at the start of the interval.
+
+    The rule (see TIMESTAMP_RULES) gives either a 'timezone' (wall clock with DST) or a fixed 'utc_offset_hours',
+    the 'timestamp_convention' ('start', 'center' or 'end') and the 'interval_minutes'.
+
+    With a timezone, the DST changes are resolved for all rows at once:
+        - Repeated hour (clock set back): the first occurrence of a wall clock time is taken as DST and the
+          second one as standard time, so both hours are kept instead of dropping the second one.
+        - Skipped hour (clock set forward): wall clock times that do not exist are read with the UTC offset in
+          force before the change, i.e. moved forward by the DST shift.
+
+    Parameters:
+    dates (pd.Series): The naive timestamps, in the order of the file.
+    rule (dict): The timestamp rule of the source.
+
+    Returns:
+    tuple[np.ndarray, dict[str, int]]:
+        - The UTC timestamps (int64 ns), in the order of the input.
+        - The number of 'repeated_hour' rows (second occurrences moved to standard time), 'ambiguous_single'
+          rows (repeated hour seen only once, taken as DST) and 'skipped_hour' rows.
+
+    Raises:
+    ValueError: If the timestamp convention is not valid or the rule has no timezone nor UTC offset.
+    """
+    utc_ns, _, report = _resolve_timestamps(dates, rule)
+    return utc_ns, report
+
+# %%
+def _resolve_timestamps(
+    dates: pd.Series,
+    rule: dict
+    ) -> tuple[np.ndarray, np.ndarray, dict[str, int]]:
+    """
+    Implements normalize_timestamps, also returning which rows fall in the skipped hour.
+
+    Parameters:
+    dates (pd.Series): The naive timestamps, in the order of the file.
+    rule (dict): The timestamp rule of the source.
+
+    Returns:
+    tuple[np.ndarray, np.ndarray, dict[str, int]]: The UTC timestamps (int64 ns), a boolean array True for the
+                                                   wall clock times that do not exist, and the report.
+    """
+    convention = rule.get('timestamp_convention', 'start')
+    if convention not in TIMESTAMP_CONVENTIONS:
+        raise ValueError(
+            f"Invalid timestamp convention '{convention}'. Valid conventions are {', '.join(TIMESTAMP_CONVENTIONS)}"
+        )
+    local = pd.DatetimeIndex(dates).as_unit('ns')
+    local_ns = local.asi8
+    report = {'repeated_hour': 0, 'ambiguous_single': 0, 'skipped_hour': 0}
+    skipped = np.zeros(len(local), dtype=bool)
+
+    if rule.get('timezone') is not None:
+        as_dst = local.tz_localize(rule['timezone'], ambiguous=np.ones(len(local), dtype=bool), nonexistent='NaT')
+        as_standard = local.tz_localize(rule['timezone'], ambiguous=np.zeros(len(local), dtype=bool), nonexistent='NaT')
+        skipped = np.asarray(as_dst.isna())
+        ambiguous = ~skipped & (as_dst.asi8 != as_standard.asi8)
+
+        occurrence = np.zeros(len(local), dtype=np.int64)
+        occurrence[ambiguous] = _occurrence(local_ns[ambiguous])
+        second = ambiguous & (occurrence > 0)
+        utc_ns = np.where(second, as_standard.asi8, as_dst.asi8)
+
+        if skipped.any():
+            # Skipped wall clock times keep the UTC offset in force before the change
+            before = local[skipped].tz_localize(rule['timezone'], nonexistent='shift_backward')
+            utc_ns[skipped] = local_ns[skipped] - (before.tz_localize(None).asi8 - before.asi8)
+
+        seen_twice = np.isin(local_ns[ambiguous], local_ns[second])
+        report['repeated_hour'] = int(second.sum())
+        report['ambiguous_single'] = int((~seen_twice).sum())
+        report['skipped_hour'] = int(skipped.sum())
+    elif rule.get('utc_offset_hours') is not None:
+        utc_ns = local_ns - int(rule['utc_offset_hours'] * 3600 * 10**9)
+    else:
+        raise ValueError("The timestamp rule must have a 'timezone' or a 'utc_offset_hours'.")
+
+    shift_ns = int(rule.get('interval_minutes', 0) * 60 * 10**9 * TIMESTAMP_CONVENTIONS[convention])
+    return utc_ns - shift_ns, skipped, report
+
+# %%
+def _skipped_collisions(
+    utc_ns: np.ndarray,
+    skipped: np.ndarray
+    ) -> np.ndarray:
+    """
+    Finds the rows of the skipped hour that land on the same UTC time as a row with an existing wall clock time
+    (e.g. 00:00 read with the offset before the change and the real 01:00 after it).
+
+    Parameters:
+    utc_ns (np.ndarray): The UTC timestamps (int64 ns).
+    skipped (np.ndarray): A boolean array, True for the wall clock times that do not exist.
+
+    Returns:
+    np.ndarray: A boolean array, True for the skipped hour rows colliding with an existing time.
+    """
+    return skipped & np.isin(utc_ns, utc_ns[~skipped])
+
+# %%
+@profile_stage
+def normalize_dataframe_dates(
+    df: pd.DataFrame,
+    rule: dict,
+    column: str = 'date'
+    ) -> pd.DataFrame:
+    """
+    Replaces the naive date column of a DataFrame with a UTC int64 (ns) index named 'utc', with normalize_timestamps.
+
+    A row whose wall clock time does not exist (skipped hour) and lands on the UTC time of a row with an existing
+    wall clock time is dropped: the existing time is the reading of that instant and the skipped one cannot be
+    placed ('skipped_collisions' in the log). Rows that still share a UTC timestamp (e.g. overlapping exports)
+    are combined, keeping for every column the first value that is not NaN, instead of discarding whole rows.
+    The DST resolutions, dropped and combined rows are logged.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame with the naive date column, in the order of the file.
+    rule (dict): The timestamp rule of the source (see TIMESTAMP_RULES).
+    column (str): The name of the date column. Default is 'date'.
+
+    Returns:
+    pd.DataFrame: The DataFrame indexed by the sorted, unique UTC timestamps.
+    """
+    utc_ns, skipped, report = _resolve_timestamps(df[column], rule)
+    keep = ~_skipped_collisions(utc_ns, skipped)
+    report['skipped_collisions'] = int((~keep).sum())
+    df = df.loc[keep].drop(columns=[column])
+    df.index = pd.Index(utc_ns[keep], name='utc')
+
+    n_rows = len(df)
+    if df.index.has_duplicates:
+        df = df.groupby(level='utc', sort=True).first()
+    else:
+        df = df.sort_index()
+    report['combined_rows'] = n_rows - len(df)
+
+    if any(report.values()):
+        logging.warning(f"Timestamps normalized to UTC: {', '.join(f'{key}={value}' for key, value in report.items())}")
+    return df
+
+# %%
+def utc_to_local(
+    utc_ns: np.ndarray,
+    timezone: str
+    ) -> pd.DatetimeIndex:
+    """
+    Converts UTC int64 (ns) timestamps to naive wall clock timestamps of a timezone, for reports.
+
+    Parameters:
+    utc_ns (np.ndarray): The UTC timestamps (int64 ns).
+    timezone (str): The timezone (e.g. 'America/Santiago').
+
+    Returns:
+    pd.DatetimeIndex: The naive local timestamps.
+    """
+    return pd.DatetimeIndex(np.asarray(utc_ns, dtype=np.int64).view('datetime64[ns]')).tz_localize('UTC').tz_convert(timezone).tz_localize(None)
+
+# %%
+def rule_timezone(
+    rule: dict
+    ) -> Union[str, datetime.timezone]:
+    """
+    Returns the timezone of a timestamp rule: its 'timezone', or a fixed offset from its 'utc_offset_hours'.
+
+    Parameters:
+    rule (dict): The timestamp rule (see TIMESTAMP_RULES).
+
+    Returns:
+    str | datetime.timezone: The timezone.
+    """
+    if rule.get('timezone') is not None:
+        return rule['timezone']
+    return datetime.timezone(datetime.timedelta(hours=rule['utc_offset_hours']))
+
+# %%
+@profile_stage
+def localize_dataframe_dates(
+    df: pd.DataFrame,
+    rule: dict,
+    column: str = 'date'
+    ) -> pd.DataFrame:
+    """
+    Replaces the naive date column of a DataFrame with timezone-aware local dates at the start of the interval,
+    so the repeated hour of the fall-back day is kept as two distinct hours (see normalize_timestamps).
+
+    Used by read_scada_file: the processing (cleaning, combination on the range, aggregation with DST-aware days)
+    runs on the aware dates and the outputs are written in wall clock time (see to_wall_clock). As in
+    normalize_dataframe_dates, the skipped hour rows colliding with an existing time are dropped and logged.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame with the naive date column, in the order of the file.
+    rule (dict): The timestamp rule of the source (see TIMESTAMP_RULES).
+    column (str): The name of the date column. Default is 'date'.
+
+    Returns:
+    pd.DataFrame: A copy of the DataFrame with the aware date column, in the order of the file.
+    """
+    utc_ns, skipped, report = _resolve_timestamps(df[column], rule)
+    keep = ~_skipped_collisions(utc_ns, skipped)
+    report['skipped_collisions'] = int((~keep).sum())
+
+    df = df.loc[keep].copy()
+    df[column] = pd.DatetimeIndex(utc_ns[keep].view('datetime64[ns]')).tz_localize('UTC').tz_convert(rule_timezone(rule))
+
+    if any(report.values()):
+        logging.warning(f"Timestamps localized: {', '.join(f'{key}={value}' for key, value in report.items())}")
+    return df
+
+# %%
+def to_wall_clock(
+    df: pd.DataFrame
+    ) -> pd.DataFrame:
+    """
+    Converts a timezone-aware datetime index to naive wall clock time, as written in the reports (Excel does not
+    store timezones). On the fall-back day the repeated hour appears twice, in order. Naive indexes are kept.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame with a datetime index.
+
+    Returns:
+    pd.DataFrame: The DataFrame with a naive datetime index.
+    """
+    if getattr(df.index, 'tz', None) is None:
+        return df
+    df = df.copy(deep=False)
+    df.index = df.index.tz_localize(None)
+    return df
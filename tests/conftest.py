@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The package folder starts with a digit, so its modules are imported as the scripts do
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "20250123_domeyko_for_each_month"))
@@ -0,0 +1,112 @@
+import os
+import datetime
+
+import pytest
+
+from utils import catalog
+from utils.catalog import open_catalog, refresh_catalog, query_catalog, refresh_all, find_raw_files
+
+
+def _first_line_range(file_path):
+    # Test files hold their covered range as 'YYYY-MM-DD HH:MM;YYYY-MM-DD HH:MM'
+    with open(file_path) as f:
+        start, end = f.readline().strip().split(";")
+    return datetime.datetime.fromisoformat(start), datetime.datetime.fromisoformat(end)
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    monkeypatch.setitem(catalog.TIME_RANGE_READERS, "sensor", _first_line_range)
+    for folder, name, content in [
+        ("fa", "EMELDA_1_a.xls", "2025-02-27 00:00;2025-03-01 00:00"),
+        ("fa", "EMELDA_1_b.xls", "2025-03-01 00:00;2025-03-02 00:00"),
+        ("fa", "EMELDA_1_c.csv", "2025-03-01 00:00;2025-03-02 00:00"),
+        ("fb", "EMELDA_FT1_a.xls", "2025-04-01 00:00;2025-04-02 00:00"),
+    ]:
+        (tmp_path / folder).mkdir(exist_ok=True)
+        (tmp_path / folder / name).write_text(content)
+    connection = open_catalog(tmp_path / "catalog.sqlite")
+    yield tmp_path, connection
+    connection.close()
+
+
+def _paths(connection):
+    return sorted(os.path.basename(path) for (path,) in connection.execute("SELECT path FROM raw_files"))
+
+
+def test_refresh_is_incremental(tree):
+    root, connection = tree
+    sources = {"sensor": root / "fa"}
+
+    assert refresh_catalog(connection, sources, ["xls"]) == {"added": 2, "updated": 0, "unchanged": 0, "removed": 0}
+    assert refresh_catalog(connection, sources, ["xls"]) == {"added": 0, "updated": 0, "unchanged": 2, "removed": 0}
+
+    (root / "fa" / "EMELDA_1_a.xls").write_text("2025-02-27 00:00;2025-03-05 00:00")
+    os.utime(root / "fa" / "EMELDA_1_a.xls", ns=(1, 1))
+    (root / "fa" / "EMELDA_1_b.xls").unlink()
+    assert refresh_catalog(connection, sources, ["xls"]) == {"added": 0, "updated": 1, "unchanged": 0, "removed": 1}
+    assert _paths(connection) == ["EMELDA_1_a.xls"]
+
+
+def test_refresh_only_removes_rows_under_the_folder_and_extensions(tree):
+    root, connection = tree
+    refresh_catalog(connection, {"sensor": root / "fa"}, ["xls", "csv"])
+
+    # Another folder of the same source and a subset of the extensions keep the rows of 'fa'
+    stats = refresh_catalog(connection, {"sensor": root / "fb"}, ["xls"])
+    assert stats["removed"] == 0
+    assert refresh_catalog(connection, {"sensor": root / "fa"}, ["xls"])["removed"] == 0
+    assert _paths(connection) == ["EMELDA_1_a.xls", "EMELDA_1_b.xls", "EMELDA_1_c.csv", "EMELDA_FT1_a.xls"]
+
+
+def test_find_raw_files_keeps_other_folders(tree):
+    root, connection = tree
+    catalog_path = root / "catalog.sqlite"
+
+    assert len(find_raw_files(root / "fa", "xls", "sensor", catalog_path)) == 2
+    df = find_raw_files(root / "fb", "xls", "sensor", catalog_path)
+
+    assert [os.path.basename(path) for path in df["path"]] == ["EMELDA_FT1_a.xls"]
+    assert df["substation"].tolist() == ["EMELDA_FT1"]
+    assert len(find_raw_files(root / "fa", "xls", "sensor", catalog_path)) == 2
+
+
+def test_unreachable_folder_removes_nothing(tree, monkeypatch):
+    root, connection = tree
+    refresh_catalog(connection, {"sensor": root / "fa"}, ["xls"])
+
+    def unreachable(folder_path, errors):
+        errors.append(str(folder_path))
+        yield from ()
+
+    monkeypatch.setattr(catalog, "_scan_files", unreachable)
+    stats = refresh_catalog(connection, {"sensor": root / "fa"}, ["xls"])
+    assert stats == {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+    assert len(_paths(connection)) == 2
+
+
+def test_query_overlapping_time_range(tree):
+    root, connection = tree
+    refresh_catalog(connection, {"sensor": root / "fa"}, ["xls", "csv"])
+
+    df = query_catalog(connection, "sensor", start="2025-03-01", end="2025-04-01", extension="xls")
+    assert [os.path.basename(path) for path in df["path"]] == ["EMELDA_1_a.xls", "EMELDA_1_b.xls"]
+    df = query_catalog(connection, "sensor", start="2025-03-01 12:00", end="2025-04-01", extension="xls")
+    assert [os.path.basename(path) for path in df["path"]] == ["EMELDA_1_b.xls"]
+    assert query_catalog(connection, "sensor", substation="emelda_ft1").empty
+
+
+def test_refresh_all_skips_missing_folders(tree):
+    root, connection = tree
+    stats = refresh_all(root / "catalog.sqlite", {"sensor": root / "fa", "meter": root / "04_meters"}, ["xls"])
+
+    assert stats["added"] == 2
+    assert refresh_all(root / "other.sqlite", {"meter": root / "04_meters"}, ["xls"])["added"] == 0
+
+
+def test_find_raw_files_in_a_missing_folder(tmp_path):
+    # The catalog lives in the raw data folder of the month, which may not exist either
+    df = find_raw_files(tmp_path / "01_raw_data" / "02_sensors", "xls", "sensor", tmp_path / "01_raw_data" / "catalog.sqlite")
+
+    assert df.empty and list(df.columns) == ["path", "size", "mtime_ns", "substation"]
+    assert not (tmp_path / "01_raw_data").exists()
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import energy
+from utils.energy import reconcile_month, generacion_cabin_groups, register_to_interval_energy
+
+RULES = {
+    "inverter": {"timezone": "America/Santiago", "timestamp_convention": "start", "interval_minutes": 1},
+    "generacion": {"timezone": "America/Santiago", "timestamp_convention": "end", "interval_minutes": 15},
+    "meter": {"timezone": "America/Santiago", "timestamp_convention": "end", "interval_minutes": 15},
+}
+INVERTERS = {"PN1_S11_AN10028": "Cabin 1 inverter 1 [kWh]", "PN1_S11_AN20028": "Cabin 1 inverter 2 [kWh]"}
+DATES = pd.date_range("2024-12-02 10:00", "2024-12-02 11:00", freq="15min", name="date")
+# Every inverter produces 10, 20, ... 50 kWh, so the cabin produces 20, 40, ... 100 kWh
+PRODUCTION = pd.DataFrame({tag: np.arange(1, 6) * 10.0 for tag in INVERTERS.values()}, index=DATES)
+
+
+def _reconcile(monkeypatch, meters, generacion=None, cumulative=False):
+    folders = {"meters": {"EMELDA_1": meters}, "generacion": {} if generacion is None else {"EMELDA_1": generacion}}
+    monkeypatch.setattr(energy, "read_scada_folder", lambda folder_path, *args: folders[folder_path])
+    monkeypatch.setattr(energy, "inverter_substations", lambda *args: {tag: "EMELDA_1" for tag in INVERTERS.values()})
+    return reconcile_month(PRODUCTION, RULES, "inverters", INVERTERS, "generacion", {}, "meters", {}, cumulative)
+
+
+def test_end_stamped_references_are_compared_with_the_interval_they_measure(monkeypatch):
+    # Stamped at the end of the interval and 2% below the cabin energy
+    end_dates = DATES + pd.Timedelta("15min")
+    meters = pd.DataFrame({"Meter [kWh]": np.arange(1, 6) * 19.6}, index=end_dates)
+    generacion = pd.DataFrame({"PN1_S11_AN00001": np.arange(1, 6) * 19.8}, index=end_dates)
+
+    results = _reconcile(monkeypatch, meters, generacion)
+
+    df_losses, df_summary = results["substation"]
+    assert df_losses.index.equals(DATES)
+    np.testing.assert_allclose(df_losses["EMELDA_1"], 2.0)
+    assert df_summary.loc["EMELDA_1", "valid intervals"] == 5
+    df_losses, df_summary = results["cabin"]
+    np.testing.assert_allclose(df_losses["Cabin 1"], 1.0)
+    assert df_summary.loc["Cabin 1", "reference energy"] == pytest.approx(19.8 * 15)
+
+
+def test_cumulative_meters_are_differenced(monkeypatch):
+    # Register readings at 10:00 ... 11:15: the 10:00 interval is the 10:15 reading minus the 10:00 one
+    readings = 1000 + np.concatenate([[0.0], np.cumsum(np.arange(1, 6) * 19.6)])
+    meters = pd.DataFrame({"Meter [kWh]": readings}, index=pd.date_range("2024-12-02 10:00", periods=6, freq="15min"))
+
+    results = _reconcile(monkeypatch, meters, cumulative=True)
+
+    np.testing.assert_allclose(results["substation"][0]["EMELDA_1"], 2.0)
+    assert "cabin" not in results
+
+
+def test_generacion_cabin_groups():
+    groups = generacion_cabin_groups(["Cabin 12 [kWh]", "PN1_S11_AN00001", "PN9_S99_AN00001"], INVERTERS)
+
+    assert groups == {"Cabin 12 [kWh]": "Cabin 12", "PN1_S11_AN00001": "Cabin 1"}
+
+
+def test_register_to_interval_energy_leaves_gaps_and_resets_as_nan():
+    dates = pd.to_datetime(["2024-12-02 10:00", "2024-12-02 10:15", "2024-12-02 10:45", "2024-12-02 11:00"])
+    df = pd.DataFrame({"register": [100.0, 110.0, 130.0, 5.0]}, index=dates)
+
+    df_energy = register_to_interval_energy(df, ["register"], 15)
+
+    np.testing.assert_array_equal(df_energy["register"].to_numpy(), [10.0, np.nan, np.nan, np.nan, np.nan])
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from utils.gap_filling import (
+    nan_run_lengths,
+    cabin_peer_groups,
+    nearest_peer_groups,
+    fill_gaps,
+    FILL_ORIGINAL,
+    FILL_INTERPOLATED,
+    FILL_FROM_PEERS,
+    FILL_MISSING,
+)
+
+A = "Cabin 1 inverter 1 [kW]"
+B = "Cabin 1 inverter 2 [kW]"
+
+
+def _frame(start, a):
+    dates = pd.date_range(start, periods=len(a), freq="1min", name="date")
+    return pd.DataFrame({A: a, B: np.arange(1, len(a) + 1) * 20.0}, index=dates)
+
+
+def test_nan_run_lengths():
+    values = np.array([
+        [np.nan, 1.0],
+        [np.nan, np.nan],
+        [1.0, np.nan],
+        [np.nan, np.nan],
+    ])
+
+    np.testing.assert_array_equal(nan_run_lengths(values), [[2, 0], [2, 3], [0, 3], [1, 3]])
+
+
+def test_short_gaps_are_interpolated_and_long_gaps_filled_from_peers():
+    df = _frame("2024-12-02 10:00", [10.0, np.nan, 30.0, np.nan, np.nan, np.nan, 70.0, 80.0])
+
+    df_filled, df_provenance = fill_gaps(df, max_interpolation_gap=2, peer_groups=cabin_peer_groups([A, B]))
+
+    # A is half of B where both are measured (190 / 380), so the long gap is filled with B / 2
+    np.testing.assert_allclose(df_filled[A], [10, 20, 30, 40, 50, 60, 70, 80])
+    assert df_provenance[A].tolist() == [
+        FILL_ORIGINAL, FILL_INTERPOLATED, FILL_ORIGINAL, FILL_FROM_PEERS, FILL_FROM_PEERS, FILL_FROM_PEERS,
+        FILL_ORIGINAL, FILL_ORIGINAL,
+    ]
+    assert (df_provenance[B] == FILL_ORIGINAL).all()
+
+
+def test_night_and_edge_gaps_stay_missing():
+    df = _frame("2024-12-02 22:00", [np.nan, 20.0, np.nan, np.nan, np.nan, 60.0])
+
+    df_filled, df_provenance = fill_gaps(df, max_interpolation_gap=2, peer_groups=cabin_peer_groups([A, B]))
+
+    assert np.isnan(df_filled[A].iloc[[0, 2, 3, 4]]).all()
+    assert df_provenance[A].tolist() == [FILL_MISSING, FILL_ORIGINAL, FILL_MISSING, FILL_MISSING, FILL_MISSING, FILL_ORIGINAL]
+
+
+def test_peer_groups():
+    assert cabin_peer_groups([A, B, "Cabin 2 inverter 1 [kW]"]) == {A: [B], B: [A], "Cabin 2 inverter 1 [kW]": []}
+
+    sensors = [f"Pyranometer POA cabin {n:02} [W/m2]" for n in (1, 4, 7, 10)] + ["Module temperature cabin 04 [°C]"]
+    peers = nearest_peer_groups(sensors)
+    assert peers[sensors[1]] == [sensors[0], sensors[2]]
+    assert peers[sensors[3]] == [sensors[2], sensors[1]]
+    assert peers["Module temperature cabin 04 [°C]"] == []
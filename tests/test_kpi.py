@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.kpi import compute_kpis, nearest_sensor_assignment
+
+TAGS = ["Cabin 1 inverter 1 [kWh]", "Cabin 2 inverter 1 [kWh]"]
+POA = "Pyranometer POA cabin 01 [Wh/m2]"
+TEMPERATURE = "Module temperature cabin 01 [°C]"
+
+
+@pytest.fixture
+def frames():
+    dates = pd.date_range("2024-12-02 12:00", periods=4, freq="15min", name="date")
+    # 15 minutes of 800 W/m2 are 200 Wh/m2; the last interval is dark (8 W/m2)
+    df_meteo = pd.DataFrame({POA: [200.0, 200.0, 200.0, 2.0], TEMPERATURE: [45.0, 45.0, 45.0, 45.0]}, index=dates)
+    df_energy = pd.DataFrame({TAGS[0]: [16.0, 16.0, np.nan, 0.0], TAGS[1]: [16.0, 0.0, 16.0, 0.0]}, index=dates)
+    return df_energy, df_meteo
+
+
+def test_kpis_of_the_period(frames):
+    df_energy, df_meteo = frames
+    assignment = {tag: POA for tag in TAGS}
+
+    kpis = compute_kpis(df_energy, df_meteo, 100.0, assignment, {tag: TEMPERATURE for tag in TAGS})
+
+    # Reference energy of a sunny interval: 100 kWp * 200 Wh/m2 / 1000 W/m2 = 20 kWh
+    np.testing.assert_allclose(kpis["PR"].to_numpy(), [[32 / 40.2, 32 / 60.2]])
+    # 45 °C module: factor 1 - 0.0035 * 20 = 0.93
+    np.testing.assert_allclose(kpis["PR temperature corrected"].to_numpy(), [[32 / (40.2 * 0.93), 32 / (60.2 * 0.93)]])
+    np.testing.assert_allclose(kpis["specific yield"].to_numpy(), [[0.32, 0.32]])
+    # The interval without energy of inverter 1 counts in neither side of its availability
+    np.testing.assert_allclose(kpis["availability"].to_numpy(), [[1.0, 2 / 3]])
+
+
+def test_daily_kpis_and_capacity_per_inverter(frames):
+    df_energy, df_meteo = frames
+
+    kpis = compute_kpis(df_energy, df_meteo, {TAGS[0]: 100.0, TAGS[1]: 50.0}, {tag: POA for tag in TAGS}, agg_period=1440)
+
+    assert list(kpis) == ["PR", "specific yield", "availability"]
+    assert kpis["PR"].index.equals(pd.DatetimeIndex(["2024-12-02"], name="date"))
+    np.testing.assert_allclose(kpis["specific yield"].to_numpy(), [[0.32, 0.64]])
+    with pytest.raises(ValueError):
+        compute_kpis(df_energy, df_meteo, {TAGS[0]: 100.0}, {tag: POA for tag in TAGS})
+
+
+def test_nearest_sensor_assignment():
+    sensors = ["Pyranometer POA cabin 01 [Wh/m2]", "Pyranometer POA cabin 04 [Wh/m2]"]
+    inverters = ["Cabin 2 inverter 1 [kWh]", "Cabin 3 inverter 1 [kWh]", "Cabin 9 inverter 1 [kWh]", "Meter [kWh]"]
+
+    assert nearest_sensor_assignment(inverters, sensors) == {
+        "Cabin 2 inverter 1 [kWh]": sensors[0],
+        "Cabin 3 inverter 1 [kWh]": sensors[1],
+        "Cabin 9 inverter 1 [kWh]": sensors[1],
+    }
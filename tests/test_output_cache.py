@@ -0,0 +1,91 @@
+import os
+import sys
+import importlib
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from utils import output_cache
+from utils.output_cache import write_workbook_cached, format_fingerprint, MANIFEST_SUFFIX
+
+DATES = pd.date_range("2024-12-02", periods=4, freq="h", name="date")
+
+
+def _outputs(scale_1h=1.0):
+    return [
+        ("15M", pd.DataFrame({"energy": np.arange(4.0)}, index=DATES)),
+        ("1H", pd.DataFrame({"energy": np.arange(4.0) * scale_1h}, index=DATES)),
+    ]
+
+
+@pytest.fixture
+def written(monkeypatch):
+    # Names of the sheets written by write_workbook_cached
+    names = []
+    write_dataframe_to_sheet = output_cache.write_dataframe_to_sheet
+
+    def recording(wb, df, ws_name):
+        names.append(ws_name)
+        return write_dataframe_to_sheet(wb, df, ws_name)
+
+    monkeypatch.setattr(output_cache, "write_dataframe_to_sheet", recording)
+    return names
+
+
+def test_unchanged_outputs_are_not_written(tmp_path, written):
+    output_path = tmp_path / "outputs.xlsx"
+
+    assert write_workbook_cached(_outputs(), output_path)
+    mtime_ns = output_path.stat().st_mtime_ns
+    assert write_workbook_cached(_outputs(), output_path) is False
+
+    assert written == ["15M", "1H"]
+    assert output_path.stat().st_mtime_ns == mtime_ns
+    assert output_path.with_name(output_path.name + MANIFEST_SUFFIX).exists()
+
+
+def test_only_the_changed_sheets_are_rewritten(tmp_path, written):
+    output_path = tmp_path / "outputs.xlsx"
+    write_workbook_cached(_outputs(), output_path)
+
+    assert write_workbook_cached(_outputs(scale_1h=2.0), output_path)
+
+    assert written == ["15M", "1H", "1H"]
+    wb = load_workbook(output_path)
+    assert wb.sheetnames == ["15M", "1H"]
+    assert [row[1] for row in wb["1H"].iter_rows(min_row=2, values_only=True)] == [0, 2, 4, 6]
+    assert [row[1] for row in wb["15M"].iter_rows(min_row=2, values_only=True)] == [0, 1, 2, 3]
+
+
+def test_a_modified_workbook_is_written_again(tmp_path, written):
+    output_path = tmp_path / "outputs.xlsx"
+    write_workbook_cached(_outputs(), output_path)
+    # Edited by hand since the manifest was written
+    os.utime(output_path, ns=(1, 1))
+
+    assert write_workbook_cached(_outputs(), output_path)
+    assert written == ["15M", "1H", "15M", "1H"]
+
+
+def test_format_fingerprint_follows_the_format_module_only(tmp_path, monkeypatch):
+    (tmp_path / "format_helper.py").write_text("WIDTH = 10\n")
+    (tmp_path / "format_module.py").write_text("import format_helper\n\ndef format_sheet(ws):\n    ws.width = format_helper.WIDTH\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module = importlib.import_module("format_module")
+    try:
+        key = format_fingerprint(module.format_sheet)
+
+        # Another module used by the format does not change the fingerprint
+        (tmp_path / "format_helper.py").write_text("WIDTH = 20\n")
+        assert format_fingerprint(module.format_sheet) == key
+
+        # Any change in the module of the format does
+        (tmp_path / "format_module.py").write_text(
+            "import format_helper\n\ndef format_sheet(ws):\n    ws.width = format_helper.WIDTH\n\ndef helper():\n    pass\n"
+        )
+        assert format_fingerprint(module.format_sheet) != key
+    finally:
+        for name in ["format_module", "format_helper"]:
+            sys.modules.pop(name, None)
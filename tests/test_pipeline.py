@@ -0,0 +1,11 @@
+import pytest
+
+import dom_get_sensors
+from utils.pipeline import EXIT_VALIDATION_FAILED
+
+
+@pytest.mark.parametrize("options", [[], ["--no-catalog"], ["--cache-dir", "cache"]])
+def test_missing_raw_data_fails_validation(tmp_path, monkeypatch, options):
+    monkeypatch.chdir(tmp_path)
+
+    assert dom_get_sensors.main(["--start", "01-12-2024", "--end", "01-01-2025", *options]) == EXIT_VALIDATION_FAILED
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.prmte import read_prmte_file, strip_non_printable_bytes
+
+HEADER = "AÑO;MES;DIA;HORA;INICIO INTERVALO;Energía [kWh];Potencia [kW];Factor"
+
+
+def _write(tmp_path, lines, encoding="utf-8"):
+    file_path = tmp_path / "prmte.csv"
+    file_path.write_bytes("\r\n".join(lines).encode(encoding))
+    return str(file_path)
+
+
+def test_strip_keeps_accents_and_removes_invisible_characters():
+    # Byte order mark, word joiner, narrow non-breaking space, right-to-left isolate, soft hyphen and a control byte
+    text = "\ufeffAÑO;ca\u2060da\u202f1\u2067\u00ad\x07\tñ\r\n"
+
+    assert strip_non_printable_bytes(text.encode("utf-8")).decode("utf-8") == "AÑO;cada1\tñ\r\n"
+
+
+def test_read_prmte_file(tmp_path):
+    file_path = _write(tmp_path, [
+        "\ufeff" + HEADER,
+        "2024;12;2;10;15;1.234,5;10,5;1",
+        # Invisible characters in the date components and a non-breaking space as thousands separator
+        "2024;12;\u200e2;10\u2060;0;2\u00a0000,25;11;1",
+        ";;;;;;;",
+        "Total;;;;;3.234,75;;",
+    ])
+
+    df = read_prmte_file(file_path, indexes_to_remove=[3])
+
+    assert df.columns.tolist() == ["date", "Energía [kWh]", "Potencia [kW]"]
+    assert df["date"].tolist() == [pd.Timestamp("2024-12-02 10:00"), pd.Timestamp("2024-12-02 10:15")]
+    np.testing.assert_allclose(df["Energía [kWh]"], [2000.25, 1234.5])
+    np.testing.assert_allclose(df["Potencia [kW]"], [11.0, 10.5])
+
+
+def test_read_prmte_file_in_another_encoding(tmp_path):
+    file_path = _write(tmp_path, [HEADER, "2024;12;2;10;15;1.234,5;10,5;1"], encoding="cp1252")
+
+    df = read_prmte_file(file_path, encoding="cp1252")
+
+    assert df.columns.tolist() == ["date", "Energía [kWh]", "Potencia [kW]", "Factor"]
+    assert df["Energía [kWh]"].tolist() == [1234.5]
+
+
+def test_missing_date_columns(tmp_path):
+    with pytest.raises(ValueError, match="INICIO INTERVALO"):
+        read_prmte_file(_write(tmp_path, ["AÑO;MES;DIA;HORA;Energía [kWh]", "2024;12;2;10;1"]))
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from utils.quality import run_lengths, run_quality_checks, FLAG_STUCK, FLAG_SPIKE, FLAG_NEGATIVE_IRRADIANCE, FLAG_OUT_OF_RANGE
+
+RULES = {
+    "[W/m2]": {"min": 0, "max": 1500, "max_rate_per_minute": 400, "stuck_min_run": 3, "stuck_ignore_zero": True},
+}
+
+
+def _checks(values, rules=RULES):
+    dates = pd.date_range("2024-12-02 12:00", periods=len(values), freq="1min")
+    return run_quality_checks(pd.DataFrame({"POA [W/m2]": values}, index=dates), rules)
+
+
+def test_run_lengths_per_column():
+    continues = np.array([
+        [False, True],
+        [True, True],
+        [False, False],
+        [True, True],
+        [True, False],
+    ])
+
+    np.testing.assert_array_equal(run_lengths(continues), [[2, 2], [2, 2], [3, 2], [3, 2], [3, 1]])
+    assert run_lengths(np.zeros((0, 2), dtype=bool)).shape == (0, 2)
+
+
+def test_only_the_spike_is_flagged():
+    df_flags, df_summary = _checks([500.0, 510.0, 2000.0, 520.0, 530.0])
+
+    assert (df_flags["POA [W/m2]"].to_numpy() & FLAG_SPIKE).astype(bool).tolist() == [False, False, True, False, False]
+    assert df_summary.loc["POA [W/m2]", "spike"] == 1
+
+
+def test_a_step_and_the_edges_are_not_spikes():
+    df_flags, _ = _checks([2000.0, 500.0, 510.0, 1200.0, 1210.0, np.nan, 100.0])
+
+    assert not (df_flags["POA [W/m2]"].to_numpy() & FLAG_SPIKE).any()
+
+
+def test_stuck_negative_and_out_of_range():
+    df_flags, df_summary = _checks([0.0, 0.0, 0.0, 0.0, 700.0, 700.0, 700.0, -5.0, 1600.0])
+
+    flags = df_flags["POA [W/m2]"].tolist()
+    assert flags[:4] == [0, 0, 0, 0]
+    assert flags[4:7] == [FLAG_STUCK] * 3
+    assert flags[7] & FLAG_NEGATIVE_IRRADIANCE and flags[8] & FLAG_OUT_OF_RANGE
+    assert df_summary.loc["POA [W/m2]", "flagged fraction"] == 5 / 9
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.rollup import build_rollup_matrices, cabin_to_substation_from_groups, rollup, rollup_periods
+
+TAGS = [
+    "Cabin 1 inverter 1 [kWh]",
+    "Cabin 1 inverter 2 [kWh]",
+    "Cabin 2 inverter 1 [kWh]",
+    "Cabin 10 inverter 1 [kWh]",
+]
+CABIN_TO_SUBSTATION = {"Cabin 1": "EMELDA_1", "Cabin 2": "EMELDA_1", "Cabin 10": "EMELDA_2"}
+
+
+@pytest.fixture
+def df():
+    dates = pd.date_range("2024-12-02 12:00", periods=3, freq="15min", name="date")
+    return pd.DataFrame(
+        [[1.0, 2.0, 4.0, 8.0], [1.0, np.nan, 4.0, np.nan], [np.nan, np.nan, 4.0, 8.0]],
+        index=dates,
+        columns=TAGS,
+    )
+
+
+def test_matrices_order_cabins_numerically():
+    matrices = build_rollup_matrices(TAGS, CABIN_TO_SUBSTATION, unit=" [kWh]")
+
+    assert list(matrices) == ["cabin", "substation", "park"]
+    assert matrices["cabin"][0] == ["Cabin 1 [kWh]", "Cabin 2 [kWh]", "Cabin 10 [kWh]"]
+    assert matrices["substation"][0] == ["EMELDA_1 [kWh]", "EMELDA_2 [kWh]"]
+    np.testing.assert_array_equal(matrices["substation"][1], [[1, 0], [1, 0], [1, 0], [0, 1]])
+
+
+def test_rollup_skips_missing_inverters(df):
+    rollups = rollup(df, TAGS, build_rollup_matrices(TAGS, CABIN_TO_SUBSTATION))
+
+    np.testing.assert_array_equal(rollups["cabin"].to_numpy(), [[3, 4, 8], [1, 4, np.nan], [np.nan, 4, 8]])
+    np.testing.assert_array_equal(rollups["substation"].to_numpy(), [[7, 8], [5, np.nan], [4, 8]])
+    np.testing.assert_array_equal(rollups["park"]["DOM"].to_numpy(), [15, 5, 12])
+    assert rollups["park"].index.equals(df.index)
+
+
+def test_rollup_without_skipna_needs_every_inverter(df):
+    rollups = rollup(df, TAGS, build_rollup_matrices(TAGS), skipna=False)
+
+    assert "substation" not in rollups
+    np.testing.assert_array_equal(rollups["cabin"].to_numpy(), [[3, 4, 8], [np.nan, 4, np.nan], [np.nan, 4, 8]])
+    np.testing.assert_array_equal(rollups["park"]["DOM"].to_numpy(), [15, np.nan, np.nan])
+
+
+def test_rollup_periods_and_missing_tags(df):
+    matrices = build_rollup_matrices(TAGS)
+    rollups = rollup_periods({"15M": df, "1H": df.resample("1h").sum(min_count=1)}, TAGS, matrices)
+
+    np.testing.assert_array_equal(rollups["1H"]["park"]["DOM"].to_numpy(), [32])
+    with pytest.raises(ValueError):
+        rollup(df.drop(columns=TAGS[0]), TAGS, matrices)
+
+
+def test_cabin_to_substation_from_groups():
+    groups = {TAGS[0]: "EMELDA_1", TAGS[3]: "EMELDA_2", "Meter [kWh]": "EMELDA_1"}
+
+    assert cabin_to_substation_from_groups(groups) == {"Cabin 1": "EMELDA_1", "Cabin 10": "EMELDA_2"}
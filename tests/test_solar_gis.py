@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from utils.solar_gis import align_solar_gis_to_grid, join_solar_gis_with_sensors, solar_gis_rule
+
+
+def _solar_gis_utc(start, end):
+    # 15 minute Solar GIS data in UTC, stamped at the end of each interval, numbered in order
+    dates = pd.date_range(start, end, freq="15min")
+    return pd.DataFrame({"date": dates, "GHI": np.arange(len(dates), dtype=float)})
+
+
+def test_align_keeps_both_fall_back_hours():
+    df = align_solar_gis_to_grid(_solar_gis_utc("2024-04-07 02:15", "2024-04-07 04:00"), 0, 15)
+
+    assert df["utc"].is_unique
+    # 02:00Z and 03:00Z are both 23:00 in Santiago (-03 before the change, -04 after)
+    assert (df["date"] == pd.Timestamp("2024-04-06 23:00")).sum() == 2
+    assert df["utc"].iloc[0] == pd.Timestamp("2024-04-07 02:00").value
+
+
+def test_join_keeps_the_repeated_hour_of_satellite_data():
+    df_solar_gis = align_solar_gis_to_grid(_solar_gis_utc("2024-04-06 03:15", "2024-04-08 04:15"), 0, 15)
+    local = pd.date_range("2024-04-06", "2024-04-07 23:59", freq="1min")
+    df_sensors = pd.DataFrame({"Pyranometer 1 [W/m2]": 1.0}, index=local)
+
+    df = join_solar_gis_with_sensors(df_solar_gis, df_sensors, "06-04-2024", "08-04-2024")
+
+    # 49 hours between the local midnights, both ends included
+    assert len(df) == 49 * 4 + 1
+    assert df["utc"].is_unique and df["utc"].is_monotonic_increasing
+    assert df["GHI"].notna().all() and df["GHI"].is_unique
+    assert (df["date"] == pd.Timestamp("2024-04-06 23:15")).sum() == 2
+    # The sensors wrote the repeated hour once (as DST): the second one has no sensor data
+    repeated = df[df["date"] == pd.Timestamp("2024-04-06 23:15")]
+    assert repeated["Pyranometer 1 [W/m2]"].tolist()[0] == 1.0
+    assert np.isnan(repeated["Pyranometer 1 [W/m2]"].tolist()[1])
+
+
+def test_solar_gis_rule_prefers_the_header():
+    rule = {"utc_offset_hours": 0, "timestamp_convention": "end", "interval_minutes": 15}
+    metadata = {"utc_offset_hours": -3.0, "interval_minutes": None, "timestamp_convention": "center"}
+
+    assert solar_gis_rule(metadata, rule) == {"utc_offset_hours": -3.0, "interval_minutes": 15, "timestamp_convention": "center"}
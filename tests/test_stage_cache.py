@@ -0,0 +1,90 @@
+import sys
+import textwrap
+import importlib
+
+import pytest
+
+from utils.stage_cache import Stage, StageCheckError, run_stages
+
+STAGE_MODULE = """
+import stage_helper
+import stage_writer
+
+calls = []
+
+def double(values, factor):
+    calls.append('double')
+    return [stage_helper.scale(value, factor) for value in values]
+
+def write(values):
+    return stage_writer.FORMAT.format(values)
+"""
+
+
+@pytest.fixture
+def modules(tmp_path, monkeypatch):
+    # A stage module calling a helper (a dependency of the stage) and importing a writer (not a dependency)
+    (tmp_path / "stage_helper.py").write_text("def scale(value, factor):\n    return value * factor\n")
+    (tmp_path / "stage_writer.py").write_text("FORMAT = '{}'\n")
+    (tmp_path / "stage_module.py").write_text(STAGE_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield tmp_path, importlib.import_module("stage_module")
+    for name in ["stage_module", "stage_helper", "stage_writer"]:
+        sys.modules.pop(name, None)
+
+
+def _stages(module, calls, factor=2):
+    def values():
+        calls.append("values")
+        return [1, 2, 3]
+
+    return [
+        Stage("values", values, cache=False),
+        Stage("double", module.double, inputs=["values"], params={"factor": factor}, code_modules=["stage_helper"]),
+    ]
+
+
+def test_only_the_changed_dependencies_recompute(modules, tmp_path):
+    root, module = modules
+    cache_dir = tmp_path / "cache"
+    calls = []
+
+    assert run_stages(_stages(module, calls), cache_dir=cache_dir) == {"double": [2, 4, 6]}
+    assert run_stages(_stages(module, calls), cache_dir=cache_dir) == {"double": [2, 4, 6]}
+    # The volatile stage runs once per evaluation, the cached stage once
+    assert calls == ["values", "values"] and module.calls == ["double"]
+
+    # A module imported by the stage module but not used by the stage keeps the cache
+    (root / "stage_writer.py").write_text("FORMAT = '[{}]'\n")
+    run_stages(_stages(module, calls), cache_dir=cache_dir)
+    assert module.calls == ["double"]
+
+    # A change in a parameter or in a code module recomputes
+    run_stages(_stages(module, calls, factor=3), cache_dir=cache_dir)
+    assert module.calls == ["double"] * 2
+    (root / "stage_helper.py").write_text("def scale(value, factor):\n    return value * factor  # same result\n")
+    run_stages(_stages(module, calls, factor=3), cache_dir=cache_dir)
+    assert module.calls == ["double"] * 3
+
+
+def test_a_failing_check_stops_the_graph(modules, tmp_path):
+    _, module = modules
+    calls = []
+    stages = _stages(module, calls)
+    stages[0].check = lambda values: "OK" if len(values) > 3 else f"only {len(values)} values"
+
+    with pytest.raises(StageCheckError, match="only 3 values") as error:
+        run_stages(stages, cache_dir=tmp_path / "cache")
+    assert error.value.stage == "values"
+    assert calls == ["values"] and module.calls == []
+
+
+def test_invalid_graphs(modules):
+    _, module = modules
+
+    with pytest.raises(ValueError):
+        run_stages(_stages(module, []) * 2)
+    with pytest.raises(ValueError):
+        run_stages([Stage("a", len, inputs=["b"]), Stage("b", len, inputs=["a"])], ["a"])
+    with pytest.raises(ValueError):
+        run_stages([Stage("a", len, inputs=["missing"])])
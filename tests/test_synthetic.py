@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.pipeline import read_scada_file
+from utils.synthetic import synthetic_park, synthetic_inverter_day, write_sdi_xls, XLS_MAX_COLUMNS
+
+pytest.importorskip("xlwt")
+
+
+def test_synthetic_park_groups_the_inverters_per_station():
+    park = synthetic_park(7, 2)
+
+    assert list(park["stations"]) == ["EMELDA_1", "EMELDA_2"]
+    assert len(park["stations"]["EMELDA_1"]) == 10 and len(park["stations"]["EMELDA_2"]) == 4
+    assert sum(park["stations"].values(), []) == list(park["kw_scada_to_tag"])
+
+
+def test_sdi_xls_round_trip(tmp_path):
+    park = synthetic_park(1, 2)
+    df = synthetic_inverter_day(park["stations"]["EMELDA_1"], pd.Timestamp("2024-12-02"), agg_period=60, nan_fraction=0.1, seed=1)
+    write_sdi_xls(df, tmp_path / "EMELDA_1.xls")
+
+    df_read, message = read_scada_file(str(tmp_path / "EMELDA_1.xls"), park["kw_scada_to_tag"])
+
+    assert message == "OK"
+    assert df_read["date"].equals(df["date"])
+    np.testing.assert_allclose(df_read[list(park["kw_scada_to_tag"].values())], df[list(park["kw_scada_to_tag"])])
+
+
+def test_sdi_xls_column_limit(tmp_path):
+    df = synthetic_inverter_day([f"PN1_S11_AN{n}0028" for n in range(XLS_MAX_COLUMNS)], pd.Timestamp("2024-12-02"), agg_period=1440)
+
+    with pytest.raises(ValueError):
+        write_sdi_xls(df, tmp_path / "too_wide.xls")
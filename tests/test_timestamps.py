@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data import clean_dataframe, set_date_as_index, to_agg_period_beta
+from utils.pipeline import combine_on_range
+from utils.timestamps import normalize_timestamps, normalize_dataframe_dates, utc_to_local, localize_dataframe_dates, to_wall_clock
+
+SANTIAGO = {"timezone": "America/Santiago", "timestamp_convention": "start", "interval_minutes": 15}
+
+
+def _utc(values):
+    return pd.DatetimeIndex(np.asarray(values, dtype=np.int64).view("datetime64[ns]"))
+
+
+def test_fall_back_keeps_both_repeated_hours():
+    # Chile sets the clock back on 2024-04-07 00:00 (-03 -> -04): 23:00-23:45 of the 6th are written twice
+    first = pd.date_range("2024-04-06 22:45", "2024-04-06 23:45", freq="15min")
+    second = pd.date_range("2024-04-06 23:00", "2024-04-07 00:00", freq="15min")
+    dates = pd.Series(first.append(second))
+
+    utc_ns, report = normalize_timestamps(dates, SANTIAGO)
+
+    expected = pd.date_range("2024-04-07 01:45", "2024-04-07 04:00", freq="15min")
+    assert _utc(utc_ns).equals(expected)
+    assert report == {"repeated_hour": 4, "ambiguous_single": 0, "skipped_hour": 0}
+
+
+def test_fall_back_single_occurrence_is_taken_as_dst():
+    dates = pd.Series(pd.to_datetime(["2024-04-06 23:30"]))
+
+    utc_ns, report = normalize_timestamps(dates, SANTIAGO)
+
+    assert _utc(utc_ns)[0] == pd.Timestamp("2024-04-07 02:30")
+    assert report["ambiguous_single"] == 1
+
+
+def test_spring_forward_keeps_the_offset_before_the_change():
+    # Chile sets the clock forward on 2024-09-08 00:00 (-04 -> -03): 00:00-00:45 do not exist
+    dates = pd.Series(pd.date_range("2024-09-07 23:45", "2024-09-08 01:15", freq="15min"))
+
+    utc_ns, report = normalize_timestamps(dates, SANTIAGO)
+
+    utc = _utc(utc_ns)
+    assert list(utc[:5]) == list(pd.date_range("2024-09-08 03:45", "2024-09-08 04:45", freq="15min"))
+    # 01:00 and 01:15 are already -03, so they land on the same UTC times as 00:00 and 00:15
+    assert list(utc[5:]) == [pd.Timestamp("2024-09-08 04:00"), pd.Timestamp("2024-09-08 04:15")]
+    assert report == {"repeated_hour": 0, "ambiguous_single": 0, "skipped_hour": 4}
+
+
+def test_spring_forward_keeps_the_existing_times_on_collisions():
+    dates = pd.date_range("2024-09-07 23:45", "2024-09-08 01:15", freq="15min")
+    df = pd.DataFrame({"date": dates, "power": [1.0, 2.0, np.nan, 4.0, 5.0, 6.0, 7.0]})
+
+    df_utc = normalize_dataframe_dates(df, SANTIAGO)
+
+    assert df_utc.index.is_unique and df_utc.index.is_monotonic_increasing
+    # 00:00 and 00:15 do not exist and land on the real 01:00 and 01:15, which are kept; 00:30 and 00:45 do not collide
+    assert df_utc["power"].tolist() == [1.0, 6.0, 7.0, 4.0, 5.0]
+
+
+def test_overlapping_exports_are_combined():
+    dates = pd.to_datetime(["2024-12-02 10:00", "2024-12-02 10:15", "2024-12-02 10:15"])
+    df = pd.DataFrame({"date": dates, "a": [1.0, np.nan, 3.0], "b": [1.0, 2.0, 4.0]})
+
+    df_utc = normalize_dataframe_dates(df, SANTIAGO)
+
+    assert df_utc.to_numpy().tolist() == [[1.0, 1.0], [3.0, 2.0]]
+
+
+def test_end_convention_and_fixed_offset():
+    rule = {"utc_offset_hours": -4, "timestamp_convention": "end", "interval_minutes": 15}
+    dates = pd.Series(pd.to_datetime(["2024-04-06 23:15", "2024-04-06 23:15"]))
+
+    utc_ns, report = normalize_timestamps(dates, rule)
+
+    assert list(_utc(utc_ns)) == [pd.Timestamp("2024-04-07 03:00")] * 2
+    assert not any(report.values())
+
+
+def test_invalid_convention():
+    with pytest.raises(ValueError):
+        normalize_timestamps(pd.Series(pd.to_datetime(["2024-01-01"])), {**SANTIAGO, "timestamp_convention": "middle"})
+
+
+def test_utc_to_local_round_trip():
+    local = pd.date_range("2024-04-06 22:00", "2024-04-07 02:00", freq="15min")
+    utc_ns, _ = normalize_timestamps(pd.Series(local), SANTIAGO)
+
+    assert utc_to_local(utc_ns, "America/Santiago").equals(local)
+
+
+def test_localized_files_keep_the_repeated_hour_through_the_pipeline():
+    # A 15 minute export over the fall-back night, 22:00 to 01:45 with 23:00-23:45 written twice
+    first = pd.date_range("2024-04-06 22:00", "2024-04-06 23:45", freq="15min")
+    second = pd.date_range("2024-04-06 23:00", "2024-04-07 01:45", freq="15min")
+    df = pd.DataFrame({"date": first.append(second), "energy": 1.0})
+
+    df = clean_dataframe(localize_dataframe_dates(df, SANTIAGO))
+    assert len(df) == 20
+
+    df_combined = combine_on_range([df], "06-04-2024", "08-04-2024", 15)
+    # 49 hours of 15 minute intervals, with the repeated hour
+    assert len(df_combined) == 49 * 4 and df_combined["energy"].sum() == 20
+
+    df_1h = to_wall_clock(set_date_as_index(to_agg_period_beta(df_combined, 60, {"energy": "sum"})))
+    assert df_1h.loc["2024-04-06 23:00", "energy"].tolist() == [4.0, 4.0]
+
+    # Days follow the calendar: the 6th has 25 hours
+    df_combined["energy"] = 1.0
+    df_1d = to_wall_clock(set_date_as_index(to_agg_period_beta(df_combined, 1440, {"energy": "sum"})))
+    assert df_1d.index.equals(pd.DatetimeIndex(["2024-04-06", "2024-04-07"], name="date"))
+    assert df_1d["energy"].tolist() == [25 * 4, 24 * 4]